@@ -0,0 +1,69 @@
+"""Compare scene detection engines on a synthetic lavfi capture.
+
+Usage (from backend/):
+    python -m benchmarks.bench_scene_engines --minutes 10
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from digitizer.scene_detector import SceneDetector
+
+SOURCES = [
+    "testsrc2=size={size}:rate={rate}",
+    "smptehdbars=size={size}:rate={rate}",
+    "mandelbrot=size={size}:rate={rate}",
+    "rgbtestsrc=size={size}:rate={rate}",
+    "cellauto=size={size}:rate={rate}:rule=110",
+]
+
+
+def build_source_command(path: str, minutes: float, scene_seconds: float, size: str, rate: str) -> list[str]:
+    count = max(1, int(minutes * 60 / scene_seconds))
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error"]
+    for i in range(count):
+        src = SOURCES[i % len(SOURCES)].format(size=size, rate=rate)
+        cmd += ["-f", "lavfi", "-t", str(scene_seconds), "-i", src]
+    inputs = "".join(f"[{i}:v]" for i in range(count))
+    cmd += [
+        "-filter_complex", f"{inputs}concat=n={count}:v=1:a=0,format=yuv420p[v]",
+        "-map", "[v]",
+        "-c:v", "libx264", "-preset", "ultrafast", "-crf", "23",
+        # Keyframe spacing of a capture (DIGITIZER_KEYFRAME_INTERVAL)
+        "-force_key_frames", "expr:gte(t,n_forced*2)",
+        path,
+    ]
+    return cmd
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=5.0)
+    parser.add_argument("--scene-seconds", type=float, default=20.0)
+    parser.add_argument("--size", default="720x480")
+    parser.add_argument("--rate", default="30000/1001")
+    parser.add_argument("--input", help="Use an existing video instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = args.input
+        if path is None:
+            path = os.path.join(tmpdir, "source.mp4")
+            subprocess.run(
+                build_source_command(path, args.minutes, args.scene_seconds, args.size, args.rate),
+                check=True,
+            )
+
+        for engine in ("pyscenedetect", "numpy", "coarse_to_fine"):
+            detector = SceneDetector(engine=engine, min_scene_length=0.0)
+            started = time.perf_counter()
+            scenes = detector._detect_scenes(path)
+            elapsed = time.perf_counter() - started
+            print(f"{engine:>14}: {elapsed:7.2f}s  {len(scenes)} scenes")
+            print("                " + ", ".join(f"{start:.2f}" for start, _ in scenes[1:]))
+
+
+if __name__ == "__main__":
+    main()
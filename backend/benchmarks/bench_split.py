@@ -0,0 +1,130 @@
+"""Compare scene splitting strategies on a synthetic 100-scene capture.
+
+``output_seek`` is the original per-scene command (``-ss`` after ``-i``),
+``per_scene`` seeks on the input side, ``segment`` writes every scene in
+one pass through the segment muxer and ``smart`` is frame-accurate,
+re-encoding only the partial GOPs at each cut (compare its CPU time with
+``transcode``, which re-encodes whole scenes).
+
+Usage (from backend/):
+    python -m benchmarks.bench_split --scenes 100
+"""
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+
+from benchmarks.bench_scene_engines import build_source_command
+from digitizer import keyframes
+from digitizer.splitter import VideoSplitter
+
+
+class OutputSeekSplitter(VideoSplitter):
+    """Splitter using the original output-side seek."""
+
+    def build_split_command(self, input_path, start_time, end_time, output_path):
+        return [
+            "ffmpeg",
+            "-y",
+            "-i", input_path,
+            "-ss", f"{start_time:.3f}",
+            "-to", f"{end_time:.3f}",
+            "-c", "copy",
+            "-movflags", "+faststart",
+            output_path,
+        ]
+
+
+class TranscodeSplitter(VideoSplitter):
+    """Splitter re-encoding every scene in full (frame-accurate baseline)."""
+
+    def build_split_command(self, input_path, start_time, end_time, output_path):
+        return [
+            "ffmpeg",
+            "-y",
+            "-ss", f"{start_time:.3f}",
+            "-i", input_path,
+            "-t", f"{end_time - start_time:.3f}",
+            "-c:v", "libx264",
+            "-preset", self.encoding_preset,
+            "-crf", str(self.crf_quality),
+            "-c:a", "aac",
+            output_path,
+        ]
+
+
+STRATEGIES = {
+    "output_seek": (OutputSeekSplitter(), "per_scene"),
+    "per_scene": (VideoSplitter(), "per_scene"),
+    "segment": (VideoSplitter(), "segment"),
+    # Edges encoded like build_source_command encodes the source
+    "smart": (VideoSplitter(encoding_preset="ultrafast", crf_quality=23), "smart"),
+    "transcode": (TranscodeSplitter(), "per_scene"),
+}
+
+
+def child_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenes", type=int, default=100)
+    parser.add_argument("--scene-seconds", type=float, default=12.0)
+    parser.add_argument(
+        "--cut-seconds", type=float,
+        help="Split into scenes this long instead (shorter than a GOP exercises the segment fallback)",
+    )
+    parser.add_argument("--size", default="720x480")
+    parser.add_argument("--rate", default="30000/1001")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--input", help="Use an existing video instead of generating one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = args.input
+        if path is None:
+            path = os.path.join(tmpdir, "source.mp4")
+            minutes = args.scenes * args.scene_seconds / 60
+            subprocess.run(
+                build_source_command(path, minutes, args.scene_seconds, args.size, args.rate),
+                check=True,
+            )
+
+        # Cuts are offset from the generated scene changes so they fall mid-GOP
+        cut = args.cut_seconds or args.scene_seconds
+        scenes = [
+            {
+                "scene_index": i + 1,
+                "start_time": max(0.0, i * cut - 0.7),
+                "end_time": (i + 1) * cut - 0.7,
+            }
+            for i in range(int(args.scenes * args.scene_seconds / cut))
+        ]
+        keyframe_times = [kf["pts_time"] for kf in asyncio.run(keyframes.build_index(path))]
+        for name, (splitter, mode) in STRATEGIES.items():
+            output_dir = os.path.join(tmpdir, name)
+            started = time.perf_counter()
+            cpu_started = child_cpu_seconds()
+            paths = asyncio.run(splitter.split_all(
+                input_path=path,
+                scenes=scenes,
+                output_dir=output_dir,
+                concurrency=args.concurrency,
+                mode=mode,
+                keyframes=keyframe_times,
+            ))
+            elapsed = time.perf_counter() - started
+            cpu = child_cpu_seconds() - cpu_started
+            written = sum(p is not None for p in paths)
+            print(f"{name:>12}: {elapsed:7.2f}s wall  {cpu:7.2f}s cpu  {written}/{len(scenes)} scenes")
+            shutil.rmtree(output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,30 @@
 import asyncio
 import os
+import tempfile
+import time
 import uuid
 
 from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+
+from digitizer import keyframes
+from digitizer.calibration import CALIBRATION_FPS, CALIBRATION_MARGIN, CALIBRATION_SIZE, PresetCalibrator
+from digitizer.capture import LIVE_ANALYSIS_FPS, LIVE_ANALYSIS_SIZE, CaptureHealth
+from digitizer.drives import aggregate_status
+from digitizer.end_of_tape import EndOfTapeDetector
+from digitizer.scene_detector import LiveSceneDetector
 
 router = APIRouter(prefix="/api")
 
+# Seconds between writes of a running capture's telemetry to its job
+HEALTH_SAVE_INTERVAL = 10.0
+# Rewritten every second during a capture, so kept off the (network) output volume
+PREVIEW_DIR = os.path.join(tempfile.gettempdir(), "digitizer-preview")
+
+
+def _preview_path(job_id: str) -> str:
+    return os.path.join(PREVIEW_DIR, f"{job_id}.jpg")
+
 
 @router.get("/health")
 async def health():
@@ -15,14 +33,19 @@ async def health():
 
 @router.get("/drive")
 async def get_drive(request: Request):
-    monitor = request.app.state.drive_monitor
-    return {"status": monitor.status.value}
+    drives = list(request.app.state.drives.values())
+    return {
+        "status": aggregate_status(drives).value,
+        "drives": [drive.to_dict() for drive in drives],
+    }
 
 
 @router.get("/jobs")
-async def list_jobs(request: Request, limit: int = 10, offset: int = 0, source_type: str | None = None):
+async def list_jobs(
+    request: Request, limit: int = 10, offset: int = 0, source_type: str | None = None, parent_id: str | None = None,
+):
     jm = request.app.state.job_manager
-    jobs = await jm.list_jobs(limit=limit, offset=offset, source_type=source_type)
+    jobs = await jm.list_jobs(limit=limit, offset=offset, source_type=source_type, parent_id=parent_id)
     return [j.model_dump() for j in jobs]
 
 
@@ -53,6 +76,10 @@ async def get_settings(request: Request):
 ALLOWED_SETTINGS = {
     "output_path", "naming_pattern", "auto_eject",
     "vhs_output_path", "encoding_preset", "crf_quality", "audio_bitrate",
+    "live_analysis", "live_preview", "archival_master", "end_of_tape", "end_of_tape_seconds",
+    "transcode_after_capture", "transcode_keep_original", "transcode_preset", "transcode_crf",
+    "transcode_deinterlace", "transcode_denoise", "split_concurrency", "split_mode", "duplicate_discs",
+    "rip_titles", "min_title_length",
 }
 
 
@@ -84,17 +111,32 @@ async def capture_start(request: Request):
     vhs = request.app.state.vhs_capture
     if vhs.is_recording:
         raise HTTPException(status_code=409, detail="Already recording")
+    if request.app.state._calibrating:
+        raise HTTPException(status_code=409, detail="Encoder calibration is running")
 
     jm = request.app.state.job_manager
     ws = request.app.state.ws_manager
+    db = request.app.state.db
 
     job = await jm.create_job(
         disc_info={"title_count": 0, "main_title": 0, "duration": 0},
         source_type="vhs",
     )
     await jm.mark_ripping(job.id)
+    # Recovery after a crash depends on how the file was being written
+    await db.update_job(job.id, capture_fragmented=vhs.fragmented)
     request.app.state._capture_job_id = job.id
 
+    # Encode with the preset and quality chosen in settings (or by calibration)
+    settings = await db.get_settings()
+    vhs.encoding_preset = settings.get("encoding_preset", vhs.encoding_preset)
+    vhs.crf_quality = int(settings.get("crf_quality", vhs.crf_quality))
+    master_path = None
+    if settings.get("archival_master", False):
+        master_path = _os.path.splitext(job.output_path)[0] + "_master.mkv"
+        await db.update_job(job.id, master_path=master_path)
+    preview_path = _preview_path(job.id) if settings.get("live_preview", True) else None
+
     await ws.broadcast({"event": "capture_status", "data": {"status": "recording"}})
 
     async def on_progress(elapsed: float, file_size: int):
@@ -103,31 +145,176 @@ async def capture_start(request: Request):
             "data": {"job_id": job.id, "elapsed": elapsed, "file_size": file_size},
         })
 
+    health_saved = 0.0
+    last_health: dict = {}
+
+    async def on_health(health: CaptureHealth, warning: bool):
+        nonlocal health_saved
+        last_health.update(health.to_dict())
+        data = {"job_id": job.id, **last_health}
+        await ws.broadcast({"event": "capture_health", "data": data})
+        if warning:
+            await ws.broadcast({
+                "event": "capture_warning",
+                "data": {**data, "message": f"Encoder below real time for {health.slow_seconds:.0f}s"},
+            })
+        now = time.monotonic()
+        if warning or now - health_saved >= HEALTH_SAVE_INTERVAL:
+            health_saved = now
+            await jm.update_capture_health(job.id, last_health)
+
+    # Optional live scene detection on a low-res stream tee'd from the capture
+    live = None
+    if settings.get("live_analysis", False):
+        async def on_scene(scene: dict):
+            await db.create_scene(
+                scene_id=scene["id"],
+                job_id=job.id,
+                scene_index=scene["scene_index"],
+                start_time=scene["start_time"],
+                end_time=scene["end_time"],
+                duration=scene["duration"],
+            )
+            await ws.broadcast({"event": "scene_detected", "data": {"job_id": job.id, **scene}})
+
+        width, height = LIVE_ANALYSIS_SIZE
+        live = LiveSceneDetector(
+            request.app.state.scene_detector, width, height, LIVE_ANALYSIS_FPS, on_scene=on_scene
+        )
+        await db.update_job(job.id, analysis_status="analyzing")
+
+    # Optional end-of-tape detection on the same analysis stream
+    end_of_tape = None
+    mode = settings.get("end_of_tape", "off")
+    if mode != "off":
+        async def on_end(reason: str, content_end: float):
+            await ws.broadcast({
+                "event": "capture_auto_stop",
+                "data": {"job_id": job.id, "reason": reason, "content_end": content_end},
+            })
+            # Not awaited: stopping waits for ffmpeg to exit, which needs
+            # this analysis pipe to keep draining
+            _asyncio.create_task(stop_at_end_of_tape())
+
+        async def stop_at_end_of_tape():
+            if vhs.is_recording:  # Unless stopped by hand meanwhile
+                await vhs.stop()
+
+        width, height = LIVE_ANALYSIS_SIZE
+        end_of_tape = EndOfTapeDetector(
+            width, height, LIVE_ANALYSIS_FPS, float(settings.get("end_of_tape_seconds", 60)), on_end=on_end
+        )
+
+    on_frames = on_frames_dropped = None
+    analyzers = [a for a in (live, end_of_tape) if a]
+    if analyzers:
+        async def on_frames(data: bytes):
+            for analyzer in analyzers:
+                await analyzer.feed(data)
+
+        async def on_frames_dropped(frames: int):
+            for analyzer in analyzers:
+                await analyzer.skip(frames)
+
+    async def trim_to_content(content_end: float) -> bool:
+        for path in (job.output_path, master_path):
+            if path and _os.path.exists(path) and not await vhs.trim(path, content_end):
+                return False
+        return True
+
+    async def finish_live_analysis(duration: float | None = None):
+        try:
+            thumb_dir = os.path.join(os.path.dirname(job.output_path), "thumbs", job.id)
+            scenes = await live.finish(job.output_path, thumb_dir, duration=duration)
+            await _store_scenes(db, job.id, scenes)
+            await db.update_job(job.id, analysis_status="analyzed", scene_count=len(scenes))
+            await ws.broadcast({"event": "analysis_complete", "data": {"job_id": job.id, "scene_count": len(scenes)}})
+        except Exception as e:
+            await db.update_job(job.id, analysis_status=None)
+            await ws.broadcast({"event": "analysis_failed", "data": {"job_id": job.id, "error": str(e)}})
+
+    async def discard_live_analysis():
+        await db.delete_scenes_for_job(job.id)
+        await db.update_job(job.id, analysis_status=None)
+
     async def run_capture():
         try:
             success = await vhs.start(
                 output_path=job.output_path,
                 on_progress=on_progress,
+                on_frames=on_frames,
+                on_health=on_health,
+                master_path=master_path,
+                preview_path=preview_path,
+                on_frames_dropped=on_frames_dropped,
             )
+            if last_health:
+                await jm.update_capture_health(job.id, last_health)
+            auto_stopped = end_of_tape is not None and end_of_tape.ended
             if success:
+                await db.update_job(job.id, stop_reason=end_of_tape.reason if auto_stopped else "manual")
                 final_size = 0
                 if _os.path.exists(job.output_path):
                     final_size = _os.path.getsize(job.output_path)
+                content_end = None
+                trim_failed = False
+                if auto_stopped and mode == "trim" and final_size:
+                    if await trim_to_content(end_of_tape.content_end):
+                        content_end = end_of_tape.content_end
+                        final_size = _os.path.getsize(job.output_path)
+                    else:
+                        trim_failed = True
                 completed = await jm.mark_complete(job.id, file_size=final_size)
+                if trim_failed:
+                    await db.update_job(job.id, error="End of tape found but trimming failed; kept the whole capture")
+                    completed = await jm.get_job(job.id)
                 await ws.broadcast({"event": "job_complete", "data": completed.model_dump()})
+                if live:
+                    await finish_live_analysis(content_end)
+                if settings.get("transcode_after_capture", False):
+                    await request.app.state.transcoder.enqueue(job.id)
             else:
+                await db.update_job(job.id, stop_reason="failed")
                 failed = await jm.mark_failed(job.id, error="Capture failed")
                 await ws.broadcast({"event": "job_failed", "data": failed.model_dump()})
+                if live:
+                    await discard_live_analysis()
         except Exception as e:
+            await db.update_job(job.id, stop_reason="failed")
             failed = await jm.mark_failed(job.id, error=str(e))
             await ws.broadcast({"event": "job_failed", "data": failed.model_dump()})
+            if live:
+                await discard_live_analysis()
         finally:
             request.app.state._capture_job_id = None
+            if preview_path and _os.path.exists(preview_path):
+                _os.remove(preview_path)
             await ws.broadcast({"event": "capture_status", "data": {"status": "idle"}})
 
     _asyncio.create_task(run_capture())
 
-    return {"job_id": job.id, "source_type": "vhs", "status": "ripping", "output_path": job.output_path}
+    return {
+        "job_id": job.id,
+        "source_type": "vhs",
+        "status": "ripping",
+        "output_path": job.output_path,
+        "master_path": master_path,
+    }
+
+
+@router.get("/capture/preview")
+async def capture_preview(request: Request):
+    """The latest frame of the running capture (refreshed once a second)."""
+    job_id = request.app.state._capture_job_id
+    if job_id is None:
+        raise HTTPException(status_code=404, detail="Not recording")
+    # Read up front: the file goes away with the capture, possibly mid-response
+    try:
+        with open(_preview_path(job_id), "rb") as f:
+            image = f.read()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="No preview yet")
+    return Response(image, media_type="image/jpeg", headers={"Cache-Control": "no-store"})
 
 
 @router.post("/capture/stop")
@@ -146,6 +333,99 @@ async def capture_stop(request: Request):
     return {"status": "stopped"}
 
 
+@router.get("/calibration")
+async def get_calibration(request: Request):
+    calibration = await request.app.state.db.get_calibration()
+    if calibration is None:
+        raise HTTPException(status_code=404, detail="Encoder has not been calibrated")
+    return calibration
+
+
+@router.post("/calibration", status_code=202)
+async def start_calibration(request: Request):
+    """Benchmark the x264 presets; with ``apply`` the recommended one becomes the capture preset."""
+    if request.app.state.vhs_capture.is_recording:
+        raise HTTPException(status_code=409, detail="Cannot calibrate while recording")
+    if request.app.state._calibrating:
+        raise HTTPException(status_code=409, detail="Calibration already running")
+
+    db = request.app.state.db
+    ws = request.app.state.ws_manager
+    body = await _optional_body(request)
+    try:
+        margin = float(body.get("margin", CALIBRATION_MARGIN))
+        width = int(body.get("width", CALIBRATION_SIZE[0]))
+        height = int(body.get("height", CALIBRATION_SIZE[1]))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid calibration parameters")
+    if margin < 0:
+        raise HTTPException(status_code=400, detail="margin must not be negative")
+    apply = bool(body.get("apply", False))
+
+    settings = await db.get_settings()
+    calibrator = PresetCalibrator(
+        crf_quality=int(settings.get("crf_quality", 23)),
+        size=(width, height),
+        fps=str(body.get("fps", CALIBRATION_FPS)),
+    )
+    request.app.state._calibrating = True
+    await ws.broadcast({"event": "calibration_progress", "data": {"results": []}})
+
+    async def run_calibration():
+        results = []
+
+        async def on_result(result: dict):
+            results.append(result)
+            await ws.broadcast({"event": "calibration_progress", "data": {"results": results}})
+
+        try:
+            calibration = await calibrator.calibrate(margin=margin, on_result=on_result)
+            calibration["applied"] = apply and calibration["recommended"] is not None
+            if calibration["applied"]:
+                await db.update_settings(encoding_preset=calibration["recommended"])
+            await db.save_calibration(calibration)
+            await ws.broadcast({"event": "calibration_complete", "data": calibration})
+        except Exception as e:
+            await ws.broadcast({"event": "calibration_failed", "data": {"error": str(e)}})
+        finally:
+            request.app.state._calibrating = False
+
+    asyncio.create_task(run_calibration())
+    return {"status": "calibrating", "margin": margin, "apply": apply}
+
+
+async def _store_scenes(db, job_id: str, scenes: list[dict]):
+    await db.delete_scenes_for_job(job_id)
+    for scene in scenes:
+        await db.create_scene(
+            scene_id=scene.get("id", str(uuid.uuid4())),
+            job_id=job_id,
+            scene_index=scene["scene_index"],
+            start_time=scene["start_time"],
+            end_time=scene["end_time"],
+            duration=scene["duration"],
+            thumbnail_path=scene.get("thumbnail_path"),
+            split_path=scene.get("split_path"),
+            split_key=scene.get("split_key"),
+        )
+
+
+async def _optional_body(request: Request) -> dict:
+    """The request's JSON object, or an empty dict when no body was sent."""
+    if not await request.body():
+        return {}
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+    return body
+
+
+ANALYSIS_OVERRIDES = {"content_threshold": float, "fade_threshold": int, "min_scene_length": float}
+
+
 @router.post("/jobs/{job_id}/analyze", status_code=202)
 async def analyze_scenes(request: Request, job_id: str):
     jm = request.app.state.job_manager
@@ -161,12 +441,21 @@ async def analyze_scenes(request: Request, job_id: str):
     if job.status.value != "complete":
         raise HTTPException(status_code=400, detail="Job must be complete before analysis")
 
+    # Optional threshold overrides; re-analysis with new thresholds reuses cached frame metrics
+    body = await _optional_body(request)
+    try:
+        overrides = {k: cast(body[k]) for k, cast in ANALYSIS_OVERRIDES.items() if k in body}
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid threshold value")
+    detector = detector.with_thresholds(**overrides)
+
     await db.update_job(job_id, analysis_status="analyzing")
     await ws.broadcast({"event": "analysis_progress", "data": {"job_id": job_id, "progress": 0}})
 
     async def run_analysis():
         try:
             thumb_dir = os.path.join(os.path.dirname(job.output_path), "thumbs", job_id)
+            metrics_dir = os.path.join(os.path.dirname(job.output_path), "metrics", job_id)
 
             async def on_progress(pct: int):
                 await ws.broadcast({"event": "analysis_progress", "data": {"job_id": job_id, "progress": pct}})
@@ -175,20 +464,10 @@ async def analyze_scenes(request: Request, job_id: str):
                 video_path=job.output_path,
                 thumbnail_dir=thumb_dir,
                 on_progress=on_progress,
+                metrics_dir=metrics_dir,
             )
 
-            # Store scenes in DB
-            await db.delete_scenes_for_job(job_id)
-            for scene in scenes:
-                await db.create_scene(
-                    scene_id=scene.get("id", str(uuid.uuid4())),
-                    job_id=job_id,
-                    scene_index=scene["scene_index"],
-                    start_time=scene["start_time"],
-                    end_time=scene["end_time"],
-                    duration=scene["duration"],
-                    thumbnail_path=scene.get("thumbnail_path"),
-                )
+            await _store_scenes(db, job_id, scenes)
 
             await db.update_job(job_id, analysis_status="analyzed", scene_count=len(scenes))
             await ws.broadcast({"event": "analysis_complete", "data": {"job_id": job_id, "scene_count": len(scenes)}})
@@ -201,6 +480,23 @@ async def analyze_scenes(request: Request, job_id: str):
     return {"status": "analyzing", "job_id": job_id}
 
 
+@router.post("/jobs/{job_id}/transcode", status_code=202)
+async def transcode_job(request: Request, job_id: str):
+    jm = request.app.state.job_manager
+    job = await jm.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.source_type != "vhs":
+        raise HTTPException(status_code=400, detail="Re-encoding only available for VHS captures")
+    if job.status.value != "complete":
+        raise HTTPException(status_code=400, detail="Job must be complete before re-encoding")
+    if job.transcode_status in ("queued", "transcoding"):
+        raise HTTPException(status_code=409, detail="Already queued for re-encoding")
+
+    await request.app.state.transcoder.enqueue(job_id)
+    return {"status": "queued", "job_id": job_id}
+
+
 @router.get("/jobs/{job_id}/scenes")
 async def get_scenes(request: Request, job_id: str):
     jm = request.app.state.job_manager
@@ -223,10 +519,16 @@ async def update_scenes(request: Request, job_id: str):
     db = request.app.state.db
     new_scenes = await request.json()
 
-    await db.delete_scenes_for_job(job_id)
+    # Scenes whose boundaries are exactly unchanged keep their row (and split
+    # output); any edit, however small, makes a new row
+    existing = {(s["start_time"], s["end_time"]): s for s in await db.list_scenes(job_id)}
     for scene in new_scenes:
         start = scene["start_time"]
         end = scene["end_time"]
+        match = existing.pop((start, end), None)
+        if match:
+            await db.update_scene(match["id"], scene_index=scene["scene_index"])
+            continue
         await db.create_scene(
             scene_id=str(uuid.uuid4()),
             job_id=job_id,
@@ -235,11 +537,62 @@ async def update_scenes(request: Request, job_id: str):
             end_time=end,
             duration=round(end - start, 3),
         )
+    for stale in existing.values():
+        await db.delete_scene(stale["id"])
 
     await db.update_job(job_id, scene_count=len(new_scenes))
     return await db.list_scenes(job_id)
 
 
+async def _job_keyframes(db, job, rebuild: bool = False) -> list[dict]:
+    """Keyframe index for a job, probing the capture once and caching it in the DB."""
+    index = [] if rebuild else await db.list_keyframes(job.id)
+    if not index:
+        if job.status.value != "complete" or not job.output_path or not os.path.isfile(job.output_path):
+            raise HTTPException(status_code=400, detail="Job output not available")
+        try:
+            index = await keyframes.build_index(job.output_path)
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        await db.replace_keyframes(job.id, index)
+    return index
+
+
+@router.get("/jobs/{job_id}/keyframes")
+async def get_keyframes(request: Request, job_id: str, rebuild: bool = False):
+    jm = request.app.state.job_manager
+    job = await jm.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    index = await _job_keyframes(request.app.state.db, job, rebuild=rebuild)
+    return {"job_id": job_id, "count": len(index), "keyframes": index}
+
+
+@router.post("/jobs/{job_id}/scenes/snap")
+async def snap_scenes(request: Request, job_id: str):
+    jm = request.app.state.job_manager
+    job = await jm.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    body = await _optional_body(request)
+    mode = body.get("mode", "nearest")
+    if mode not in keyframes.SNAP_MODES:
+        raise HTTPException(status_code=400, detail="Invalid snap mode")
+
+    db = request.app.state.db
+    scenes = await db.list_scenes(job_id)
+    if not scenes:
+        raise HTTPException(status_code=400, detail="No scenes to snap")
+
+    index = await _job_keyframes(db, job)
+    snapped = keyframes.snap_scenes(scenes, [kf["pts_time"] for kf in index], mode)
+    await _store_scenes(db, job_id, snapped)
+    await db.update_job(job_id, scene_count=len(snapped))
+    return await db.list_scenes(job_id)
+
+
 @router.post("/jobs/{job_id}/split", status_code=202)
 async def split_scenes(request: Request, job_id: str):
     jm = request.app.state.job_manager
@@ -267,21 +620,42 @@ async def split_scenes(request: Request, job_id: str):
                     "data": {"job_id": job_id, "progress": pct, "current_scene": current_scene},
                 })
 
-            paths = await splitter.split_all(
+            settings = await db.get_settings()
+            mode = settings.get("split_mode", "per_scene")
+            splitter.encoding_preset = settings.get("encoding_preset", splitter.encoding_preset)
+            splitter.crf_quality = int(settings.get("crf_quality", splitter.crf_quality))
+            keyframe_times = None
+            if mode in ("segment", "smart"):
+                keyframe_times = [kf["pts_time"] for kf in await _job_keyframes(db, job)]
+            # Only scenes whose boundaries (or the source) changed are re-split
+            paths, keys = await splitter.split_changed(
                 input_path=job.output_path,
                 scenes=scenes,
                 output_dir=output_dir,
                 on_progress=on_progress,
+                concurrency=int(settings.get("split_concurrency", 4)),
+                mode=mode,
+                keyframes=keyframe_times,
             )
 
-            # Update scene records with split paths
-            for scene, path in zip(scenes, paths):
-                await db.update_scene(scene["id"], split_path=path)
+            # Update scene records with split paths (cleared for scenes that failed)
+            failed = []
+            for scene, path, key in zip(scenes, paths, keys):
+                await db.update_scene(scene["id"], split_path=path, split_key=key)
+                if path is None:
+                    failed.append(scene["scene_index"])
+                    await ws.broadcast({
+                        "event": "split_scene_failed",
+                        "data": {"job_id": job_id, "scene_id": scene["id"], "scene_index": scene["scene_index"]},
+                    })
+
+            if len(failed) == len(scenes):
+                raise RuntimeError("All scenes failed to split")
 
             await db.update_job(job_id, analysis_status="split_complete")
             await ws.broadcast({
                 "event": "split_complete",
-                "data": {"job_id": job_id, "scene_count": len(paths)},
+                "data": {"job_id": job_id, "scene_count": len(scenes) - len(failed), "failed_scenes": failed},
             })
 
         except Exception as e:
@@ -0,0 +1,114 @@
+"""Benchmarking x264 presets on this machine.
+
+Each preset encodes a synthetic source at capture resolution and frame rate
+as fast as it can; the slowest preset that still encodes faster than real
+time by the requested margin is the one to capture with. Presets are tried
+from fastest to slowest and the run stops at the first one that misses the
+target, since every slower preset would miss it too.
+"""
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+
+from digitizer.ffmpeg_runner import FFmpegProgress, run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+X264_PRESETS = (
+    "ultrafast", "superfast", "veryfast", "faster", "fast",
+    "medium", "slow", "slower", "veryslow",
+)
+
+# NTSC VHS as digitized by a typical USB capture device
+CALIBRATION_SIZE = (720, 480)
+CALIBRATION_FPS = "30000/1001"
+CALIBRATION_SECONDS = 10.0
+# Default headroom over real time: 0.25 needs an encode speed of 1.25x
+CALIBRATION_MARGIN = 0.25
+
+
+def pick_preset(results: list[dict], margin: float) -> str | None:
+    """The slowest benchmarked preset at or above ``1 + margin`` speed."""
+    fast_enough = [r["preset"] for r in results if r["speed"] is not None and r["speed"] >= 1 + margin]
+    if not fast_enough:
+        return None
+    return max(fast_enough, key=X264_PRESETS.index)
+
+
+class PresetCalibrator:
+    def __init__(
+        self,
+        crf_quality: int = 23,
+        size: tuple[int, int] = CALIBRATION_SIZE,
+        fps: str = CALIBRATION_FPS,
+        seconds: float = CALIBRATION_SECONDS,
+    ):
+        self.crf_quality = crf_quality
+        self.size = size
+        self.fps = fps
+        self.seconds = seconds
+
+    def build_benchmark_command(self, preset: str) -> list[str]:
+        width, height = self.size
+        return [
+            "ffmpeg",
+            "-f", "lavfi",
+            # Temporal noise stands in for tape grain, which costs x264 far
+            # more than the clean test pattern alone
+            "-i", f"testsrc2=size={width}x{height}:rate={self.fps},noise=alls=12:allf=t",
+            "-t", f"{self.seconds:g}",
+            "-c:v", "libx264",
+            "-preset", preset,
+            "-crf", str(self.crf_quality),
+            "-f", "null",
+            "-",
+        ]
+
+    async def benchmark(self, preset: str) -> dict:
+        """Encode speed of ``preset`` (media seconds per wall second)."""
+        blocks: list[FFmpegProgress] = []
+
+        async def collect(progress: FFmpegProgress):
+            blocks.append(progress)
+
+        result = await run_ffmpeg(self.build_benchmark_command(preset), on_progress=collect)
+        if not result.ok:
+            raise RuntimeError(f"Benchmark of preset {preset} failed: {' '.join(result.stderr[-3:])}")
+
+        # ffmpeg's final speed covers the whole run, startup included
+        speed = blocks[-1].speed if blocks and blocks[-1].speed else None
+        if speed is None and result.stats.wall_time > 0:
+            speed = self.seconds / result.stats.wall_time
+        return {
+            "preset": preset,
+            "speed": round(speed, 3) if speed is not None else None,
+            "fps": blocks[-1].fps if blocks else None,
+            **result.stats.to_dict(),
+        }
+
+    async def calibrate(
+        self,
+        margin: float = CALIBRATION_MARGIN,
+        on_result: Callable[[dict], Awaitable[None]] | None = None,
+    ) -> dict:
+        results = []
+        for preset in X264_PRESETS:
+            result = await self.benchmark(preset)
+            logger.info("Preset %s encodes at %sx", preset, result["speed"])
+            results.append(result)
+            if on_result:
+                await on_result(result)
+            if result["speed"] is not None and result["speed"] < 1 + margin:
+                break
+
+        width, height = self.size
+        return {
+            "calibrated_at": datetime.now(timezone.utc).isoformat(),
+            "width": width,
+            "height": height,
+            "fps": self.fps,
+            "crf_quality": self.crf_quality,
+            "margin": margin,
+            "recommended": pick_preset(results, margin),
+            "results": results,
+        }
@@ -1,13 +1,103 @@
 import asyncio
 import logging
 import os
-import re
 import signal
+import time
+from collections import deque
 from collections.abc import Awaitable, Callable
 
+from digitizer.ffmpeg_runner import FFmpegProcess, FFmpegProgress, run_ffmpeg
+
 logger = logging.getLogger(__name__)
 
-TIME_PATTERN = re.compile(r"time=(\d{2}):(\d{2}):(\d{2})\.(\d{2})")
+# Low-res stream tee'd to stdout for live scene detection
+LIVE_ANALYSIS_SIZE = (256, 192)
+LIVE_ANALYSIS_FPS = 15.0
+LIVE_BATCH_FRAMES = 15
+# Batches held for a live analysis that falls behind; older ones are dropped
+LIVE_BUFFER_BATCHES = 8
+
+# Live preview: one small JPEG a second, overwritten in place
+PREVIEW_WIDTH = 320
+PREVIEW_FPS = 1
+
+# Encode speed is measured over this many seconds of wall time
+SPEED_WINDOW = 5.0
+# A capture slower than real time for this long raises a warning
+SLOW_WARNING_SECONDS = 10.0
+
+
+class CaptureHealth:
+    """Live encoder telemetry for a capture, fed from ffmpeg's progress blocks.
+
+    ``speed`` is encoded media time over wall time across the last
+    ``SPEED_WINDOW`` seconds. ``backlog`` is how many seconds of input the
+    encoder is behind real time, i.e. what is waiting in the capture queue.
+    """
+
+    def __init__(self):
+        self.speed: float | None = None
+        self.fps: float | None = None
+        self.drop_frames = 0
+        self.dup_frames = 0
+        self.backlog = 0.0
+        self.min_speed: float | None = None
+        self.slow_seconds = 0.0
+        self.warnings = 0
+        self.cpu_load: float | None = None  # CPU cores used by the capture process
+        self._samples: deque[tuple[float, float]] = deque()
+        self._origin: tuple[float, float] | None = None
+        self._slow_since: float | None = None
+        self._warned = False
+
+    def update(self, progress: FFmpegProgress, now: float | None = None) -> bool:
+        """Record one progress block; True when it starts a slow-capture warning."""
+        now = time.monotonic() if now is None else now
+        self.fps = progress.fps
+        self.drop_frames = progress.drop_frames
+        self.dup_frames = progress.dup_frames
+        if progress.out_time <= 0:
+            return False
+
+        if self._origin is None:
+            self._origin = (now, progress.out_time)
+        wall_start, media_start = self._origin
+        self.backlog = max(0.0, round((now - wall_start) - (progress.out_time - media_start), 3))
+
+        self._samples.append((now, progress.out_time))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= SPEED_WINDOW:
+            self._samples.popleft()
+        first_wall, first_media = self._samples[0]
+        if now - first_wall < SPEED_WINDOW / 2:
+            return False  # Too little history for a stable ratio
+        self.speed = round((progress.out_time - first_media) / (now - first_wall), 3)
+        self.min_speed = self.speed if self.min_speed is None else min(self.min_speed, self.speed)
+
+        if self.speed >= 1.0:
+            self._slow_since = None
+            self._warned = False
+            return False
+        if self._slow_since is None:
+            self._slow_since = now
+        self.slow_seconds = round(now - self._slow_since, 3)
+        if self.slow_seconds >= SLOW_WARNING_SECONDS and not self._warned:
+            self._warned = True
+            self.warnings += 1
+            return True
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "speed": self.speed,
+            "min_speed": self.min_speed,
+            "fps": self.fps,
+            "drop_frames": self.drop_frames,
+            "dup_frames": self.dup_frames,
+            "backlog": self.backlog,
+            "slow_seconds": self.slow_seconds,
+            "warnings": self.warnings,
+            "cpu_load": self.cpu_load,
+        }
 
 
 class VHSCapture:
@@ -17,11 +107,20 @@ class VHSCapture:
         encoding_preset: str = "fast",
         crf_quality: int = 23,
         audio_bitrate: str = "192k",
+        keyframe_interval: float = 2.0,
+        proxy_threads: int = 0,
+        master_threads: int = 0,
+        fragmented: bool = True,
     ):
         self.capture_device = capture_device
         self.encoding_preset = encoding_preset
         self.crf_quality = crf_quality
         self.audio_bitrate = audio_bitrate
+        self.keyframe_interval = keyframe_interval
+        # Encoder threads per output (0 lets ffmpeg decide)
+        self.proxy_threads = proxy_threads
+        self.master_threads = master_threads
+        self.fragmented = fragmented
         self._recording = False
         self._process: asyncio.subprocess.Process | None = None
         self._lock = asyncio.Lock()
@@ -34,8 +133,21 @@ class VHSCapture:
     def current_process(self) -> asyncio.subprocess.Process | None:
         return self._process
 
-    def build_ffmpeg_command(self, output_path: str) -> list[str]:
-        return [
+    def build_ffmpeg_command(
+        self,
+        output_path: str,
+        analysis: bool = False,
+        master_path: str | None = None,
+        preview_path: str | None = None,
+    ) -> list[str]:
+        """The capture command: the H.264 proxy at ``output_path``, plus an
+        FFV1/FLAC archival master at ``master_path`` and a live preview JPEG
+        at ``preview_path`` when given.
+
+        Every output is fed from the same decode of the capture device, so
+        the tape is only played once.
+        """
+        cmd = [
             "ffmpeg",
             "-y",
             "-f", "v4l2",
@@ -43,62 +155,239 @@ class VHSCapture:
             "-c:v", "libx264",
             "-preset", self.encoding_preset,
             "-crf", str(self.crf_quality),
+        ]
+        if self.keyframe_interval > 0:
+            # Keyframes at least every interval (the encoder still adds them at
+            # scene changes) so stream-copy cuts land predictably
+            cmd += ["-force_key_frames", f"expr:gte(t,n_forced*{self.keyframe_interval:g})"]
+        if self.proxy_threads > 0:
+            cmd += ["-threads", str(self.proxy_threads)]
+        if self.fragmented:
+            # A moof per keyframe: the file is playable up to the last fragment
+            # if the capture dies, and there is no faststart rewrite at the end
+            movflags = "+frag_keyframe+empty_moov+default_base_moof"
+        else:
+            movflags = "+faststart"
+        cmd += [
             "-c:a", "aac",
             "-b:a", self.audio_bitrate,
-            "-movflags", "+faststart",
+            "-movflags", movflags,
             output_path,
         ]
+        if master_path:
+            # FFV1 version 3, intra-only with per-slice CRCs so damage stays local
+            cmd += [
+                "-c:v", "ffv1",
+                "-level", "3",
+                "-g", "1",
+                "-slices", "16",
+                "-slicecrc", "1",
+            ]
+            if self.master_threads > 0:
+                cmd += ["-threads", str(self.master_threads)]
+            cmd += ["-c:a", "flac", master_path]
+        if preview_path:
+            # Frames are dropped to PREVIEW_FPS before scaling, so the preview
+            # costs one small JPEG encode a second
+            cmd += [
+                "-map", "0:v:0",
+                "-vf", f"fps={PREVIEW_FPS},scale={PREVIEW_WIDTH}:-2",
+                "-q:v", "5",
+                "-f", "image2",
+                "-update", "1",
+                "-atomic_writing", "1",
+                preview_path,
+            ]
+        if analysis:
+            width, height = LIVE_ANALYSIS_SIZE
+            cmd += [
+                "-map", "0:v:0",
+                "-vf", f"fps={LIVE_ANALYSIS_FPS},scale={width}:{height}",
+                "-pix_fmt", "bgr24",
+                "-f", "rawvideo",
+                "pipe:1",
+            ]
+        return cmd
 
-    def parse_elapsed_time(self, line: str) -> float | None:
-        match = TIME_PATTERN.search(line)
-        if not match:
-            return None
-        h, m, s, cs = match.groups()
-        return int(h) * 3600 + int(m) * 60 + int(s) + int(cs) / 100
+    def build_trim_command(self, input_path: str, duration: float, output_path: str) -> list[str]:
+        """Stream-copy the first ``duration`` seconds of a capture (or its master)."""
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-i", input_path,
+            "-map", "0",
+            "-c", "copy",
+            "-t", f"{duration:.3f}",
+        ]
+        if output_path.endswith(".mp4"):
+            if self.fragmented:
+                cmd += ["-movflags", "+frag_keyframe+empty_moov+default_base_moof"]
+            else:
+                cmd += ["-movflags", "+faststart"]
+        cmd.append(output_path)
+        return cmd
+
+    async def trim(self, path: str, duration: float) -> bool:
+        """Cut a finished capture down to its first ``duration`` seconds, in place."""
+        if duration <= 0:
+            logger.error("Refusing to trim %s to %.3fs", path, duration)
+            return False
+        base, ext = os.path.splitext(path)
+        tmp_path = f"{base}.trim{ext}"
+        result = await run_ffmpeg(self.build_trim_command(path, duration, tmp_path))
+        if not result.ok:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, path)
+        return True
 
     async def start(
         self,
         output_path: str,
         on_progress: Callable[[float, int], Awaitable[None]] | None = None,
+        on_frames: Callable[[bytes], Awaitable[None]] | None = None,
+        on_health: Callable[[CaptureHealth, bool], Awaitable[None]] | None = None,
+        master_path: str | None = None,
+        preview_path: str | None = None,
+        on_frames_dropped: Callable[[int], Awaitable[None]] | None = None,
     ) -> bool:
+        """Record until stopped.
+
+        With ``on_frames`` the capture also tees a low-res ``bgr24`` stream
+        (``LIVE_ANALYSIS_SIZE`` at ``LIVE_ANALYSIS_FPS``) and passes the raw
+        bytes to the callback in batches while recording. Batches an analysis
+        too slow to keep up never reaches are dropped; ``on_frames_dropped``
+        gets the number of frames skipped before the next batch delivered.
+
+        ``on_health`` gets the capture's :class:`CaptureHealth` after every
+        progress update, and whether that update raised a slow-capture warning.
+
+        With ``master_path`` an archival master is recorded alongside, and
+        with ``preview_path`` a JPEG of the current picture is kept there.
+        """
         async with self._lock:
             if self._recording:
                 raise RuntimeError("Already recording")
             self._recording = True
 
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        cmd = self.build_ffmpeg_command(output_path)
-        logger.info("Starting capture: %s", " ".join(cmd))
-
-        self._process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.PIPE,
+        if preview_path:
+            os.makedirs(os.path.dirname(preview_path), exist_ok=True)
+        cmd = self.build_ffmpeg_command(
+            output_path, analysis=on_frames is not None, master_path=master_path, preview_path=preview_path,
         )
 
-        try:
-            async for raw_line in self._process.stderr:
-                line = raw_line.decode("utf-8", errors="replace").strip()
-                if not line:
-                    continue
-                elapsed = self.parse_elapsed_time(line)
-                if elapsed is not None and on_progress:
+        health = CaptureHealth()
+
+        async def report(progress: FFmpegProgress):
+            warning = health.update(progress)
+            if runner.stats.wall_time > 0:
+                health.cpu_load = round(runner.stats.cpu_time / runner.stats.wall_time, 2)
+            if warning:
+                logger.warning(
+                    "Capture below real time for %.0fs (speed %.2fx, %d frames dropped)",
+                    health.slow_seconds, health.speed, health.drop_frames,
+                )
+            if on_health:
+                await on_health(health, warning)
+            if not on_progress:
+                return
+            file_size = progress.total_size
+            if file_size is None:
+                try:
+                    file_size = os.path.getsize(output_path)
+                except OSError:
                     file_size = 0
-                    if os.path.exists(output_path):
-                        try:
-                            file_size = os.path.getsize(output_path)
-                        except OSError:
-                            pass
-                    await on_progress(elapsed, file_size)
-
-            await self._process.wait()
-            success = self._process.returncode == 0 or self._process.returncode == -2  # SIGINT
-            return success
+            await on_progress(progress.out_time, file_size)
+
+        runner = FFmpegProcess(cmd, on_progress=report, stdout_pipe=on_frames is not None)
+        pump = None
+        try:
+            self._process = await runner.start()
+            if on_frames:
+                pump = asyncio.create_task(self._pump_frames(runner.stdout, on_frames, on_frames_dropped))
+
+            result = await runner.wait()
+            if pump:
+                await pump
+            return result.returncode == 0 or result.returncode == -2  # SIGINT
         finally:
             async with self._lock:
                 self._recording = False
                 self._process = None
 
+    async def _pump_frames(
+        self,
+        stream: asyncio.StreamReader,
+        on_frames: Callable[[bytes], Awaitable[None]],
+        on_frames_dropped: Callable[[int], Awaitable[None]] | None = None,
+    ):
+        """Drain the analysis stream at the capture's pace.
+
+        ffmpeg blocks once the stdout pipe is full, so the pipe is read
+        independently of the analysis into at most ``LIVE_BUFFER_BATCHES``
+        batches; when the analysis falls further behind the oldest batch is
+        dropped and its frames are counted against the next one delivered.
+        """
+        width, height = LIVE_ANALYSIS_SIZE
+        frame_size = width * height * 3
+        chunk = frame_size * LIVE_BATCH_FRAMES
+        # (frames dropped just before, batch)
+        pending: deque[tuple[int, bytes]] = deque()
+        ready = asyncio.Event()
+        done = False
+        dropped = 0
+
+        async def analyze():
+            while True:
+                while not pending:
+                    if done:
+                        return
+                    ready.clear()
+                    await ready.wait()
+                skipped, data = pending.popleft()
+                try:
+                    if skipped and on_frames_dropped:
+                        await on_frames_dropped(skipped)
+                    await on_frames(data)
+                except Exception:
+                    # The reader keeps draining the pipe so a failing analysis never stalls the recording
+                    logger.exception("Live analysis failed; continuing capture without it")
+                    pending.clear()
+                    return
+
+        analysis = asyncio.create_task(analyze())
+        try:
+            while True:
+                try:
+                    data = await stream.readexactly(chunk)
+                except asyncio.IncompleteReadError as e:
+                    data = e.partial
+                if not data:
+                    break
+                if not analysis.done():
+                    carried = 0
+                    if len(pending) >= LIVE_BUFFER_BATCHES:
+                        skipped, oldest = pending.popleft()
+                        carried = skipped + len(oldest) // frame_size
+                        dropped += len(oldest) // frame_size
+                        if pending:
+                            skipped, head = pending[0]
+                            pending[0] = (skipped + carried, head)
+                            carried = 0
+                    pending.append((carried, data))
+                    ready.set()
+                if len(data) < chunk:
+                    break
+            done = True
+            ready.set()
+            await analysis
+        finally:
+            analysis.cancel()
+        if dropped:
+            logger.warning("Live analysis fell behind the capture; %d frames were not analyzed", dropped)
+
     async def stop(self):
         async with self._lock:
             if not self._recording or self._process is None:
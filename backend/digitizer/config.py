@@ -7,12 +7,23 @@ class Settings(BaseSettings):
     naming_pattern: str = "YYYY-MM-DD_rip_NNN"
     auto_eject: bool = True
     drive_device: str = "/dev/sr0"
+    drive_devices: str = ""
+    rip_mode: str = "stream"
+    scratch_path: str = ""
+    remux_workers: int = 2
     capture_device: str = "/dev/video0"
     poll_interval: float = 2.0
+    tray_poll_interval: float = 0.5
     db_path: str = "/data/digitizer.db"
     encoding_preset: str = "fast"
     crf_quality: int = 23
     audio_bitrate: str = "192k"
+    scene_workers: int = 1
+    scene_chunk_overlap: float = 10.0
+    scene_engine: str = "pyscenedetect"
+    keyframe_interval: float = 2.0
+    proxy_threads: int = 0
+    master_threads: int = 0
 
     model_config = {"env_prefix": "DIGITIZER_"}
 
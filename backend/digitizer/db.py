@@ -36,6 +36,22 @@ class Database:
             INSERT OR IGNORE INTO settings (key, value) VALUES ('encoding_preset', 'fast');
             INSERT OR IGNORE INTO settings (key, value) VALUES ('crf_quality', '23');
             INSERT OR IGNORE INTO settings (key, value) VALUES ('audio_bitrate', '192k');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('live_analysis', 'false');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('archival_master', 'false');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('live_preview', 'true');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('end_of_tape', 'off');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('end_of_tape_seconds', '60');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('transcode_after_capture', 'false');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('transcode_keep_original', 'false');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('transcode_preset', 'slow');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('transcode_crf', '23');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('transcode_deinterlace', 'false');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('transcode_denoise', 'false');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('split_concurrency', '4');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('split_mode', 'per_scene');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('duplicate_discs', 'missing');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('rip_titles', 'main');
+            INSERT OR IGNORE INTO settings (key, value) VALUES ('min_title_length', '300');
 
             CREATE TABLE IF NOT EXISTS scenes (
                 id TEXT PRIMARY KEY,
@@ -48,6 +64,36 @@ class Database:
                 split_path TEXT,
                 created_at TEXT NOT NULL DEFAULT (datetime('now'))
             );
+
+            CREATE TABLE IF NOT EXISTS keyframes (
+                job_id TEXT NOT NULL,
+                pts_time REAL NOT NULL,
+                pos INTEGER,
+                packets INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_keyframes_job ON keyframes (job_id, pts_time);
+
+            CREATE TABLE IF NOT EXISTS discs (
+                fingerprint TEXT PRIMARY KEY,
+                disc_title TEXT NOT NULL DEFAULT '',
+                disc_info TEXT NOT NULL DEFAULT '{}',
+                job_id TEXT,
+                first_seen TEXT NOT NULL DEFAULT (datetime('now')),
+                last_seen TEXT NOT NULL DEFAULT (datetime('now'))
+            );
+            CREATE TABLE IF NOT EXISTS disc_titles (
+                fingerprint TEXT NOT NULL,
+                title_number INTEGER NOT NULL,
+                job_id TEXT NOT NULL,
+                PRIMARY KEY (fingerprint, title_number)
+            );
+
+            CREATE TABLE IF NOT EXISTS calibrations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                result TEXT NOT NULL
+            );
             """
         )
         # Add columns if they don't exist (safe for existing DBs)
@@ -59,6 +105,42 @@ class Database:
             await self._conn.execute("ALTER TABLE jobs ADD COLUMN scene_count INTEGER")
         except Exception:
             pass  # Column already exists
+        try:
+            await self._conn.execute("ALTER TABLE scenes ADD COLUMN split_key TEXT")
+        except Exception:
+            pass  # Column already exists
+        try:
+            await self._conn.execute("ALTER TABLE jobs ADD COLUMN stage_timings TEXT")
+        except Exception:
+            pass  # Column already exists
+        try:
+            await self._conn.execute("ALTER TABLE jobs ADD COLUMN parent_id TEXT")
+        except Exception:
+            pass  # Column already exists
+        try:
+            await self._conn.execute("ALTER TABLE jobs ADD COLUMN capture_health TEXT")
+        except Exception:
+            pass  # Column already exists
+        try:
+            await self._conn.execute("ALTER TABLE jobs ADD COLUMN master_path TEXT")
+        except Exception:
+            pass  # Column already exists
+        try:
+            await self._conn.execute("ALTER TABLE jobs ADD COLUMN stop_reason TEXT")
+        except Exception:
+            pass  # Column already exists
+        try:
+            await self._conn.execute("ALTER TABLE jobs ADD COLUMN transcode_status TEXT")
+        except Exception:
+            pass  # Column already exists
+        try:
+            await self._conn.execute("ALTER TABLE jobs ADD COLUMN transcode TEXT")
+        except Exception:
+            pass  # Column already exists
+        try:
+            await self._conn.execute("ALTER TABLE jobs ADD COLUMN capture_fragmented INTEGER")
+        except Exception:
+            pass  # Column already exists
         await self._conn.commit()
 
     async def close(self):
@@ -66,11 +148,12 @@ class Database:
             await self._conn.close()
 
     async def create_job(
-        self, job_id: str, source_type: str, disc_info: dict, output_path: str | None = None
+        self, job_id: str, source_type: str, disc_info: dict, output_path: str | None = None,
+        parent_id: str | None = None,
     ):
         await self._conn.execute(
-            "INSERT INTO jobs (id, source_type, disc_info, output_path) VALUES (?, ?, ?, ?)",
-            (job_id, source_type, json.dumps(disc_info), output_path),
+            "INSERT INTO jobs (id, source_type, disc_info, output_path, parent_id) VALUES (?, ?, ?, ?, ?)",
+            (job_id, source_type, json.dumps(disc_info), output_path, parent_id),
         )
         await self._conn.commit()
 
@@ -79,32 +162,44 @@ class Database:
         row = await cursor.fetchone()
         if row is None:
             return None
-        job = dict(row)
-        job["disc_info"] = json.loads(job["disc_info"])
-        return job
+        return self._job_row(row)
 
-    async def list_jobs(self, limit: int = 10, offset: int = 0, source_type: str | None = None) -> list[dict]:
+    async def list_jobs(
+        self, limit: int = 10, offset: int = 0, source_type: str | None = None, parent_id: str | None = None,
+        status: str | None = None,
+    ) -> list[dict]:
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
         if source_type:
-            cursor = await self._conn.execute(
-                "SELECT * FROM jobs WHERE source_type = ? ORDER BY started_at DESC LIMIT ? OFFSET ?",
-                (source_type, limit, offset),
-            )
-        else:
-            cursor = await self._conn.execute(
-                "SELECT * FROM jobs ORDER BY started_at DESC LIMIT ? OFFSET ?",
-                (limit, offset),
-            )
+            conditions.append("source_type = ?")
+            params.append(source_type)
+        if parent_id:
+            conditions.append("parent_id = ?")
+            params.append(parent_id)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        cursor = await self._conn.execute(
+            f"SELECT * FROM jobs {where}ORDER BY started_at DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        )
         rows = await cursor.fetchall()
-        jobs = []
-        for row in rows:
-            job = dict(row)
-            job["disc_info"] = json.loads(job["disc_info"])
-            jobs.append(job)
-        return jobs
+        return [self._job_row(row) for row in rows]
+
+    def _job_row(self, row) -> dict:
+        job = dict(row)
+        job["disc_info"] = json.loads(job["disc_info"])
+        for column in ("stage_timings", "capture_health", "transcode"):
+            if job.get(column):
+                job[column] = json.loads(job[column])
+        return job
 
     async def update_job(self, job_id: str, **kwargs):
-        allowed = {"status", "progress", "output_path", "file_size", "completed_at", "error", "analysis_status", "scene_count"}
+        allowed = {"status", "progress", "output_path", "master_path", "file_size", "completed_at", "error", "analysis_status", "scene_count", "stage_timings", "capture_health", "stop_reason", "transcode_status", "transcode", "capture_fragmented"}
         fields = {k: v for k, v in kwargs.items() if k in allowed}
+        for column in ("stage_timings", "capture_health", "transcode"):
+            if column in fields:
+                fields[column] = json.dumps(fields[column])
         if not fields:
             return
         set_clause = ", ".join(f"{k} = ?" for k in fields)
@@ -144,11 +239,12 @@ class Database:
         self, scene_id: str, job_id: str, scene_index: int,
         start_time: float, end_time: float, duration: float,
         thumbnail_path: str | None = None, split_path: str | None = None,
+        split_key: str | None = None,
     ):
         await self._conn.execute(
-            """INSERT INTO scenes (id, job_id, scene_index, start_time, end_time, duration, thumbnail_path, split_path)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (scene_id, job_id, scene_index, start_time, end_time, duration, thumbnail_path, split_path),
+            """INSERT INTO scenes (id, job_id, scene_index, start_time, end_time, duration, thumbnail_path, split_path, split_key)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (scene_id, job_id, scene_index, start_time, end_time, duration, thumbnail_path, split_path, split_key),
         )
         await self._conn.commit()
 
@@ -163,8 +259,12 @@ class Database:
         await self._conn.execute("DELETE FROM scenes WHERE job_id = ?", (job_id,))
         await self._conn.commit()
 
+    async def delete_scene(self, scene_id: str):
+        await self._conn.execute("DELETE FROM scenes WHERE id = ?", (scene_id,))
+        await self._conn.commit()
+
     async def update_scene(self, scene_id: str, **kwargs):
-        allowed = {"split_path", "thumbnail_path", "start_time", "end_time", "duration", "scene_index"}
+        allowed = {"split_path", "split_key", "thumbnail_path", "start_time", "end_time", "duration", "scene_index"}
         fields = {k: v for k, v in kwargs.items() if k in allowed}
         if not fields:
             return
@@ -173,9 +273,68 @@ class Database:
         await self._conn.execute(f"UPDATE scenes SET {set_clause} WHERE id = ?", values)
         await self._conn.commit()
 
+    async def replace_keyframes(self, job_id: str, keyframes: list[dict]):
+        await self._conn.execute("DELETE FROM keyframes WHERE job_id = ?", (job_id,))
+        await self._conn.executemany(
+            "INSERT INTO keyframes (job_id, pts_time, pos, packets, size) VALUES (?, ?, ?, ?, ?)",
+            [(job_id, kf["pts_time"], kf["pos"], kf["packets"], kf["size"]) for kf in keyframes],
+        )
+        await self._conn.commit()
+
+    async def list_keyframes(self, job_id: str) -> list[dict]:
+        cursor = await self._conn.execute(
+            "SELECT pts_time, pos, packets, size FROM keyframes WHERE job_id = ? ORDER BY pts_time",
+            (job_id,),
+        )
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+    async def get_disc(self, fingerprint: str) -> dict | None:
+        cursor = await self._conn.execute("SELECT * FROM discs WHERE fingerprint = ?", (fingerprint,))
+        row = await cursor.fetchone()
+        if row is None:
+            return None
+        disc = dict(row)
+        disc["disc_info"] = json.loads(disc["disc_info"])
+        cursor = await self._conn.execute(
+            "SELECT title_number, job_id FROM disc_titles WHERE fingerprint = ? ORDER BY title_number",
+            (fingerprint,),
+        )
+        disc["titles"] = {r["title_number"]: r["job_id"] for r in await cursor.fetchall()}
+        return disc
+
+    async def save_disc(self, fingerprint: str, disc_info: dict, job_id: str | None = None):
+        """Insert or refresh a disc; ``job_id`` (if given) becomes its latest job."""
+        await self._conn.execute(
+            """INSERT INTO discs (fingerprint, disc_title, disc_info, job_id) VALUES (?, ?, ?, ?)
+               ON CONFLICT (fingerprint) DO UPDATE SET
+                   disc_info = excluded.disc_info,
+                   job_id = COALESCE(excluded.job_id, discs.job_id),
+                   last_seen = datetime('now')""",
+            (fingerprint, disc_info.get("disc_title", ""), json.dumps(disc_info), job_id),
+        )
+        await self._conn.commit()
+
+    async def record_disc_title(self, fingerprint: str, title_number: int, job_id: str):
+        await self._conn.execute(
+            "INSERT OR REPLACE INTO disc_titles (fingerprint, title_number, job_id) VALUES (?, ?, ?)",
+            (fingerprint, title_number, job_id),
+        )
+        await self._conn.commit()
+
+    async def save_calibration(self, result: dict):
+        await self._conn.execute("INSERT INTO calibrations (result) VALUES (?)", (json.dumps(result),))
+        await self._conn.commit()
+
+    async def get_calibration(self) -> dict | None:
+        """The most recent encoder calibration."""
+        cursor = await self._conn.execute("SELECT result FROM calibrations ORDER BY id DESC LIMIT 1")
+        row = await cursor.fetchone()
+        return json.loads(row["result"]) if row else None
+
     async def get_next_sequence(self, date_str: str) -> int:
         cursor = await self._conn.execute(
-            "SELECT COUNT(*) as cnt FROM jobs WHERE output_path LIKE ?",
+            "SELECT COUNT(*) as cnt FROM jobs WHERE output_path LIKE ? AND parent_id IS NULL",
             (f"%{date_str}%",),
         )
         row = await cursor.fetchone()
@@ -1,22 +1,95 @@
+import abc
 import asyncio
+import fcntl
+import hashlib
+import json
 import logging
+import os
 import re
+import time
 
 from digitizer.models import DriveStatus
 
 logger = logging.getLogger(__name__)
 
 TITLE_PATTERN = re.compile(
-    r"Title:\s*(\d+),\s*Length:\s*(\d{2}):(\d{2}):(\d{2})"
+    r"Title:\s*(\d+),\s*Length:\s*(\d{2}):(\d{2}):(\d{2})(\.\d+)?(.*)"
 )
 LONGEST_PATTERN = re.compile(r"Longest track:\s*(\d+)")
+DISC_TITLE_PATTERN = re.compile(r"Disc Title:\s*(.*)")
+TITLE_FIELDS = {
+    "chapters": re.compile(r"Chapters:\s*(\d+)"),
+    "cells": re.compile(r"Cells:\s*(\d+)"),
+    "audio_streams": re.compile(r"Audio streams:\s*(\d+)"),
+    "subpictures": re.compile(r"Subpictures:\s*(\d+)"),
+}
+
+# linux/cdrom.h
+CDROM_DRIVE_STATUS = 0x5326
+CDSL_CURRENT = 0x7FFFFFFF
+CDS_NO_INFO = 0
+CDS_NO_DISC = 1
+CDS_TRAY_OPEN = 2
+CDS_DRIVE_NOT_READY = 3
+CDS_DISC_OK = 4
+
+# lsdvd can fail on a disc that is still spinning up; retry after these
+# seconds, doubling up to the maximum, until the disc is read or removed
+LSDVD_RETRY_INITIAL = 2.0
+LSDVD_RETRY_MAX = 60.0
+
+
+def disc_fingerprint(disc_title: str, titles: list[dict]) -> str:
+    """Identity of a disc from its lsdvd structure: name plus the full title table."""
+    canonical = json.dumps({"disc_title": disc_title, "titles": titles}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class StatusSource(abc.ABC):
+    """Cheap tray/media state for a drive, checked before running lsdvd."""
+
+    @abc.abstractmethod
+    async def drive_status(self) -> int | None:
+        """One of the ``CDS_*`` values, or None if the state cannot be read."""
+
+
+class IoctlStatusSource(StatusSource):
+    """Reads the tray state with the CDROM_DRIVE_STATUS ioctl.
+
+    Unlike lsdvd this neither spawns a process nor spins up the disc. Devices
+    that are not optical drives (ISO files, VIDEO_TS directories) return None.
+    """
+
+    def __init__(self, device: str):
+        self.device = device
+
+    def read(self) -> int | None:
+        try:
+            fd = os.open(self.device, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            return None
+        try:
+            return fcntl.ioctl(fd, CDROM_DRIVE_STATUS, CDSL_CURRENT)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+
+    async def drive_status(self) -> int | None:
+        return self.read()
 
 
 class DriveMonitor:
-    def __init__(self, device: str = "/dev/sr0"):
+    def __init__(self, device: str = "/dev/sr0", status_source: StatusSource | None = None):
         self.device = device
         self.status = DriveStatus.EMPTY
+        self.status_source = status_source or IoctlStatusSource(device)
         self._disc_present = False
+        # Set once lsdvd has read the media currently in the drive
+        self._media_checked = False
+        self._retry_delay = LSDVD_RETRY_INITIAL
+        self._retry_at = 0.0
+        self._tray_state: int | None = None
 
     async def check_disc(self) -> dict | None:
         try:
@@ -39,7 +112,14 @@ class DriveMonitor:
             num = int(match.group(1))
             h, m, s = int(match.group(2)), int(match.group(3)), int(match.group(4))
             duration = h * 3600 + m * 60 + s
-            titles.append({"number": num, "duration": float(duration)})
+            title = {"number": num, "duration": float(duration)}
+            if match.group(5):
+                title["length"] = f"{match.group(2)}:{match.group(3)}:{match.group(4)}{match.group(5)}"
+            for field, pattern in TITLE_FIELDS.items():
+                field_match = pattern.search(match.group(6))
+                if field_match:
+                    title[field] = int(field_match.group(1))
+            titles.append(title)
 
         longest_match = LONGEST_PATTERN.search(output)
         main_title = int(longest_match.group(1)) if longest_match else (
@@ -50,13 +130,51 @@ class DriveMonitor:
             (t["duration"] for t in titles if t["number"] == main_title), 0.0
         )
 
+        disc_title_match = DISC_TITLE_PATTERN.search(output)
+        disc_title = disc_title_match.group(1).strip() if disc_title_match else ""
+
         return {
             "title_count": len(titles),
             "main_title": main_title,
             "duration": main_duration,
+            "disc_title": disc_title,
+            "titles": titles,
+            "fingerprint": disc_fingerprint(disc_title, titles),
         }
 
+    @property
+    def event_driven(self) -> bool:
+        """True when the tray state is readable, so polling is cheap."""
+        return self._tray_state not in (None, CDS_NO_INFO)
+
     async def poll_once(self) -> tuple[DriveStatus, dict | None]:
+        self._tray_state = await self.status_source.drive_status()
+        if not self.event_driven:
+            return await self._poll_lsdvd()
+
+        if self._tray_state != CDS_DISC_OK:
+            self._media_checked = False
+            self._retry_delay = LSDVD_RETRY_INITIAL
+            self._retry_at = 0.0
+            if self._disc_present:
+                self._disc_present = False
+                self.status = DriveStatus.EMPTY
+            return self.status, None
+
+        # Media present: run lsdvd until it reads the disc, once per insertion
+        if self._media_checked or time.monotonic() < self._retry_at:
+            return self.status, None
+        disc_info = await self.check_disc()
+        if disc_info is None:
+            self._retry_at = time.monotonic() + self._retry_delay
+            self._retry_delay = min(self._retry_delay * 2, LSDVD_RETRY_MAX)
+            return self.status, None
+        self._media_checked = True
+        self._disc_present = True
+        self.status = DriveStatus.DISC_DETECTED
+        return self.status, disc_info
+
+    async def _poll_lsdvd(self) -> tuple[DriveStatus, dict | None]:
         disc_info = await self.check_disc()
         old_status = self.status
 
@@ -0,0 +1,54 @@
+"""Optical drives: each drive has its own monitor, ripper and rip pipeline."""
+import os
+
+from digitizer.drive_monitor import DriveMonitor
+from digitizer.models import DriveStatus
+from digitizer.pipeline import RipPipeline
+from digitizer.ripper import DVDRipper
+
+
+class Drive:
+    def __init__(
+        self,
+        drive_id: str,
+        device: str,
+        monitor: DriveMonitor,
+        ripper: DVDRipper,
+        pipeline: RipPipeline | None = None,
+    ):
+        self.id = drive_id
+        self.device = device
+        self.monitor = monitor
+        self.ripper = ripper
+        self.pipeline = pipeline
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "device": self.device, "status": self.monitor.status.value}
+
+
+def parse_drive_devices(value: str) -> list[str]:
+    """Split a comma-separated ``DIGITIZER_DRIVE_DEVICES`` value."""
+    return [device.strip() for device in value.split(",") if device.strip()]
+
+
+def drive_ids(devices: list[str]) -> list[str]:
+    """Short ids for drives (``/dev/sr0`` -> ``sr0``), suffixed when names repeat."""
+    ids = []
+    for device in devices:
+        base = os.path.basename(device.rstrip("/")) or "drive"
+        drive_id = base
+        n = 2
+        while drive_id in ids:
+            drive_id = f"{base}-{n}"
+            n += 1
+        ids.append(drive_id)
+    return ids
+
+
+def aggregate_status(drives: list[Drive]) -> DriveStatus:
+    """The busiest state across all drives, for clients that show a single status."""
+    statuses = {drive.monitor.status for drive in drives}
+    for status in (DriveStatus.RIPPING, DriveStatus.DISC_DETECTED):
+        if status in statuses:
+            return status
+    return DriveStatus.EMPTY
@@ -0,0 +1,137 @@
+"""Spotting the end of a tape in a running capture.
+
+Frames from the capture's low-res analysis stream are classified with cheap
+per-frame statistics: a flat picture (the VCR's blue screen, black or any
+other solid colour once the signal drops) has almost no spatial variance,
+and snow from blank tape has plenty of variance but no correlation between
+neighbouring lines. A long enough run of such frames means the tape has
+ended. The run only counts once the tape has shown some content, so a
+blue screen before play is pressed never stops the capture.
+"""
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+END_OF_TAPE_MODES = ("off", "stop", "trim")
+
+# Luma standard deviation below which a frame is a flat field
+FLAT_STD = 6.0
+# Mean blue this far above red and green makes a flat field the VCR blue screen
+BLUE_MARGIN = 60.0
+# Snow: textured, but neighbouring lines are barely correlated
+STATIC_MIN_STD = 12.0
+STATIC_MAX_LINE_CORRELATION = 0.4
+
+NO_SIGNAL = "no_signal"
+BLUE_SCREEN = "blue_screen"
+STATIC = "static"
+
+
+def classify_frames(frames: np.ndarray) -> list[str | None]:
+    """Per ``bgr24`` frame: why it has no content, or None if it has some."""
+    frames = frames.astype(np.float32)
+    b, g, r = frames[..., 0], frames[..., 1], frames[..., 2]
+    luma = 0.114 * b + 0.587 * g + 0.299 * r
+    n = len(frames)
+    flat = luma.reshape(n, -1)
+    std = flat.std(axis=1)
+
+    # Correlation between vertically adjacent pixels: 1 - var(diff) / (2 var)
+    line_diff = (luma[:, 1:, :] - luma[:, :-1, :]).reshape(n, -1)
+    variance = np.maximum(std ** 2, 1e-6)
+    line_correlation = 1.0 - line_diff.var(axis=1) / (2 * variance)
+
+    mean_b = b.reshape(n, -1).mean(axis=1)
+    mean_rg = np.maximum(g.reshape(n, -1).mean(axis=1), r.reshape(n, -1).mean(axis=1))
+
+    reasons: list[str | None] = []
+    for i in range(n):
+        if std[i] < FLAT_STD:
+            reasons.append(BLUE_SCREEN if mean_b[i] - mean_rg[i] > BLUE_MARGIN else NO_SIGNAL)
+        elif std[i] > STATIC_MIN_STD and line_correlation[i] < STATIC_MAX_LINE_CORRELATION:
+            reasons.append(STATIC)
+        else:
+            reasons.append(None)
+    return reasons
+
+
+class EndOfTapeDetector:
+    """Watches a capture's analysis frames for a sustained lack of content.
+
+    ``on_end`` is called once, with the dominant reason and the capture time
+    (seconds) where the content stopped, when no content has been seen for
+    ``timeout`` seconds after some was.
+    """
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        fps: float,
+        timeout: float,
+        on_end: Callable[[str, float], Awaitable[None]] | None = None,
+    ):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.timeout = timeout
+        self.on_end = on_end
+        self.frame_count = 0
+        self.reason: str | None = None
+        self.content_end: float | None = None
+        self._frame_size = width * height * 3
+        self._buffer = bytearray()
+        self._run_start: int | None = None
+        self._run_reasons: dict[str, int] = {}
+        self._seen_content = False
+
+    @property
+    def ended(self) -> bool:
+        return self.reason is not None
+
+    async def skip(self, frames: int) -> None:
+        """Account for ``frames`` the capture dropped before analysis.
+
+        Nothing is known about them, so they end any run without content:
+        a capture is never stopped on frames that were not looked at.
+        """
+        self._buffer.clear()
+        self._run_start = None
+        self._run_reasons = {}
+        self.frame_count += frames
+
+    async def feed(self, data: bytes) -> None:
+        if self.ended:
+            return
+        self._buffer += data
+        usable = len(self._buffer) - len(self._buffer) % self._frame_size
+        if not usable:
+            return
+        frames = np.frombuffer(bytes(self._buffer[:usable]), np.uint8).reshape(
+            -1, self.height, self.width, 3
+        )
+        del self._buffer[:usable]
+        reasons = await asyncio.to_thread(classify_frames, frames)
+
+        for reason in reasons:
+            if reason is None:
+                self._seen_content = True
+                self._run_start = None
+                self._run_reasons = {}
+            elif self._seen_content:
+                if self._run_start is None:
+                    self._run_start = self.frame_count
+                self._run_reasons[reason] = self._run_reasons.get(reason, 0) + 1
+            self.frame_count += 1
+
+            if self._run_start is not None and (self.frame_count - self._run_start) / self.fps >= self.timeout:
+                self.reason = max(self._run_reasons, key=self._run_reasons.get)
+                self.content_end = round(self._run_start / self.fps, 3)
+                logger.info("End of tape (%s) from %.1fs", self.reason, self.content_end)
+                if self.on_end:
+                    await self.on_end(self.reason, self.content_end)
+                return
@@ -0,0 +1,307 @@
+"""Shared runner for ffmpeg processes.
+
+Progress comes from ffmpeg's machine-readable ``-progress`` output instead of
+scraping stderr, stderr is kept in a bounded ring buffer for error reports,
+and every run records its wall time, CPU time and peak RSS.
+"""
+import asyncio
+import logging
+import os
+import signal
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+STDERR_LINES = 50
+# Seconds an interrupted ffmpeg gets to finalize its output before it is killed
+TERMINATE_GRACE = 5.0
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _parse_speed(value: str) -> float | None:
+    try:
+        return float(value.rstrip("x"))
+    except ValueError:
+        return None
+
+
+def _parse_int(value: str) -> int | None:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _parse_float(value: str) -> float | None:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class FFmpegProgress:
+    """One ``-progress`` block (ffmpeg writes one roughly every half second)."""
+
+    def __init__(self, fields: dict[str, str]):
+        out_time_us = _parse_int(fields.get("out_time_us", ""))
+        self.out_time = out_time_us / 1_000_000 if out_time_us and out_time_us > 0 else 0.0
+        self.speed = _parse_speed(fields.get("speed", ""))
+        self.fps = _parse_float(fields.get("fps", ""))
+        self.frame = _parse_int(fields.get("frame", ""))
+        self.drop_frames = _parse_int(fields.get("drop_frames", "")) or 0
+        self.dup_frames = _parse_int(fields.get("dup_frames", "")) or 0
+        self.total_size = _parse_int(fields.get("total_size", ""))
+        self.done = fields.get("progress") == "end"
+
+
+class ProcessStats:
+    """Resources used by one process, sampled from /proc while it runs."""
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_rss = 0  # bytes
+
+    def sample(self, pid: int):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # Fields after the command name; utime and stime are the 12th and 13th
+                fields = f.read().rsplit(")", 1)[1].split()
+            self.cpu_time = max(self.cpu_time, (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS)
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        self.peak_rss = max(self.peak_rss, int(line.split()[1]) * 1024)
+                        break
+        except (OSError, IndexError, ValueError):
+            pass
+
+    def to_dict(self) -> dict:
+        return {
+            "wall_time": round(self.wall_time, 3),
+            "cpu_time": round(self.cpu_time, 3),
+            "peak_rss": self.peak_rss,
+        }
+
+
+class FFmpegResult:
+    def __init__(
+        self,
+        returncode: int | None,
+        stats: ProcessStats,
+        stderr: list[str],
+        timed_out: bool = False,
+        cancelled: bool = False,
+    ):
+        self.returncode = returncode
+        self.stats = stats
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.cancelled = cancelled
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out and not self.cancelled
+
+
+class FFmpegProcess:
+    """An ffmpeg process with parsed progress, bounded stderr and resource stats.
+
+    Progress is read from stdout (``-progress pipe:1``) unless the caller
+    needs stdout itself (``stdout_pipe``), in which case it comes through an
+    extra pipe passed to ffmpeg as its own file descriptor. ``stdout_buffer``
+    sets how many bytes of that stdout are read ahead of the caller. A
+    positive ``niceness`` lowers the process's CPU priority once it has
+    started.
+    """
+
+    def __init__(
+        self,
+        cmd: list[str],
+        on_progress: Callable[[FFmpegProgress], Awaitable[None]] | None = None,
+        stdout_pipe: bool = False,
+        timeout: float | None = None,
+        stderr_lines: int = STDERR_LINES,
+        niceness: int = 0,
+        stdout_buffer: int | None = None,
+    ):
+        self.cmd = cmd
+        self.on_progress = on_progress
+        self.stdout_pipe = stdout_pipe
+        self.timeout = timeout
+        self.niceness = niceness
+        self.stdout_buffer = stdout_buffer
+        self.paused = False
+        self.stderr = deque(maxlen=stderr_lines)
+        self.stats = ProcessStats()
+        self.process: asyncio.subprocess.Process | None = None
+        self._readers: list[asyncio.Task] = []
+        self._started = 0.0
+        self._cancelled = False
+
+    @property
+    def stdout(self) -> asyncio.StreamReader | None:
+        """ffmpeg's stdout when started with ``stdout_pipe``."""
+        return self.process.stdout if self.stdout_pipe and self.process else None
+
+    async def start(self) -> asyncio.subprocess.Process:
+        kwargs = {}
+        if self.stdout_pipe:
+            read_fd, write_fd = os.pipe()
+            progress_url = f"pipe:{write_fd}"
+            kwargs["pass_fds"] = (write_fd,)
+            if self.stdout_buffer:
+                kwargs["limit"] = self.stdout_buffer
+        else:
+            progress_url = "pipe:1"
+        cmd = [self.cmd[0], "-progress", progress_url, "-nostats", *self.cmd[1:]]
+        logger.info("Running: %s", " ".join(self.cmd))
+
+        self._started = time.monotonic()
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                **kwargs,
+            )
+        except BaseException:
+            if self.stdout_pipe:
+                os.close(read_fd)
+            raise
+        finally:
+            if self.stdout_pipe:
+                os.close(write_fd)
+
+        if self.niceness and isinstance(self.process.pid, int):
+            try:
+                os.setpriority(os.PRIO_PROCESS, self.process.pid, self.niceness)
+            except OSError as e:
+                logger.warning("Could not lower the priority of ffmpeg: %s", e)
+
+        if self.stdout_pipe:
+            progress_stream = await self._open_pipe(read_fd)
+        else:
+            progress_stream = self.process.stdout
+        self._readers = [
+            asyncio.create_task(self._read_progress(progress_stream)),
+            asyncio.create_task(self._read_stderr(self.process.stderr)),
+        ]
+        return self.process
+
+    async def _open_pipe(self, fd: int) -> asyncio.StreamReader:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", buffering=0)
+        )
+        return reader
+
+    def _sample(self):
+        self.stats.wall_time = time.monotonic() - self._started
+        if isinstance(self.process.pid, int):
+            self.stats.sample(self.process.pid)
+
+    async def _read_progress(self, stream):
+        fields: dict[str, str] = {}
+        async for raw_line in stream:
+            key, _, value = raw_line.decode("utf-8", errors="replace").strip().partition("=")
+            if not key:
+                continue
+            fields[key] = value.strip()
+            if key != "progress":
+                continue
+            progress = FFmpegProgress(fields)
+            fields = {}
+            self._sample()
+            if self.on_progress:
+                try:
+                    await self.on_progress(progress)
+                except Exception:
+                    logger.exception("Progress callback failed")
+
+    async def _read_stderr(self, stream):
+        async for raw_line in stream:
+            line = raw_line.decode("utf-8", errors="replace").strip()
+            if line:
+                self.stderr.append(line)
+
+    def pause(self):
+        """Suspend the process (SIGSTOP) until :meth:`resume`."""
+        if self.process and self.process.returncode is None and not self.paused:
+            self.process.send_signal(signal.SIGSTOP)
+            self.paused = True
+
+    def resume(self):
+        if self.process and self.paused:
+            self.paused = False
+            if self.process.returncode is None:
+                self.process.send_signal(signal.SIGCONT)
+
+    def interrupt(self):
+        """Ask ffmpeg to stop (SIGINT), letting it finalize its output."""
+        if self.process and self.process.returncode is None:
+            # A stopped process only sees SIGINT once it runs again
+            self.resume()
+            self.process.send_signal(signal.SIGINT)
+
+    def cancel(self):
+        """Stop the process; :meth:`wait` then reports the result as cancelled."""
+        self._cancelled = True
+        self.interrupt()
+
+    async def _terminate(self):
+        self.interrupt()
+        try:
+            await asyncio.wait_for(self.process.wait(), TERMINATE_GRACE)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+    async def wait(self) -> FFmpegResult:
+        timed_out = False
+        try:
+            try:
+                await asyncio.wait_for(asyncio.gather(*self._readers), self.timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                logger.error("ffmpeg timed out after %.0fs", self.timeout)
+                await self._terminate()
+            await self.process.wait()
+        except asyncio.CancelledError:
+            await self._terminate()
+            raise
+        finally:
+            for reader in self._readers:
+                reader.cancel()
+            self.stats.wall_time = time.monotonic() - self._started
+
+        result = FFmpegResult(
+            returncode=self.process.returncode,
+            stats=self.stats,
+            stderr=list(self.stderr),
+            timed_out=timed_out,
+            cancelled=self._cancelled,
+        )
+        logger.info(
+            "ffmpeg exited with code %s (%.1fs wall, %.1fs cpu, %.0f MB peak RSS)",
+            result.returncode, self.stats.wall_time, self.stats.cpu_time, self.stats.peak_rss / 2**20,
+        )
+        if result.returncode not in (0, None) and not self._cancelled:
+            for line in result.stderr[-20:]:
+                logger.error("  %s", line)
+        return result
+
+
+async def run_ffmpeg(
+    cmd: list[str],
+    on_progress: Callable[[FFmpegProgress], Awaitable[None]] | None = None,
+    timeout: float | None = None,
+) -> FFmpegResult:
+    """Run ``cmd`` to completion."""
+    proc = FFmpegProcess(cmd, on_progress=on_progress, timeout=timeout)
+    await proc.start()
+    return await proc.wait()
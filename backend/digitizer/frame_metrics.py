@@ -0,0 +1,498 @@
+import asyncio
+import json
+import logging
+import os
+import subprocess
+from collections.abc import AsyncIterator
+
+import cv2
+import numpy as np
+
+from digitizer.ffmpeg_runner import FFmpegProcess, FFmpegResult
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_WIDTH = 256
+BATCH_FRAMES = 240
+# Bytes of decoded frames read ahead while a batch is processed, so ffmpeg keeps decoding
+PIPE_BUFFER = 8 * 2**20
+MIN_SCENE_FRAMES = 15
+METRICS_FILE = "metrics.npy"
+METRICS_META_FILE = "metrics.json"
+METRICS_VERSION = 1
+
+
+def build_probe_command(video_path: str) -> list[str]:
+    return [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=codec_name,width,height,avg_frame_rate:format=duration",
+        "-of", "json",
+        video_path,
+    ]
+
+
+def parse_probe_output(output: str) -> dict:
+    data = json.loads(output)
+    stream = data["streams"][0]
+    num, _, den = stream.get("avg_frame_rate", "0/1").partition("/")
+    fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+    return {
+        "codec": stream.get("codec_name"),
+        "width": int(stream["width"]),
+        "height": int(stream["height"]),
+        "fps": fps,
+        "duration": float(data.get("format", {}).get("duration", 0.0)),
+    }
+
+
+def probe_video(video_path: str) -> dict:
+    result = subprocess.run(
+        build_probe_command(video_path), capture_output=True, text=True, check=True
+    )
+    return parse_probe_output(result.stdout)
+
+
+def analysis_size(width: int, height: int, target_width: int = ANALYSIS_WIDTH) -> tuple[int, int]:
+    """Downscaled frame size used for analysis (even dimensions, aspect preserved)."""
+    if width <= target_width:
+        return width - width % 2, height - height % 2
+    scaled = round(height * target_width / width)
+    return target_width, max(2, scaled - scaled % 2)
+
+
+def build_rawvideo_command(
+    video_path: str,
+    width: int,
+    height: int,
+    start: float | None = None,
+    duration: float | None = None,
+    fps: float | None = None,
+    fast_decode: bool = False,
+) -> list[str]:
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin"]
+    if fast_decode:
+        # Decode keyframes only (captures force one every two seconds) and skip
+        # deblocking; only used for coarse low-rate passes
+        cmd += ["-skip_frame", "nokey", "-skip_loop_filter", "all"]
+    if start:
+        cmd += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    # Nearest neighbour, like PySceneDetect's downscale (which skips pixels):
+    # smoothing filters average away noise and shift the content scores
+    vf = f"scale={width}:{height}:flags=neighbor"
+    if fps:
+        vf = f"fps={fps},{vf}"
+    cmd += [
+        "-i", video_path,
+        "-an", "-sn",
+        "-vf", vf,
+        "-pix_fmt", "bgr24",
+        "-f", "rawvideo",
+        "pipe:1",
+    ]
+    return cmd
+
+
+async def read_frames(
+    stream: asyncio.StreamReader, width: int, height: int, batch_frames: int = BATCH_FRAMES
+) -> AsyncIterator[np.ndarray]:
+    """Yield ``(n, height, width, 3)`` uint8 batches from a raw bgr24 stream."""
+    frame_size = width * height * 3
+    while True:
+        try:
+            data = await stream.readexactly(frame_size * batch_frames)
+        except asyncio.IncompleteReadError as e:
+            data = e.partial
+        count = len(data) // frame_size
+        if count == 0:
+            return
+        yield np.frombuffer(data, np.uint8, count * frame_size).reshape(count, height, width, 3)
+        if count < batch_frames:
+            return
+
+
+class FrameMetrics:
+    """Per-frame content score and mean brightness series for one video."""
+
+    def __init__(self, fps: float, content: np.ndarray, luma: np.ndarray):
+        self.fps = fps
+        self.content = content
+        self.luma = luma
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.content)
+
+
+def _source_stat(source_path: str) -> dict:
+    st = os.stat(source_path)
+    return {"source_size": st.st_size, "source_mtime_ns": st.st_mtime_ns}
+
+
+def save_metrics(metrics: FrameMetrics, directory: str, source_path: str):
+    """Store metrics as a ``(2, frames)`` float32 array plus a JSON sidecar.
+
+    The sidecar records the source file's size and mtime so a re-captured or
+    replaced video is not analysed with stale metrics.
+    """
+    os.makedirs(directory, exist_ok=True)
+    array_path = os.path.join(directory, METRICS_FILE)
+    meta_path = os.path.join(directory, METRICS_META_FILE)
+    with open(array_path + ".tmp", "wb") as f:
+        np.save(f, np.stack([metrics.content, metrics.luma]).astype(np.float32))
+    os.replace(array_path + ".tmp", array_path)
+    meta = {
+        "version": METRICS_VERSION,
+        "fps": metrics.fps,
+        "frame_count": metrics.frame_count,
+        **_source_stat(source_path),
+    }
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def load_metrics(directory: str, source_path: str) -> FrameMetrics | None:
+    """Memory-map cached metrics, or return None if missing or stale."""
+    array_path = os.path.join(directory, METRICS_FILE)
+    meta_path = os.path.join(directory, METRICS_META_FILE)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") != METRICS_VERSION:
+            return None
+        stat = _source_stat(source_path)
+        if any(meta.get(k) != v for k, v in stat.items()):
+            return None
+        data = np.load(array_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if data.shape != (2, meta["frame_count"]):
+        return None
+    return FrameMetrics(meta["fps"], data[0], data[1])
+
+
+class MetricsAccumulator:
+    """Computes content deltas and luma for consecutive frame batches.
+
+    The content score matches PySceneDetect's ``ContentDetector`` with default
+    weights (mean of the hue, saturation and value deltas) and luma is the mean
+    of all BGR channels as used by ``ThresholdDetector``.
+    """
+
+    def __init__(self):
+        self._last_hsv: np.ndarray | None = None
+        self._content: list[np.ndarray] = []
+        self._luma: list[np.ndarray] = []
+
+    def add_batch(self, frames: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        n, h, w, _ = frames.shape
+        values = h * w * 3
+
+        # One cvtColor call for the whole batch, stacked vertically
+        hsv = cv2.cvtColor(frames.reshape(n * h, w, 3), cv2.COLOR_BGR2HSV).reshape(n, h, w, 3)
+        # Per frame, cv2 sums the uint8 data in place; whole-batch numpy
+        # reductions need widened copies and are several times slower
+        content = np.empty(n, np.float32)
+        luma = np.empty(n, np.float32)
+        prev = hsv[0] if self._last_hsv is None else self._last_hsv
+        for i in range(n):
+            content[i] = sum(cv2.sumElems(cv2.absdiff(hsv[i], prev))[:3]) / values
+            luma[i] = sum(cv2.sumElems(frames[i])[:3]) / values
+            prev = hsv[i]
+        self._last_hsv = hsv[-1].copy()
+
+        self._content.append(content)
+        self._luma.append(luma)
+        return content, luma
+
+    def result(self, fps: float) -> FrameMetrics:
+        if not self._content:
+            return FrameMetrics(fps, np.zeros(0, np.float32), np.zeros(0, np.float32))
+        return FrameMetrics(fps, np.concatenate(self._content), np.concatenate(self._luma))
+
+
+class CutTracker:
+    """Cut logic of ContentDetector + ThresholdDetector over metric series.
+
+    Works on whole batches: only frames above the content threshold and
+    frames where brightness crosses the fade threshold are visited in Python,
+    so re-running over hours of metrics takes milliseconds.
+    """
+
+    def __init__(
+        self,
+        content_threshold: float = 22.0,
+        fade_threshold: int = 12,
+        min_scene_len: int = MIN_SCENE_FRAMES,
+    ):
+        self.content_threshold = content_threshold
+        self.fade_threshold = int(fade_threshold)
+        self.min_scene_len = min_scene_len
+        self.frame_count = 0
+        self.cuts: set[int] = set()
+        # ContentDetector flash filter (merge mode)
+        self._last_above: int | None = None
+        self._merge_enabled = False
+        self._merge_triggered = False
+        self._merge_start = 0
+        # ThresholdDetector fade state
+        self._fade_out: bool | None = None
+        self._fade_frame = 0
+        self._last_fade_cut = 0
+
+    def feed(self, content: np.ndarray, luma: np.ndarray) -> list[int]:
+        """Consume the next frames' metrics and return newly confirmed cut frames."""
+        base = self.frame_count
+        count = len(content)
+        if count == 0:
+            return []
+        new = self._content_cuts(content, base) + self._fade_cuts(luma, base)
+        self.frame_count = base + count
+        new += self._flush_merge(self.frame_count)
+        new = sorted(set(new) - self.cuts)
+        self.cuts.update(new)
+        return new
+
+    def skip(self, count: int) -> list[int]:
+        """Advance past ``count`` frames that were never analyzed.
+
+        A cut inside the gap shows up on the first frame after it, which is
+        compared with the last frame before.
+        """
+        self.frame_count += count
+        new = sorted(set(self._flush_merge(self.frame_count)) - self.cuts)
+        self.cuts.update(new)
+        return new
+
+    @property
+    def settled_frame(self) -> int:
+        """Frames before this one can no longer gain a cut from future input.
+
+        A pending fade-out resolves to a cut between its start and the fade-in,
+        and a pending flash merge to a frame after its start; everything else
+        only cuts at or after the frames still to come.
+        """
+        settled = self.frame_count
+        if self._fade_out:
+            settled = min(settled, self._fade_frame)
+        if self._merge_triggered:
+            settled = min(settled, self._merge_start)
+        return settled
+
+    def _flush_merge(self, next_above: int) -> list[int]:
+        # A merge ends on the first non-cut frame min_scene_len after the last cut frame
+        length = self.min_scene_len
+        if (
+            self._merge_triggered
+            and self._last_above + length < next_above
+            and self._last_above - self._merge_start >= length
+        ):
+            self._merge_triggered = False
+            return [self._last_above]
+        return []
+
+    def _content_cuts(self, content: np.ndarray, base: int) -> list[int]:
+        above = np.flatnonzero(content >= self.content_threshold) + base
+        if self.min_scene_len <= 0:
+            return above.tolist()
+        if self._last_above is None:
+            self._last_above = base
+
+        cuts = []
+        for frame in above.tolist():
+            cuts += self._flush_merge(frame)
+            min_length_met = frame - self._last_above >= self.min_scene_len
+            self._last_above = frame
+            if self._merge_triggered:
+                continue
+            if min_length_met:
+                self._merge_enabled = True
+                cuts.append(frame)
+            elif self._merge_enabled:
+                self._merge_triggered = True
+                self._merge_start = frame
+        return cuts
+
+    def _fade_cuts(self, luma: np.ndarray, base: int) -> list[int]:
+        below = luma < self.fade_threshold
+        if self._fade_out is None:
+            self._fade_out = bool(below[0])
+            self._fade_frame = base
+            self._last_fade_cut = base
+
+        cuts = []
+        states = np.concatenate([[self._fade_out], below])
+        for i in np.flatnonzero(states[1:] != states[:-1]).tolist():
+            frame = base + i
+            if below[i]:
+                self._fade_out = True
+            else:
+                if frame - self._last_fade_cut >= self.min_scene_len:
+                    cuts.append((frame + self._fade_frame) // 2)
+                    self._last_fade_cut = frame
+                self._fade_out = False
+            self._fade_frame = frame
+        return cuts
+
+
+def detect_cuts(
+    metrics: FrameMetrics,
+    content_threshold: float,
+    fade_threshold: int,
+    min_scene_len: int = MIN_SCENE_FRAMES,
+) -> list[int]:
+    tracker = CutTracker(content_threshold, fade_threshold, min_scene_len)
+    tracker.feed(metrics.content, metrics.luma)
+    return sorted(tracker.cuts)
+
+
+def compute_metrics(
+    video_path: str,
+    target_width: int = ANALYSIS_WIDTH,
+    batch_frames: int = BATCH_FRAMES,
+    start: float | None = None,
+    duration: float | None = None,
+    sample_fps: float | None = None,
+    fast_decode: bool = False,
+    info: dict | None = None,
+) -> FrameMetrics:
+    """Decode ``video_path`` (or a time range of it) through ffmpeg and compute per-frame metrics.
+
+    With ``sample_fps`` the video is resampled to that rate and the returned
+    metrics use it as their frame rate.
+    """
+    info = info or probe_video(video_path)
+    width, height = analysis_size(info["width"], info["height"], target_width)
+    cmd = build_rawvideo_command(
+        video_path, width, height, start=start, duration=duration, fps=sample_fps, fast_decode=fast_decode
+    )
+    logger.info("Computing frame metrics: %s", " ".join(cmd))
+
+    accumulator = MetricsAccumulator()
+    # Called from worker threads, which have no event loop of their own
+    result = asyncio.run(_decode_into(cmd, width, height, batch_frames, accumulator))
+    if not result.ok:
+        raise RuntimeError(f"ffmpeg exited with code {result.returncode}: {' '.join(result.stderr[-3:])}")
+    return accumulator.result(sample_fps or info["fps"])
+
+
+async def _decode_into(
+    cmd: list[str], width: int, height: int, batch_frames: int, accumulator: MetricsAccumulator
+) -> FFmpegResult:
+    runner = FFmpegProcess(cmd, stdout_pipe=True, stdout_buffer=PIPE_BUFFER)
+    await runner.start()
+    try:
+        async for batch in read_frames(runner.stdout, width, height, batch_frames):
+            accumulator.add_batch(batch)
+    except BaseException:
+        runner.cancel()
+        await runner.wait()
+        raise
+    return await runner.wait()
+
+
+def keyframe_spacing(coarse: FrameMetrics) -> float:
+    """Typical seconds between the new frames of a keyframes-only coarse pass."""
+    fresh = np.flatnonzero(coarse.content > 0)
+    if len(fresh) < 2:
+        return coarse.frame_count / coarse.fps
+    return float(np.median(np.diff(fresh))) / coarse.fps
+
+
+def candidate_windows(
+    coarse: FrameMetrics,
+    content_threshold: float,
+    fade_threshold: int,
+    padding: float = 0.5,
+    sensitivity: float = 1.0,
+    contrast: float = 2.0,
+) -> list[tuple[float, float]]:
+    """Time ranges around coarse samples that may hide a cut, merged and sorted.
+
+    The coarse pass decodes keyframes only, so samples repeat the last
+    keyframe (with a zero content delta) until the next one arrives, and a
+    cut seen at a new frame may lie anywhere since the previous one. Seconds
+    apart, moving pictures differ as much as a cut does at full rate, so a
+    new frame is a candidate if its content delta reaches ``sensitivity`` of
+    the threshold and ``contrast`` times the smaller delta of the new frames
+    on either side. Brightness is a candidate if it changes side of the fade
+    threshold, is close enough to it that full-rate frames could cross it, or
+    at least halves or doubles.
+    """
+    if coarse.frame_count == 0:
+        return []
+    changed = coarse.content > 0
+    changed[0] = True
+    fresh = np.flatnonzero(changed)
+    content = coarse.content[fresh]
+    luma = coarse.luma[fresh]
+
+    # A still picture repeats unchanged across keyframes too, so a new frame
+    # far from its neighbour follows (or precedes) a still one, and a cut can
+    # only lie within the usual keyframe spacing before it
+    reach = round(keyframe_spacing(coarse) * coarse.fps)
+    close = np.diff(fresh) <= 2 * reach
+    # Delta of the calmer neighbour; the first sample has none at all
+    before = np.where(close, np.concatenate([[np.inf], content[1:-1]]), 0.0)
+    after = np.append(np.where(close[1:], content[2:], 0.0), np.inf)
+    spike = np.zeros(len(fresh), bool)
+    spike[1:] = (content[1:] >= content_threshold * sensitivity) & (content[1:] >= np.minimum(before, after) * contrast)
+    below = luma < fade_threshold
+    near = np.abs(luma - fade_threshold) < max(2.0, fade_threshold * 0.5)
+    crossed = np.concatenate([[False], below[1:] != below[:-1]])
+    change = np.diff(luma)
+    drop = np.concatenate([[False], (-change >= fade_threshold) & (luma[1:] * 2 <= luma[:-1])])
+    rise = np.concatenate([[False], (change >= fade_threshold) & (luma[1:] >= luma[:-1] * 2)])
+    hits = spike | crossed | near | drop | rise
+    # Dimmed on one keyframe and back up two later: the fade may have
+    # turned around between the dim ones, which look equally bright
+    hits[1:-1] |= drop[:-2] & rise[2:]
+
+    windows: list[tuple[float, float]] = []
+    step = 1.0 / coarse.fps
+    for k in np.flatnonzero(hits).tolist():
+        start = max(0.0, max(fresh[max(k - 1, 0)], fresh[k] - reach) * step - padding)
+        end = (fresh[k] + 1) * step + padding
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(end, windows[-1][1]))
+        else:
+            windows.append((start, end))
+    return windows
+
+
+def join_metrics(first: FrameMetrics, second: FrameMetrics) -> FrameMetrics:
+    """Concatenate two full-rate series where ``second`` starts on the last frame of ``first``."""
+    return FrameMetrics(
+        first.fps,
+        np.concatenate([first.content, second.content[1:]]),
+        np.concatenate([first.luma, second.luma[1:]]),
+    )
+
+
+def assemble_metrics(
+    coarse: FrameMetrics,
+    refined: list[tuple[int, FrameMetrics]],
+    fps: float,
+    frame_count: int,
+) -> FrameMetrics:
+    """Build a full-rate series from a coarse pass plus full-rate windows.
+
+    Outside the refined windows content is zero (the coarse pass saw nothing
+    there) and brightness holds the nearest earlier coarse sample, which is on
+    the same side of the fade threshold as the frames it stands in for.
+    """
+    sample = np.minimum((np.arange(frame_count) * coarse.fps / fps).astype(np.int64), coarse.frame_count - 1)
+    luma = coarse.luma[sample].astype(np.float32)
+    content = np.zeros(frame_count, np.float32)
+    for first, window in refined:
+        end = min(first + window.frame_count, frame_count)
+        if end <= first:
+            continue
+        # The first decoded frame of a window has no predecessor to diff against
+        content[first + 1:end] = window.content[1:end - first]
+        luma[first:end] = window.luma[:end - first]
+    return FrameMetrics(fps, content, luma)
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from datetime import datetime, timezone
 
@@ -10,21 +11,45 @@ class JobManager:
         self.db = db
         self.output_base = output_base
         self.vhs_output_base = vhs_output_base
+        # Drives create jobs concurrently; each needs its own sequence number
+        self._create_lock = asyncio.Lock()
 
-    async def create_job(self, disc_info: dict, source_type: str = "dvd") -> Job:
+    async def create_job(self, disc_info: dict, source_type: str = "dvd", multi_title: bool = False) -> Job:
+        """Create a job; a ``multi_title`` disc job gets a directory for its title jobs."""
         job_id = str(uuid.uuid4())
         today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        seq = await self.db.get_next_sequence(today)
-        if source_type == "vhs":
-            output_path = f"{self.vhs_output_base}/{today}_capture_{seq:03d}.mp4"
-        else:
-            output_path = f"{self.output_base}/{today}_rip_{seq:03d}.mp4"
+        async with self._create_lock:
+            seq = await self.db.get_next_sequence(today)
+            if source_type == "vhs":
+                output_path = f"{self.vhs_output_base}/{today}_capture_{seq:03d}.mp4"
+            elif multi_title:
+                output_path = f"{self.output_base}/{today}_rip_{seq:03d}"
+            else:
+                output_path = f"{self.output_base}/{today}_rip_{seq:03d}.mp4"
 
+            await self.db.create_job(
+                job_id=job_id,
+                source_type=source_type,
+                disc_info=disc_info,
+                output_path=output_path,
+            )
+        row = await self.db.get_job(job_id)
+        return self._row_to_job(row)
+
+    async def create_title_job(self, parent: Job, title: dict) -> Job:
+        """Child job ripping one title of ``parent``'s disc into its directory."""
+        job_id = str(uuid.uuid4())
+        disc_info = {
+            **parent.disc_info.model_dump(),
+            "main_title": title["number"],
+            "duration": title["duration"],
+        }
         await self.db.create_job(
             job_id=job_id,
-            source_type=source_type,
+            source_type=parent.source_type,
             disc_info=disc_info,
-            output_path=output_path,
+            output_path=f"{parent.output_path}/title_{title['number']:02d}.mp4",
+            parent_id=parent.id,
         )
         row = await self.db.get_job(job_id)
         return self._row_to_job(row)
@@ -35,8 +60,13 @@ class JobManager:
             return None
         return self._row_to_job(row)
 
-    async def list_jobs(self, limit: int = 10, offset: int = 0, source_type: str | None = None) -> list[Job]:
-        rows = await self.db.list_jobs(limit=limit, offset=offset, source_type=source_type)
+    async def list_jobs(
+        self, limit: int = 10, offset: int = 0, source_type: str | None = None, parent_id: str | None = None,
+        status: str | None = None,
+    ) -> list[Job]:
+        rows = await self.db.list_jobs(
+            limit=limit, offset=offset, source_type=source_type, parent_id=parent_id, status=status,
+        )
         return [self._row_to_job(r) for r in rows]
 
     async def mark_ripping(self, job_id: str) -> Job:
@@ -65,6 +95,21 @@ class JobManager:
         )
         return await self.get_job(job_id)
 
+    async def record_stage(self, job_id: str, stage: str, started_at: datetime, finished_at: datetime) -> Job:
+        """Store when ``stage`` of a rip started and how long it took."""
+        row = await self.db.get_job(job_id)
+        timings = dict(row.get("stage_timings") or {})
+        timings[stage] = {
+            "started_at": started_at.isoformat(),
+            "seconds": round((finished_at - started_at).total_seconds(), 3),
+        }
+        await self.db.update_job(job_id, stage_timings=timings)
+        return await self.get_job(job_id)
+
+    async def update_capture_health(self, job_id: str, health: dict) -> Job:
+        await self.db.update_job(job_id, capture_health=health)
+        return await self.get_job(job_id)
+
     async def delete_job(self, job_id: str) -> bool:
         return await self.db.delete_job(job_id)
 
@@ -80,10 +125,18 @@ class JobManager:
             status=row["status"],
             progress=row["progress"],
             output_path=row.get("output_path"),
+            master_path=row.get("master_path"),
             file_size=row.get("file_size"),
             started_at=row.get("started_at"),
             completed_at=row.get("completed_at"),
             error=row.get("error"),
             analysis_status=row.get("analysis_status"),
             scene_count=row.get("scene_count"),
+            stage_timings=row.get("stage_timings"),
+            capture_health=row.get("capture_health"),
+            stop_reason=row.get("stop_reason"),
+            transcode_status=row.get("transcode_status"),
+            transcode=row.get("transcode"),
+            capture_fragmented=row.get("capture_fragmented"),
+            parent_id=row.get("parent_id"),
         )
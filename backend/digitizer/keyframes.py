@@ -0,0 +1,122 @@
+"""Keyframe/packet index of a capture, built with a single ffprobe pass.
+
+Each entry describes one GOP: the keyframe's presentation time (relative to
+the start of the file, as used by ``-ss``), its byte position, and the number
+and total size of the packets up to the next keyframe.
+"""
+import asyncio
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+SNAP_MODES = ("nearest", "before", "after")
+
+
+def build_index_command(video_path: str) -> list[str]:
+    return [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "format=start_time:packet=pts_time,size,pos,flags",
+        "-of", "compact=p=0:nk=0",
+        video_path,
+    ]
+
+
+def _parse_fields(line: str) -> dict[str, str]:
+    fields = {}
+    for item in line.strip().split("|"):
+        key, sep, value = item.partition("=")
+        if sep:
+            fields[key] = value
+    return fields
+
+
+def _number(value: str | None, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_index_output(output: str) -> list[dict]:
+    keyframes = []
+    start_time = 0.0
+    for line in output.splitlines():
+        fields = _parse_fields(line)
+        if "flags" not in fields:
+            if "start_time" in fields:
+                start_time = _number(fields["start_time"]) or 0.0
+            continue
+        size = _number(fields.get("size"), int) or 0
+        if "K" in fields["flags"]:
+            pts_time = _number(fields.get("pts_time"))
+            if pts_time is None:
+                continue
+            keyframes.append({
+                "pts_time": pts_time,
+                "pos": _number(fields.get("pos"), int),
+                "packets": 1,
+                "size": size,
+            })
+        elif keyframes:
+            keyframes[-1]["packets"] += 1
+            keyframes[-1]["size"] += size
+
+    for kf in keyframes:
+        kf["pts_time"] = round(kf["pts_time"] - start_time, 6)
+    keyframes.sort(key=lambda kf: kf["pts_time"])
+    return keyframes
+
+
+async def build_index(video_path: str) -> list[dict]:
+    cmd = build_index_command(video_path)
+    logger.info("Indexing keyframes: %s", " ".join(cmd))
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {stderr.decode('utf-8', errors='replace').strip()}")
+    return parse_index_output(stdout.decode("utf-8", errors="replace"))
+
+
+def snap_time(times: list[float], t: float, mode: str = "nearest") -> float:
+    """Move ``t`` onto a keyframe time from the sorted ``times``."""
+    if not times:
+        return t
+    i = bisect.bisect_left(times, t)
+    if i < len(times) and times[i] == t:
+        return t
+    before = times[i - 1] if i > 0 else times[0]
+    after = times[i] if i < len(times) else times[-1]
+    if mode == "before":
+        return before
+    if mode == "after":
+        return after
+    return before if t - before <= after - t else after
+
+
+def snap_scenes(scenes: list[dict], times: list[float], mode: str = "nearest") -> list[dict]:
+    """Snap scene boundaries onto keyframes.
+
+    The end of the last scene stays put (the end of a tape is not a keyframe)
+    and scenes that collapse to nothing are dropped; the rest are renumbered.
+    """
+    snapped = []
+    for i, scene in enumerate(scenes):
+        start = snap_time(times, scene["start_time"], mode)
+        end = scene["end_time"] if i == len(scenes) - 1 else snap_time(times, scene["end_time"], mode)
+        if end <= start:
+            continue
+        snapped.append({
+            **scene,
+            "scene_index": len(snapped) + 1,
+            "start_time": start,
+            "end_time": end,
+            "duration": round(end - start, 3),
+        })
+    return snapped
@@ -1,6 +1,9 @@
 import asyncio
 import logging
 import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -9,10 +12,15 @@ from digitizer.api import router
 from digitizer.capture import VHSCapture
 from digitizer.db import Database
 from digitizer.drive_monitor import DriveMonitor
+from digitizer.drives import Drive, aggregate_status, drive_ids, parse_drive_devices
 from digitizer.jobs import JobManager
-from digitizer.ripper import DVDRipper
+from digitizer.models import DriveStatus, JobStatus
+from digitizer.pipeline import RipPipeline
+from digitizer.ripper import DVDRipper, dvdvideo_supported
 from digitizer.scene_detector import SceneDetector
 from digitizer.splitter import VideoSplitter
+from digitizer.titles import TitleSetQueue, TitleSetRip, select_titles
+from digitizer.transcoder import TranscodeQueue
 from digitizer.ws import ConnectionManager
 
 logger = logging.getLogger(__name__)
@@ -35,9 +43,20 @@ async def create_app(
 
     app.include_router(router)
 
+    await _init_state(app, db_path=db_path, output_base=output_base)
+
+    if start_monitor:
+        app.state.monitor_tasks = _start_monitors(app)
+
+    return app
+
+
+async def _init_state(app: FastAPI, db_path: str | None = None, output_base: str | None = None):
     _db_path = db_path or os.environ.get("DIGITIZER_DB_PATH", "/data/digitizer.db")
     _output_base = output_base or os.environ.get("DIGITIZER_OUTPUT_BASE_PATH", "/output/dvd")
-    _device = os.environ.get("DIGITIZER_DRIVE_DEVICE", "/dev/sr0")
+    _devices = parse_drive_devices(
+        os.environ.get("DIGITIZER_DRIVE_DEVICES") or os.environ.get("DIGITIZER_DRIVE_DEVICE", "/dev/sr0")
+    )
     _capture_device = os.environ.get("DIGITIZER_CAPTURE_DEVICE", "/dev/video0")
     _vhs_output = os.environ.get("DIGITIZER_VHS_OUTPUT_PATH", "/output/vhs")
 
@@ -45,157 +64,355 @@ async def create_app(
     await db.init()
 
     ws_manager = ConnectionManager()
-    drive_monitor = DriveMonitor(device=_device)
-    ripper = DVDRipper(drive_device=_device)
     job_manager = JobManager(db=db, output_base=_output_base, vhs_output_base=_vhs_output)
+    rip_mode = os.environ.get("DIGITIZER_RIP_MODE", "stream")
+    if rip_mode == "stream" and _devices and not await dvdvideo_supported():
+        logger.warning(
+            "ffmpeg has no dvdvideo demuxer (needs 7.1+ with libdvdnav/libdvdread); "
+            "ripping via dvdbackup instead"
+        )
+        rip_mode = "backup"
+    drives = {}
+    for drive_id, device in zip(drive_ids(_devices), _devices):
+        ripper = DVDRipper(drive_device=device, rip_mode=rip_mode)
+        drives[drive_id] = Drive(
+            drive_id=drive_id,
+            device=device,
+            monitor=DriveMonitor(device=device),
+            ripper=ripper,
+            pipeline=_rip_pipeline(ripper, job_manager, ws_manager, drive_id),
+        )
     vhs_capture = VHSCapture(
         capture_device=_capture_device,
         encoding_preset=os.environ.get("DIGITIZER_ENCODING_PRESET", "fast"),
         crf_quality=int(os.environ.get("DIGITIZER_CRF_QUALITY", "23")),
         audio_bitrate=os.environ.get("DIGITIZER_AUDIO_BITRATE", "192k"),
+        keyframe_interval=float(os.environ.get("DIGITIZER_KEYFRAME_INTERVAL", "2")),
+        proxy_threads=int(os.environ.get("DIGITIZER_PROXY_THREADS", "0")),
+        master_threads=int(os.environ.get("DIGITIZER_MASTER_THREADS", "0")),
+        fragmented=os.environ.get("DIGITIZER_CAPTURE_FRAGMENTED", "true").lower() == "true",
     )
 
-    scene_detector = SceneDetector()
-    splitter = VideoSplitter()
+    scene_detector = SceneDetector(
+        workers=int(os.environ.get("DIGITIZER_SCENE_WORKERS", "1")),
+        chunk_overlap=float(os.environ.get("DIGITIZER_SCENE_CHUNK_OVERLAP", "10.0")),
+        engine=os.environ.get("DIGITIZER_SCENE_ENGINE", "pyscenedetect"),
+    )
+    # Smart splits re-encode their edges like the capture was encoded
+    splitter = VideoSplitter(encoding_preset=vhs_capture.encoding_preset, crf_quality=vhs_capture.crf_quality)
 
     app.state.db = db
     app.state.ws_manager = ws_manager
-    app.state.drive_monitor = drive_monitor
-    app.state.ripper = ripper
+    app.state.drives = drives
     app.state.job_manager = job_manager
     app.state.vhs_capture = vhs_capture
     app.state.scene_detector = scene_detector
     app.state.splitter = splitter
     app.state._capture_job_id = None
+    app.state._calibrating = False
+    # All-titles remuxes, which run after their drive is released
+    app.state.title_remuxes = TitleSetQueue()
+    app.state.transcoder = TranscodeQueue(
+        job_manager, ws_manager, is_busy=lambda: _node_busy(app),
+        keyframe_interval=vhs_capture.keyframe_interval, fragmented=vhs_capture.fragmented,
+    )
 
-    if start_monitor:
-        app.state.monitor_task = asyncio.create_task(
-            _monitor_loop(app)
+    await _recover_captures(job_manager, db, default_fragmented=vhs_capture.fragmented)
+    await _recover_rips(job_manager, os.environ.get("DIGITIZER_SCRATCH_PATH") or tempfile.gettempdir())
+    await app.state.transcoder.recover()
+
+
+def _node_busy(app: FastAPI) -> bool:
+    """Whether a capture, rip, remux or encoder calibration needs the CPU."""
+    return (
+        app.state.vhs_capture.is_recording
+        or app.state._calibrating
+        or aggregate_status(app.state.drives.values()) == DriveStatus.RIPPING
+        # Remuxes carry on after the drive is released
+        or any(drive.pipeline is not None and drive.pipeline.busy for drive in app.state.drives.values())
+        or app.state.title_remuxes.busy
+    )
+
+
+async def _recover_captures(job_manager: JobManager, db: Database, default_fragmented: bool):
+    """Settle captures that were still recording when the process died.
+
+    Fragmented captures are playable up to their last fragment, so whatever
+    reached disk is kept; an unfragmented capture has no moov atom yet and
+    is lost. Each job records how it was written; ``default_fragmented``
+    covers jobs from before that was recorded.
+    """
+    for job in await job_manager.list_jobs(limit=-1, source_type="vhs", status="ripping"):
+        if job.analysis_status == "analyzing":
+            # Live scenes stop at the crash; analysis can be rerun on the recovered file
+            await db.delete_scenes_for_job(job.id)
+            await db.update_job(job.id, analysis_status=None)
+        size = os.path.getsize(job.output_path) if job.output_path and os.path.exists(job.output_path) else 0
+        fragmented = default_fragmented if job.capture_fragmented is None else job.capture_fragmented
+        if size == 0 or not fragmented:
+            if size == 0:
+                logger.warning("Capture %s was interrupted before anything was written", job.id)
+            else:
+                logger.warning(
+                    "Capture %s was interrupted; its %d bytes are unplayable without fragments", job.id, size
+                )
+            await job_manager.mark_failed(job.id, error="Capture interrupted")
+            await db.update_job(job.id, stop_reason="interrupted")
+            continue
+        logger.warning("Recovered interrupted capture %s (%d bytes)", job.id, size)
+        await job_manager.mark_complete(job.id, file_size=size)
+        await db.update_job(
+            job.id,
+            error="Capture interrupted; kept everything recorded up to the interruption",
+            stop_reason="interrupted",
         )
 
-    return app
 
+async def _recover_rips(job_manager: JobManager, scratch_base: str):
+    """Fail DVD jobs that were still reading or remuxing when the process died.
 
-async def _monitor_loop(app: FastAPI):
-    monitor = app.state.drive_monitor
-    ws = app.state.ws_manager
-    jm = app.state.job_manager
-    ripper = app.state.ripper
-    poll_interval = float(os.environ.get("DIGITIZER_POLL_INTERVAL", "2.0"))
+    Their scratch copies are removed; the disc has usually been ejected, so
+    it has to be inserted again to rip it.
+    """
+    for status in (JobStatus.DETECTED, JobStatus.RIPPING):
+        for job in await job_manager.list_jobs(limit=-1, source_type="dvd", status=status.value):
+            logger.warning("Rip %s was interrupted", job.id)
+            shutil.rmtree(os.path.join(scratch_base, job.id), ignore_errors=True)
+            await job_manager.mark_failed(job.id, error="Rip interrupted")
 
-    while True:
+
+def _rip_pipeline(
+    ripper: DVDRipper, job_manager: JobManager, ws_manager: ConnectionManager, drive_id: str
+) -> RipPipeline | None:
+    """Pipelined rips are enabled by giving them a scratch directory."""
+    scratch_path = os.environ.get("DIGITIZER_SCRATCH_PATH", "")
+    if not scratch_path:
+        return None
+    return RipPipeline(ripper, job_manager, ws_manager, scratch_dir=scratch_path, drive_id=drive_id)
+
+
+def _start_monitors(app: FastAPI) -> list[asyncio.Task]:
+    """One monitor loop per drive, so every drive rips concurrently, plus the remux and transcode queues."""
+    tasks = [asyncio.create_task(_monitor_loop(app, drive)) for drive in app.state.drives.values()]
+    tasks.append(asyncio.create_task(app.state.title_remuxes.run()))
+    tasks.append(asyncio.create_task(app.state.transcoder.run()))
+    return tasks
+
+
+async def _stop_monitors(tasks: list[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
         try:
-            status, disc_info = await monitor.poll_once()
-
-            if disc_info is not None and status.value == "disc_detected":
-                await ws.broadcast({"event": "drive_status", "data": {"status": "disc_detected"}})
-
-                job = await jm.create_job(disc_info=disc_info)
-                monitor.set_ripping()
-                await ws.broadcast({"event": "drive_status", "data": {"status": "ripping"}})
-
-                await jm.mark_ripping(job.id)
-                await ws.broadcast({
-                    "event": "job_progress",
-                    "data": {"job_id": job.id, "progress": 0},
-                })
-
-                async def on_progress(pct: int):
-                    await jm.update_progress(job.id, pct)
-                    await ws.broadcast({
-                        "event": "job_progress",
-                        "data": {"job_id": job.id, "progress": pct},
-                    })
-
-                success = await ripper.rip(
-                    title_number=disc_info["main_title"],
-                    duration=disc_info["duration"],
-                    output_path=job.output_path,
-                    on_progress=on_progress,
-                )
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def _monitor_loop(app: FastAPI, drive: Drive):
+    poll_interval = float(os.environ.get("DIGITIZER_POLL_INTERVAL", "2.0"))
+    # Reading the tray state is a single ioctl, so it can be checked more often
+    tray_poll_interval = float(os.environ.get("DIGITIZER_TRAY_POLL_INTERVAL", "0.5"))
+
+    if drive.pipeline is not None:
+        drive.pipeline.start()
+    try:
+        while True:
+            try:
+                status, disc_info = await drive.monitor.poll_once()
 
-                if success:
-                    file_size = os.path.getsize(job.output_path) if os.path.exists(job.output_path) else 0
-                    completed = await jm.mark_complete(job.id, file_size=file_size)
-                    await ws.broadcast({
-                        "event": "job_complete",
-                        "data": completed.model_dump(),
-                    })
+                if disc_info is not None and status.value == "disc_detected":
+                    await _rip_disc(app, drive, disc_info)
 
-                    settings = await app.state.db.get_settings()
-                    if settings.get("auto_eject", True):
-                        await ripper.eject()
-                        monitor.set_empty()
-                else:
-                    failed = await jm.mark_failed(job.id, error="FFmpeg rip failed")
-                    await ws.broadcast({
-                        "event": "job_failed",
-                        "data": failed.model_dump(),
-                    })
+            except Exception:
+                logger.exception("Error in monitor loop for drive %s", drive.id)
 
-                monitor.set_empty()
-                await ws.broadcast({"event": "drive_status", "data": {"status": "empty"}})
+            await asyncio.sleep(tray_poll_interval if drive.monitor.event_driven else poll_interval)
+    finally:
+        if drive.pipeline is not None:
+            await drive.pipeline.stop()
 
-        except Exception:
-            logger.exception("Error in monitor loop")
 
-        await asyncio.sleep(poll_interval)
+async def _rip_disc(app: FastAPI, drive: Drive, disc_info: dict):
+    monitor = drive.monitor
+    ws = app.state.ws_manager
+    jm = app.state.job_manager
+    ripper = drive.ripper
+    db = app.state.db
+
+    await ws.broadcast({"event": "drive_status", "data": {"drive_id": drive.id, "status": "disc_detected"}})
+
+    fingerprint = disc_info.get("fingerprint")
+    settings = await db.get_settings()
+    all_titles = settings.get("rip_titles", "main") == "all"
+    if all_titles:
+        wanted = select_titles(disc_info, float(settings.get("min_title_length", 300)))
+    else:
+        wanted = [{"number": disc_info["main_title"], "duration": disc_info["duration"]}]
+    titles, known = await _titles_to_rip(app, disc_info, [t["number"] for t in wanted])
+    if not titles:
+        # Already archived: point at the existing job instead of ripping again
+        await ws.broadcast({
+            "event": "disc_known",
+            "data": {"drive_id": drive.id, "fingerprint": fingerprint, "job_id": known["job_id"]},
+        })
+        await _release_drive(app, drive, eject=True)
+        return
+    if all_titles:
+        await _rip_title_set(app, drive, disc_info, [t for t in wanted if t["number"] in titles])
+        return
+
+    job = await jm.create_job(disc_info=disc_info)
+    if fingerprint:
+        await db.save_disc(fingerprint, disc_info, job_id=job.id)
+        await db.record_disc_title(fingerprint, disc_info["main_title"], job.id)
+    monitor.set_ripping()
+    await ws.broadcast({"event": "drive_status", "data": {"drive_id": drive.id, "status": "ripping"}})
+
+    await jm.mark_ripping(job.id)
+    await ws.broadcast({
+        "event": "job_progress",
+        "data": {"job_id": job.id, "drive_id": drive.id, "progress": 0},
+    })
+
+    if drive.pipeline is not None:
+        # The remux is queued; the drive is free as soon as the read is done
+        success = await drive.pipeline.read(job, disc_info)
+    else:
+        async def on_progress(pct: int):
+            await jm.update_progress(job.id, pct)
+            await ws.broadcast({
+                "event": "job_progress",
+                "data": {"job_id": job.id, "drive_id": drive.id, "progress": pct},
+            })
+
+        started = datetime.now(timezone.utc)
+        success = await ripper.rip(
+            title_number=disc_info["main_title"],
+            duration=disc_info["duration"],
+            output_path=job.output_path,
+            on_progress=on_progress,
+        )
+        await jm.record_stage(job.id, "rip", started, datetime.now(timezone.utc))
+
+        if success:
+            file_size = os.path.getsize(job.output_path) if os.path.exists(job.output_path) else 0
+            completed = await jm.mark_complete(job.id, file_size=file_size)
+            await ws.broadcast({
+                "event": "job_complete",
+                "data": {**completed.model_dump(), "drive_id": drive.id},
+            })
+        else:
+            failed = await jm.mark_failed(job.id, error="FFmpeg rip failed")
+            await ws.broadcast({
+                "event": "job_failed",
+                "data": {**failed.model_dump(), "drive_id": drive.id},
+            })
+
+    await _release_drive(app, drive, eject=success)
+
+
+async def _rip_title_set(app: FastAPI, drive: Drive, disc_info: dict, titles: list[dict]):
+    """Read the whole disc once, then remux each title into a child job."""
+    ws = app.state.ws_manager
+    jm = app.state.job_manager
+    db = app.state.db
+    fingerprint = disc_info.get("fingerprint")
+
+    parent = await jm.create_job(disc_info=disc_info, multi_title=True)
+    children = [await jm.create_title_job(parent, title) for title in titles]
+    if fingerprint:
+        await db.save_disc(fingerprint, disc_info, job_id=parent.id)
+        for child in children:
+            await db.record_disc_title(fingerprint, child.disc_info.main_title, child.id)
+    drive.monitor.set_ripping()
+    await ws.broadcast({"event": "drive_status", "data": {"drive_id": drive.id, "status": "ripping"}})
+
+    await jm.mark_ripping(parent.id)
+    await ws.broadcast({
+        "event": "job_progress",
+        "data": {"job_id": parent.id, "drive_id": drive.id, "progress": 0},
+    })
+
+    scratch_base = os.environ.get("DIGITIZER_SCRATCH_PATH") or tempfile.gettempdir()
+    title_rip = TitleSetRip(
+        drive.ripper, jm, ws,
+        scratch_dir=os.path.join(scratch_base, parent.id),
+        concurrency=int(os.environ.get("DIGITIZER_REMUX_WORKERS", "2")),
+        drive_id=drive.id,
+    )
+    disc_dir = await title_rip.read(parent, children)
+    if disc_dir is None:
+        await _release_drive(app, drive, eject=False)
+        return
+
+    # The mirror holds everything, so the disc can go before the remux
+    # starts; while the remux queue is full it stays in the drive
+    done = await app.state.title_remuxes.put(title_rip, parent, children, disc_dir)
+    await _release_drive(app, drive, eject=True)
+    if drive.pipeline is None:
+        await done.wait()
+
+
+async def _release_drive(app: FastAPI, drive: Drive, eject: bool):
+    if eject:
+        settings = await app.state.db.get_settings()
+        if settings.get("auto_eject", True):
+            await drive.ripper.eject()
+
+    drive.monitor.set_empty()
+    await app.state.ws_manager.broadcast({"event": "drive_status", "data": {"drive_id": drive.id, "status": "empty"}})
+
+
+async def _titles_to_rip(app: FastAPI, disc_info: dict, titles: list[int]) -> tuple[list[int], dict | None]:
+    """Which of ``titles`` to rip, given what is already archived from this disc.
+
+    Returns the titles and the known disc record (None for a new disc). The
+    ``duplicate_discs`` setting decides what happens to a known disc: ``skip``
+    rips nothing, ``missing`` rips titles without a completed job and
+    ``always`` rips everything again.
+    """
+    fingerprint = disc_info.get("fingerprint")
+    if not fingerprint:
+        return titles, None
+    db = app.state.db
+    known = await db.get_disc(fingerprint)
+    if known is None:
+        return titles, None
+    await db.save_disc(fingerprint, disc_info)
+
+    mode = (await db.get_settings()).get("duplicate_discs", "missing")
+    if mode == "always":
+        return titles, known
+    if mode == "skip":
+        return [], known
+
+    missing = []
+    for title in titles:
+        job_id = known["titles"].get(title)
+        job = await app.state.job_manager.get_job(job_id) if job_id else None
+        if job is None or job.status != JobStatus.COMPLETE:
+            missing.append(title)
+    return missing, known
 
 
 def app_factory():
     """Synchronous factory that returns an ASGI app with lifespan-managed init."""
     from contextlib import asynccontextmanager
 
-    _app_ref: dict = {}
-
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         # Startup: initialize all components
-        _db_path = os.environ.get("DIGITIZER_DB_PATH", "/data/digitizer.db")
-        _output_base = os.environ.get("DIGITIZER_OUTPUT_BASE_PATH", "/output/dvd")
-        _device = os.environ.get("DIGITIZER_DRIVE_DEVICE", "/dev/sr0")
-        _capture_device = os.environ.get("DIGITIZER_CAPTURE_DEVICE", "/dev/video0")
-        _vhs_output = os.environ.get("DIGITIZER_VHS_OUTPUT_PATH", "/output/vhs")
-
-        db = Database(_db_path)
-        await db.init()
-
-        ws_manager = ConnectionManager()
-        drive_monitor = DriveMonitor(device=_device)
-        ripper = DVDRipper(drive_device=_device)
-        job_manager = JobManager(db=db, output_base=_output_base, vhs_output_base=_vhs_output)
-        vhs_capture = VHSCapture(
-            capture_device=_capture_device,
-            encoding_preset=os.environ.get("DIGITIZER_ENCODING_PRESET", "fast"),
-            crf_quality=int(os.environ.get("DIGITIZER_CRF_QUALITY", "23")),
-            audio_bitrate=os.environ.get("DIGITIZER_AUDIO_BITRATE", "192k"),
-        )
-        scene_detector = SceneDetector()
-        splitter = VideoSplitter()
-
-        app.state.db = db
-        app.state.ws_manager = ws_manager
-        app.state.drive_monitor = drive_monitor
-        app.state.ripper = ripper
-        app.state.job_manager = job_manager
-        app.state.vhs_capture = vhs_capture
-        app.state.scene_detector = scene_detector
-        app.state.splitter = splitter
-        app.state._capture_job_id = None
-
-        monitor_task = asyncio.create_task(_monitor_loop(app))
+        await _init_state(app)
+        monitor_tasks = _start_monitors(app)
 
         yield
 
         # Shutdown
         try:
-            monitor_task.cancel()
-            try:
-                await monitor_task
-            except asyncio.CancelledError:
-                pass
+            await _stop_monitors(monitor_tasks)
         finally:
-            await db.close()
+            await app.state.db.close()
 
     app = FastAPI(title="Digitizer", version="0.1.0", lifespan=lifespan)
     app.add_middleware(
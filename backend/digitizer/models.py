@@ -44,6 +44,9 @@ class DiscInfo(BaseModel):
     title_count: int = 0
     main_title: int = 1
     duration: float = 0.0
+    disc_title: str = ""
+    titles: list[dict] = []
+    fingerprint: str | None = None
 
 
 class Job(BaseModel):
@@ -53,12 +56,20 @@ class Job(BaseModel):
     status: JobStatus = JobStatus.DETECTED
     progress: int = 0
     output_path: str | None = None
+    master_path: str | None = None
     file_size: int | None = None
     started_at: str | None = None
     completed_at: str | None = None
     error: str | None = None
     analysis_status: str | None = None
     scene_count: int | None = None
+    stage_timings: dict | None = None
+    capture_health: dict | None = None
+    stop_reason: str | None = None
+    transcode_status: str | None = None
+    transcode: dict | None = None
+    capture_fragmented: bool | None = None
+    parent_id: str | None = None
 
 
 class Settings(BaseModel):
@@ -0,0 +1,159 @@
+"""Pipelined DVD ripping.
+
+The read stage copies the title to scratch disk, after which the disc can be
+ejected; the remux stage runs from a queue in the background, so the next
+disc is read while the previous one is still being remuxed. Only a few
+reads can wait for a remux at a time; past that, the next read holds its
+drive until the queue has room, so scratch space stays bounded.
+"""
+import asyncio
+import logging
+import os
+import shutil
+from collections.abc import Callable, Awaitable
+from datetime import datetime, timezone
+
+from digitizer.jobs import JobManager
+from digitizer.models import Job
+from digitizer.ripper import DVDRipper
+from digitizer.ws import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+# Titles read to scratch and waiting for the remux
+MAX_QUEUED_REMUXES = 2
+
+
+class RipPipeline:
+    def __init__(
+        self,
+        ripper: DVDRipper,
+        job_manager: JobManager,
+        ws_manager: ConnectionManager,
+        scratch_dir: str,
+        drive_id: str | None = None,
+        max_queued: int = MAX_QUEUED_REMUXES,
+    ):
+        self.ripper = ripper
+        self.job_manager = job_manager
+        self.ws_manager = ws_manager
+        self.scratch_dir = scratch_dir
+        self.drive_id = drive_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._worker: asyncio.Task | None = None
+        self._current: tuple | None = None
+
+    @property
+    def busy(self) -> bool:
+        """Whether a remux is running or queued."""
+        return self._current is not None or not self.queue.empty()
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._remux_worker())
+
+    async def stop(self):
+        """Stop the remux worker; the running and queued remuxes fail and their scratch is removed."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        pending = [self._current] if self._current is not None else []
+        self._current = None
+        while not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+            self.queue.task_done()
+        for job, _, _, scratch, _ in pending:
+            shutil.rmtree(scratch, ignore_errors=True)
+            await self._fail(job.id, "Remux interrupted")
+
+    async def read(self, job: Job, disc_info: dict) -> bool:
+        """Read the disc to scratch and queue the remux.
+
+        Returns True once the data is safely on scratch (the disc can be
+        ejected); on failure the job is marked failed and False is returned.
+        """
+        scratch = os.path.join(self.scratch_dir, job.id)
+        started = datetime.now(timezone.utc)
+        source = await self.ripper.read_title(
+            title_number=disc_info["main_title"],
+            duration=disc_info["duration"],
+            scratch_dir=scratch,
+            on_progress=self._progress_callback(job.id, 0, 50),
+        )
+        finished = datetime.now(timezone.utc)
+        await self.job_manager.record_stage(job.id, "read", started, finished)
+
+        if source is None:
+            shutil.rmtree(scratch, ignore_errors=True)
+            await self._fail(job.id, "DVD read failed")
+            return False
+
+        # Waits while the queue is full, keeping the disc in the drive
+        try:
+            await self.queue.put((job, disc_info, source, scratch, finished))
+        except asyncio.CancelledError:
+            shutil.rmtree(scratch, ignore_errors=True)
+            await self._fail(job.id, "Remux interrupted")
+            raise
+        return True
+
+    async def _remux_worker(self):
+        while True:
+            self._current = await self.queue.get()
+            job, disc_info, source, scratch, queued_at = self._current
+            try:
+                await self._remux(job, disc_info, source, queued_at)
+            except Exception as e:
+                logger.exception("Remux of job %s failed", job.id)
+                await self._fail(job.id, str(e))
+            finally:
+                self.queue.task_done()
+            # Left set when cancelled, for stop() to fail the job
+            self._current = None
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    async def _remux(self, job: Job, disc_info: dict, source: str, queued_at: datetime):
+        started = datetime.now(timezone.utc)
+        await self.job_manager.record_stage(job.id, "queued", queued_at, started)
+        success = await self.ripper.remux_title(
+            source=source,
+            duration=disc_info["duration"],
+            output_path=job.output_path,
+            on_progress=self._progress_callback(job.id, 50, 100),
+        )
+        await self.job_manager.record_stage(job.id, "remux", started, datetime.now(timezone.utc))
+
+        if not success:
+            await self._fail(job.id, "FFmpeg remux failed")
+            return
+        file_size = os.path.getsize(job.output_path) if os.path.exists(job.output_path) else 0
+        completed = await self.job_manager.mark_complete(job.id, file_size=file_size)
+        await self.ws_manager.broadcast({
+            "event": "job_complete",
+            "data": {**completed.model_dump(), "drive_id": self.drive_id},
+        })
+
+    async def _fail(self, job_id: str, error: str):
+        failed = await self.job_manager.mark_failed(job_id, error=error)
+        await self.ws_manager.broadcast({
+            "event": "job_failed",
+            "data": {**failed.model_dump(), "drive_id": self.drive_id},
+        })
+
+    def _progress_callback(self, job_id: str, low: int, high: int) -> Callable[[int], Awaitable[None]]:
+        """Map a stage's 0-100 progress onto ``low``-``high`` of the job's progress."""
+        async def on_progress(pct: int):
+            progress = low + pct * (high - low) // 100
+            await self.job_manager.update_progress(job_id, progress)
+            await self.ws_manager.broadcast({
+                "event": "job_progress",
+                "data": {"job_id": job_id, "drive_id": self.drive_id, "progress": progress},
+            })
+
+        return on_progress
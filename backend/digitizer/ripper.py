@@ -1,43 +1,80 @@
 import asyncio
 import logging
 import os
-import re
 import shutil
 import tempfile
 from collections.abc import Callable, Awaitable
 from pathlib import Path
 
+from digitizer.ffmpeg_runner import FFmpegProgress, run_ffmpeg
+
 logger = logging.getLogger(__name__)
 
-TIME_PATTERN = re.compile(r"time=(\d{2}):(\d{2}):(\d{2})\.(\d{2})")
+RIP_MODES = ("stream", "backup")
+
+
+def parse_demuxers(output: str) -> set[str]:
+    """Demuxer names from ``ffmpeg -demuxers`` output."""
+    names = set()
+    for line in output.splitlines():
+        parts = line.split()
+        # Entries look like " D  dvdvideo        DVD-Video"
+        if len(parts) >= 2 and set(parts[0]) <= {"D", "E", "d"}:
+            names.update(parts[1].split(","))
+    return names
+
+
+async def dvdvideo_supported() -> bool:
+    """Whether ffmpeg can read DVDs itself (7.1+, built with libdvdnav and libdvdread).
+
+    Stream rips and remuxing single titles from a mirrored disc need it.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-demuxers",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await proc.communicate()
+    except OSError:
+        return False
+    return "dvdvideo" in parse_demuxers(stdout.decode(errors="replace"))
 
 
 class DVDRipper:
-    def __init__(self, drive_device: str = "/dev/sr0"):
+    def __init__(self, drive_device: str = "/dev/sr0", rip_mode: str = "stream"):
         self.drive_device = drive_device
+        self.rip_mode = rip_mode
 
     def build_ffmpeg_command(
-        self, vob_path: str, output_path: str
+        self,
+        output_path: str,
+        vob_path: str | None = None,
+        title_number: int | None = None,
+        dvd_path: str | None = None,
     ) -> list[str]:
+        """Remux command reading ``vob_path``, or title ``title_number`` straight off the drive.
+
+        Without ``vob_path`` ffmpeg's DVD-video demuxer reads the title from
+        ``dvd_path`` or ``drive_device`` (a drive, ISO or VIDEO_TS directory),
+        so there is no intermediate copy.
+        """
+        if vob_path is not None:
+            source = ["-i", vob_path]
+        else:
+            source = ["-f", "dvdvideo", "-title", str(title_number), "-i", dvd_path or self.drive_device]
         return [
             "ffmpeg",
             "-y",
             "-hwaccel", "auto",
-            "-i", vob_path,
-            "-c:v", "copy",      # Copy video stream (fast)
-            "-c:a", "aac",       # Transcode audio to AAC (MP4-compatible)
+            *source,
+            "-c", "copy",        # Copy every stream untouched (fast)...
+            "-c:a", "aac",       # ...but transcode audio to AAC (MP4-compatible)
             "-b:a", "192k",      # Audio bitrate
             "-movflags", "+faststart",
             output_path,
         ]
 
-    def parse_time_from_progress(self, line: str) -> float | None:
-        match = TIME_PATTERN.search(line)
-        if not match:
-            return None
-        h, m, s, cs = match.groups()
-        return int(h) * 3600 + int(m) * 60 + int(s) + int(cs) / 100
-
     def calculate_progress(self, current_seconds: float, total_seconds: float) -> int:
         if total_seconds <= 0:
             return 0
@@ -52,83 +89,174 @@ class DVDRipper:
     ) -> bool:
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
+        if self.rip_mode == "backup":
+            return await self._rip_via_backup(title_number, duration, output_path, on_progress)
+
+        # Stream the title from the disc straight into the remux
+        logger.info("Streaming DVD title %d from %s", title_number, self.drive_device)
+        cmd = self.build_ffmpeg_command(output_path, title_number=title_number)
+        return await self._remux(cmd, duration, on_progress)
+
+    async def _rip_via_backup(
+        self,
+        title_number: int,
+        duration: float,
+        output_path: str,
+        on_progress: Callable[[int], Awaitable[None]] | None,
+    ) -> bool:
         # Create temporary directory for DVD extraction
         with tempfile.TemporaryDirectory() as tmpdir:
-            # Step 1: Extract DVD title using dvdbackup
-            logger.info("Extracting DVD title %d using dvdbackup", title_number)
-            backup_cmd = [
-                "dvdbackup",
-                "-i", self.drive_device,
-                "-o", tmpdir,
-                "-t", str(title_number),
-            ]
+            input_path = await self._backup_title(title_number, tmpdir)
+            if input_path is None:
+                return False
+            cmd = self.build_ffmpeg_command(output_path, vob_path=input_path)
+            return await self._remux(cmd, duration, on_progress)
 
-            proc = await asyncio.create_subprocess_exec(
-                *backup_cmd,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            await proc.wait()
+    async def _backup_title(self, title_number: int, dest_dir: str, source: str | None = None) -> str | None:
+        """Copy the title's VOBs into ``dest_dir`` with dvdbackup and return the remux input.
 
-            if proc.returncode != 0:
-                logger.error("dvdbackup exited with code %d", proc.returncode)
-                return False
+        Reads from ``source`` (a mirrored disc) if given, else the drive.
+        """
+        logger.info("Extracting DVD title %d using dvdbackup", title_number)
+        backup_cmd = [
+            "dvdbackup",
+            "-i", source or self.drive_device,
+            "-o", dest_dir,
+            "-t", str(title_number),
+        ]
 
-            # Step 2: Find the VOB files in the extracted directory
-            video_ts_dirs = list(Path(tmpdir).rglob("VIDEO_TS"))
-            if not video_ts_dirs:
-                logger.error("No VIDEO_TS directory found after extraction")
-                return False
+        proc = await asyncio.create_subprocess_exec(
+            *backup_cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await proc.wait()
 
-            video_ts = video_ts_dirs[0]
-            vob_files = sorted(video_ts.glob("VTS_*_[1-9].VOB"))
+        if proc.returncode != 0:
+            logger.error("dvdbackup exited with code %d", proc.returncode)
+            return None
 
-            if not vob_files:
-                logger.error("No VOB files found in VIDEO_TS")
-                return False
+        # Find the VOB files in the extracted directory
+        video_ts_dirs = list(Path(dest_dir).rglob("VIDEO_TS"))
+        if not video_ts_dirs:
+            logger.error("No VIDEO_TS directory found after extraction")
+            return None
 
-            # Step 3: Convert VOB to MP4 using FFmpeg
-            # Use concat protocol if multiple VOB files, otherwise single file
-            if len(vob_files) == 1:
-                input_path = str(vob_files[0])
-            else:
-                # Create concat file for multiple VOBs
-                concat_file = Path(tmpdir) / "concat.txt"
-                with open(concat_file, "w") as f:
-                    for vob in vob_files:
-                        f.write(f"file '{vob}'\n")
-                input_path = f"concat:{str(concat_file)}"
-
-            cmd = self.build_ffmpeg_command(input_path, output_path)
-            logger.info("Running: %s", " ".join(cmd))
+        video_ts = video_ts_dirs[0]
+        vob_files = sorted(video_ts.glob("VTS_*_[1-9].VOB"))
 
-            proc = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.PIPE,
-            )
+        if not vob_files:
+            logger.error("No VOB files found in VIDEO_TS")
+            return None
 
-            stderr_lines = []
-            async for raw_line in proc.stderr:
-                line = raw_line.decode("utf-8", errors="replace").strip()
-                if not line:
-                    continue
-                stderr_lines.append(line)
-                seconds = self.parse_time_from_progress(line)
-                if seconds is not None and on_progress:
-                    pct = self.calculate_progress(seconds, duration)
-                    await on_progress(pct)
+        # Use the concat protocol if multiple VOB files, otherwise single file
+        if len(vob_files) == 1:
+            return str(vob_files[0])
+        return "concat:" + "|".join(str(vob) for vob in vob_files)
 
-            await proc.wait()
-            success = proc.returncode == 0
-            if not success:
-                logger.error("FFmpeg exited with code %d", proc.returncode)
-                # Log last 20 lines of stderr for debugging
-                if stderr_lines:
-                    logger.error("FFmpeg stderr (last 20 lines):")
-                    for line in stderr_lines[-20:]:
-                        logger.error("  %s", line)
-            return success
+    def build_read_command(self, title_number: int, output_path: str) -> list[str]:
+        """Copy title ``title_number`` off the drive into an MPEG-PS file, untouched."""
+        return [
+            "ffmpeg",
+            "-y",
+            "-f", "dvdvideo",
+            "-title", str(title_number),
+            "-i", self.drive_device,
+            "-map", "0:v:0",
+            "-map", "0:a?",
+            "-c", "copy",
+            "-f", "vob",
+            output_path,
+        ]
+
+    async def read_title(
+        self,
+        title_number: int,
+        duration: float,
+        scratch_dir: str,
+        on_progress: Callable[[int], Awaitable[None]] | None = None,
+    ) -> str | None:
+        """Read stage of a pipelined rip: copy the title into ``scratch_dir``.
+
+        Returns the input for :meth:`remux_title`, or None if the read failed.
+        Once this returns the disc is no longer needed and can be ejected.
+        """
+        os.makedirs(scratch_dir, exist_ok=True)
+        if self.rip_mode == "backup":
+            return await self._backup_title(title_number, scratch_dir)
+
+        logger.info("Reading DVD title %d from %s to scratch", title_number, self.drive_device)
+        read_path = os.path.join(scratch_dir, f"title_{title_number:02d}.vob")
+        cmd = self.build_read_command(title_number, read_path)
+        if not await self._remux(cmd, duration, on_progress):
+            return None
+        return read_path
+
+    async def remux_title(
+        self,
+        source: str,
+        duration: float,
+        output_path: str,
+        on_progress: Callable[[int], Awaitable[None]] | None = None,
+        title_number: int | None = None,
+    ) -> bool:
+        """Remux stage of a pipelined rip: turn the scratch copy into the final MP4.
+
+        With ``title_number``, ``source`` is a mirrored disc (see
+        :meth:`read_disc`) and that title is read from it. In backup mode
+        the title's VOBs are first extracted from the mirror, since ffmpeg
+        may not be able to read DVDs itself.
+        """
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if title_number is None:
+            cmd = self.build_ffmpeg_command(output_path, vob_path=source)
+        elif self.rip_mode == "backup":
+            with tempfile.TemporaryDirectory(dir=os.path.dirname(source)) as tmpdir:
+                vob_path = await self._backup_title(title_number, tmpdir, source=source)
+                if vob_path is None:
+                    return False
+                cmd = self.build_ffmpeg_command(output_path, vob_path=vob_path)
+                return await self._remux(cmd, duration, on_progress)
+        else:
+            cmd = self.build_ffmpeg_command(output_path, title_number=title_number, dvd_path=source)
+        return await self._remux(cmd, duration, on_progress)
+
+    async def read_disc(self, dest_dir: str) -> str | None:
+        """Mirror the whole disc into ``dest_dir`` in one sequential read.
+
+        Returns the mirrored disc (the directory holding VIDEO_TS), from which
+        any number of titles can then be remuxed without touching the drive.
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+        logger.info("Mirroring DVD from %s using dvdbackup", self.drive_device)
+        proc = await asyncio.create_subprocess_exec(
+            "dvdbackup", "-M", "-i", self.drive_device, "-o", dest_dir,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await proc.wait()
+        if proc.returncode != 0:
+            logger.error("dvdbackup exited with code %d", proc.returncode)
+            return None
+
+        video_ts_dirs = list(Path(dest_dir).rglob("VIDEO_TS"))
+        if not video_ts_dirs:
+            logger.error("No VIDEO_TS directory found after extraction")
+            return None
+        return str(video_ts_dirs[0].parent)
+
+    async def _remux(
+        self,
+        cmd: list[str],
+        duration: float,
+        on_progress: Callable[[int], Awaitable[None]] | None,
+    ) -> bool:
+        async def report(progress: FFmpegProgress):
+            if on_progress:
+                await on_progress(self.calculate_progress(progress.out_time, duration))
+
+        result = await run_ffmpeg(cmd, on_progress=report)
+        return result.ok
 
     async def eject(self) -> bool:
         try:
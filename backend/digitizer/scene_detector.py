@@ -1,25 +1,110 @@
 import asyncio
+import copy
 import logging
+import multiprocessing
 import os
 import uuid
 from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
 
-from scenedetect import open_video, SceneManager
+import numpy as np
+from scenedetect import open_video, SceneManager, StatsManager
 from scenedetect.detectors import ContentDetector, ThresholdDetector
 
+from digitizer import frame_metrics
+from digitizer.ffmpeg_runner import run_ffmpeg
+
 logger = logging.getLogger(__name__)
 
 
+METRIC_KEYS = [ContentDetector.FRAME_SCORE_KEY, ThresholdDetector.THRESHOLD_VALUE_KEY]
+
+SCENE_ENGINES = ("pyscenedetect", "numpy", "coarse_to_fine")
+
+# Inputs per thumbnail ffmpeg run; each input holds its own demuxer and
+# decoder, so scenes are split into runs of this size to bound memory.
+THUMBNAILS_PER_PROCESS = 64
+
+# Seconds a coarse-to-fine window grows by while its edge is inside a run of
+# frames above the content threshold
+REFINE_STEP = 2.0
+# Coarse-to-fine decodes keyframes only and needs them at least this often
+MAX_KEYFRAME_SPACING = 4.0
+
+
+def _collect_stats(stats: StatsManager, first: int, end: int) -> tuple[np.ndarray, np.ndarray]:
+    """Copy per-frame content/brightness metrics out of a StatsManager."""
+    content = np.zeros(end - first, np.float32)
+    luma = np.zeros(end - first, np.float32)
+    for i, frame in enumerate(range(first, end)):
+        score, avg = stats.get_metrics(frame, METRIC_KEYS)
+        content[i] = score or 0.0
+        luma[i] = avg or 0.0
+    return content, luma
+
+
+def _detect_range(
+    video_path: str,
+    start: float,
+    end: float | None,
+    content_threshold: float,
+    fade_threshold: int,
+    collect_metrics: bool = False,
+) -> tuple[list[int], int, tuple[int, np.ndarray, np.ndarray] | None]:
+    """Detect cuts between ``start`` and ``end`` seconds (worker process entry point).
+
+    Returns the cut frame numbers, the frame number the range ended on and,
+    if requested, the first decoded frame with its metric series.
+    """
+    video = open_video(video_path)
+    if start > 0:
+        video.seek(start)
+    first = video.frame_number
+    stats = StatsManager() if collect_metrics else None
+    scene_manager = SceneManager(stats)
+    scene_manager.add_detector(ContentDetector(threshold=content_threshold))
+    scene_manager.add_detector(ThresholdDetector(threshold=fade_threshold))
+    scene_manager.detect_scenes(video, end_time=end)
+    scene_list = scene_manager.get_scene_list(start_in_scene=True)
+    end_frame = scene_list[-1][1].get_frames() if scene_list else video.frame_number
+    metrics = (first, *_collect_stats(stats, first, end_frame)) if stats else None
+    # A fade the range opened inside of can produce a cut before the seek point
+    cuts = [scene[0].get_frames() for scene in scene_list[1:] if scene[0].get_frames() > first]
+    return cuts, end_frame, metrics
+
+
 class SceneDetector:
     def __init__(
         self,
         content_threshold: float = 22.0,
         fade_threshold: int = 12,
         min_scene_length: float = 5.0,
+        workers: int = 1,
+        chunk_overlap: float = 10.0,
+        engine: str = "pyscenedetect",
+        coarse_fps: float = 4.0,
+        coarse_width: int = 128,
+        refine_padding: float = 0.5,
     ):
+        if engine not in SCENE_ENGINES:
+            raise ValueError(f"Unknown scene detection engine {engine!r} (expected one of {', '.join(SCENE_ENGINES)})")
         self.content_threshold = content_threshold
         self.fade_threshold = fade_threshold
         self.min_scene_length = min_scene_length
+        self.workers = workers
+        self.chunk_overlap = chunk_overlap
+        self.engine = engine
+        self.coarse_fps = coarse_fps
+        self.coarse_width = coarse_width
+        self.refine_padding = refine_padding
+
+    def with_thresholds(self, **overrides) -> "SceneDetector":
+        """Return a copy of this detector with some thresholds replaced."""
+        detector = copy.copy(self)
+        for key in ("content_threshold", "fade_threshold", "min_scene_length"):
+            if key in overrides:
+                setattr(detector, key, overrides[key])
+        return detector
 
     def filter_short_scenes(
         self, scenes: list[tuple[float, float]]
@@ -45,44 +130,83 @@ class SceneDetector:
             i += 1
         return filtered
 
-    def build_thumbnail_command(
-        self, video_path: str, timestamp: float, output_path: str
+    def build_thumbnails_command(
+        self, video_path: str, thumbnails: list[tuple[float, str]]
     ) -> list[str]:
-        return [
-            "ffmpeg",
-            "-y",
-            "-ss", f"{timestamp:.3f}",
-            "-i", video_path,
-            "-vframes", "1",
-            "-q:v", "2",
-            output_path,
-        ]
-
-    async def _extract_thumbnail(
-        self, video_path: str, timestamp: float, output_path: str
+        """One ffmpeg process for many thumbnails.
+
+        This saves process launches, not seeks: each timestamp still gets its
+        own input with an input-side ``-ss``, which seeks to the preceding
+        keyframe and decodes up to the timestamp. Every output maps exactly
+        one frame from its own input. Decoding once with a ``select`` filter
+        would read the whole capture, which costs far more than a seek per
+        scene on a tape hours long.
+        """
+        cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error"]
+        for timestamp, _ in thumbnails:
+            cmd += ["-threads", "1", "-ss", f"{timestamp:.3f}", "-i", video_path]
+        for i, (_, output_path) in enumerate(thumbnails):
+            cmd += ["-map", f"{i}:v:0", "-frames:v", "1", "-q:v", "2", output_path]
+        return cmd
+
+    async def _extract_thumbnails(
+        self, video_path: str, thumbnails: list[tuple[float, str]]
     ) -> bool:
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        cmd = self.build_thumbnail_command(video_path, timestamp, output_path)
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.DEVNULL,
-        )
-        await proc.wait()
-        return proc.returncode == 0
+        ok = True
+        for i in range(0, len(thumbnails), THUMBNAILS_PER_PROCESS):
+            batch = thumbnails[i:i + THUMBNAILS_PER_PROCESS]
+            for _, output_path in batch:
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            cmd = self.build_thumbnails_command(video_path, batch)
+            result = await run_ffmpeg(cmd)
+            ok = ok and result.ok
+        return ok
+
+    def _scene_records(
+        self,
+        scenes: list[tuple[float, float]],
+        thumbnail_dir: str,
+        ids: list[str] | None = None,
+    ) -> list[dict]:
+        ids = ids or []
+        records = []
+        for i, (start, end) in enumerate(scenes):
+            scene_index = i + 1
+            records.append({
+                "id": ids[i] if i < len(ids) else str(uuid.uuid4()),
+                "scene_index": scene_index,
+                "start_time": start,
+                "end_time": end,
+                "duration": round(end - start, 3),
+                "thumbnail_path": os.path.join(thumbnail_dir, f"scene_{scene_index:03d}.jpg"),
+            })
+        return records
+
+    async def _extract_scene_thumbnails(self, video_path: str, scenes: list[dict]) -> bool:
+        # Thumbnail at the start of each scene (offset by 0.5s for a better
+        # frame), THUMBNAILS_PER_PROCESS scenes per ffmpeg process
+        thumbnails = []
+        for scene in scenes:
+            start, end = scene["start_time"], scene["end_time"]
+            thumb_time = start + 0.5 if start + 0.5 < end else start
+            thumbnails.append((thumb_time, scene["thumbnail_path"]))
+        if not thumbnails:
+            return True
+        return await self._extract_thumbnails(video_path, thumbnails)
 
     async def analyze(
         self,
         video_path: str,
         thumbnail_dir: str,
         on_progress: Callable[[int], Awaitable[None]] | None = None,
+        metrics_dir: str | None = None,
     ) -> list[dict]:
         if on_progress:
             await on_progress(0)
 
-        # Run PySceneDetect (CPU-bound, run in thread)
+        # Run scene detection (CPU-bound, run in thread)
         raw_scenes = await asyncio.to_thread(
-            self._detect_scenes, video_path
+            self._detect_scenes, video_path, metrics_dir
         )
 
         if on_progress:
@@ -91,45 +215,347 @@ class SceneDetector:
         # Filter short scenes (static/noise)
         filtered = self.filter_short_scenes(raw_scenes)
 
-        # Extract thumbnails
-        scenes = []
-        for i, (start, end) in enumerate(filtered):
-            scene_index = i + 1
-            thumb_path = os.path.join(thumbnail_dir, f"scene_{scene_index:03d}.jpg")
+        scenes = self._scene_records(filtered, thumbnail_dir)
+        await self._extract_scene_thumbnails(video_path, scenes)
 
-            # Extract thumbnail at the start of each scene (offset by 0.5s for better frame)
-            thumb_time = start + 0.5 if start + 0.5 < end else start
-            await self._extract_thumbnail(video_path, thumb_time, thumb_path)
+        if on_progress:
+            await on_progress(100)
 
-            scenes.append({
-                "id": str(uuid.uuid4()),
-                "scene_index": scene_index,
-                "start_time": start,
-                "end_time": end,
-                "duration": round(end - start, 3),
-                "thumbnail_path": thumb_path,
-            })
+        return scenes
+
+    def plan_chunks(self, duration: float) -> list[tuple[float, float]]:
+        """Split ``duration`` into the time ranges each worker owns.
+
+        Chunks shorter than twice the overlap would spend most of their time
+        warming up, so fewer chunks than workers may be returned.
+        """
+        count = min(self.workers, int(duration // (2 * self.chunk_overlap)))
+        if count <= 1:
+            return [(0.0, duration)]
+        size = duration / count
+        return [(i * size, duration if i == count - 1 else (i + 1) * size) for i in range(count)]
+
+    def merge_chunk_cuts(
+        self,
+        chunk_cuts: list[list[int]],
+        owned_frames: list[tuple[int, int]],
+    ) -> list[int]:
+        """Merge per-chunk cut lists, keeping each cut only from the chunk that owns it.
+
+        Chunks are decoded with overlap on both sides so detector state is warm
+        at the seams; a cut seen by two neighbours is kept once.
+        """
+        merged = set()
+        for cuts, (own_start, own_end) in zip(chunk_cuts, owned_frames):
+            merged.update(c for c in cuts if own_start <= c < own_end)
+        return sorted(merged)
+
+    def cuts_to_scenes(
+        self, cuts: list[int], end_frame: int, fps: float
+    ) -> list[tuple[float, float]]:
+        if fps <= 0:
+            raise ValueError(f"Cannot place cuts without a frame rate (got {fps})")
+        bounds = [0, *cuts, end_frame]
+        return [(bounds[i] / fps, bounds[i + 1] / fps) for i in range(len(bounds) - 1)]
+
+    def _scenes_from_metrics(self, metrics: frame_metrics.FrameMetrics) -> list[tuple[float, float]]:
+        cuts = frame_metrics.detect_cuts(metrics, self.content_threshold, self.fade_threshold)
+        return self.cuts_to_scenes(cuts, metrics.frame_count, metrics.fps)
+
+    def _detect_scenes(
+        self, video_path: str, metrics_dir: str | None = None
+    ) -> list[tuple[float, float]]:
+        """Detect raw scenes, reusing or filling the per-frame metrics cache in ``metrics_dir``."""
+        if metrics_dir:
+            cached = frame_metrics.load_metrics(metrics_dir, video_path)
+            if cached is not None:
+                logger.info("Re-running cut detection on cached metrics in %s", metrics_dir)
+                return self._scenes_from_metrics(cached)
 
-            if on_progress:
-                pct = 50 + int((scene_index / len(filtered)) * 50)
-                await on_progress(min(pct, 100))
+        collect = metrics_dir is not None
+        if self.engine == "numpy":
+            metrics = frame_metrics.compute_metrics(video_path)
+            scenes = self._scenes_from_metrics(metrics)
+        elif self.engine == "coarse_to_fine":
+            # Assembled metrics are blank outside candidate windows, so they
+            # are not valid for re-tuning with other thresholds
+            scenes, metrics = self._detect_scenes_coarse_to_fine(video_path), None
+        elif self.workers > 1:
+            scenes, metrics = self._detect_scenes_parallel(video_path, collect)
+        else:
+            scenes, metrics = self._detect_scenes_serial(video_path, collect)
 
+        if metrics_dir and metrics is not None:
+            frame_metrics.save_metrics(metrics, metrics_dir, video_path)
         return scenes
 
-    def _detect_scenes(self, video_path: str) -> list[tuple[float, float]]:
+    def _detect_scenes_serial(
+        self, video_path: str, collect_metrics: bool = False
+    ) -> tuple[list[tuple[float, float]], frame_metrics.FrameMetrics | None]:
         video = open_video(video_path)
-        scene_manager = SceneManager()
+        stats = StatsManager() if collect_metrics else None
+        scene_manager = SceneManager(stats)
         scene_manager.add_detector(ContentDetector(threshold=self.content_threshold))
         scene_manager.add_detector(ThresholdDetector(threshold=self.fade_threshold))
         scene_manager.detect_scenes(video)
         scene_list = scene_manager.get_scene_list()
 
+        metrics = None
+        if stats is not None:
+            content, luma = _collect_stats(stats, 0, video.frame_number)
+            metrics = frame_metrics.FrameMetrics(video.frame_rate, content, luma)
+
         if not scene_list:
             # No cuts detected - entire video is one scene
             duration = video.duration.get_seconds()
-            return [(0.0, duration)]
+            return [(0.0, duration)], metrics
 
         return [
             (scene[0].get_seconds(), scene[1].get_seconds())
             for scene in scene_list
-        ]
+        ], metrics
+
+    def _detect_scenes_parallel(
+        self, video_path: str, collect_metrics: bool = False
+    ) -> tuple[list[tuple[float, float]], frame_metrics.FrameMetrics | None]:
+        video = open_video(video_path)
+        fps = video.frame_rate
+        duration = video.duration.get_seconds()
+        chunks = self.plan_chunks(duration)
+        if len(chunks) == 1:
+            # Too short to be worth splitting
+            return self._detect_scenes_serial(video_path, collect_metrics)
+
+        logger.info("Detecting scenes in %d chunks across %d workers", len(chunks), self.workers)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx) as pool:
+            futures = [
+                pool.submit(
+                    _detect_range,
+                    video_path,
+                    max(0.0, start - self.chunk_overlap),
+                    None if i == len(chunks) - 1 else end + self.chunk_overlap,
+                    self.content_threshold,
+                    self.fade_threshold,
+                    collect_metrics,
+                )
+                for i, (start, end) in enumerate(chunks)
+            ]
+            results = [f.result() for f in futures]
+
+        owned = [(round(start * fps), round(end * fps)) for start, end in chunks]
+        owned[-1] = (owned[-1][0], results[-1][1])
+        cuts = self.merge_chunk_cuts([r[0] for r in results], owned)
+
+        metrics = None
+        if collect_metrics:
+            # Stitch each chunk's owned slice of the metric series back together
+            content, luma = [], []
+            for (_, _, (first, c, l)), (own_start, own_end) in zip(results, owned):
+                content.append(c[own_start - first:own_end - first])
+                luma.append(l[own_start - first:own_end - first])
+            metrics = frame_metrics.FrameMetrics(fps, np.concatenate(content), np.concatenate(luma))
+
+        if not cuts:
+            return [(0.0, duration)], metrics
+        return self.cuts_to_scenes(cuts, results[-1][1], fps), metrics
+
+    def _detect_scenes_coarse_to_fine(self, video_path: str) -> list[tuple[float, float]]:
+        info = frame_metrics.probe_video(video_path)
+        fps = info["fps"]
+        coarse = frame_metrics.compute_metrics(
+            video_path,
+            target_width=self.coarse_width,
+            sample_fps=self.coarse_fps,
+            fast_decode=True,
+            info=info,
+        )
+        spacing = frame_metrics.keyframe_spacing(coarse)
+        if spacing > MAX_KEYFRAME_SPACING:
+            # Keyframes this far apart all differ like cuts; captures force
+            # them every DIGITIZER_KEYFRAME_INTERVAL seconds, other files may not
+            logger.info("Keyframes are %.1fs apart, analysing every frame instead", spacing)
+            return self._scenes_from_metrics(frame_metrics.compute_metrics(video_path, info=info))
+        windows = frame_metrics.candidate_windows(
+            coarse, self.content_threshold, self.fade_threshold, padding=self.refine_padding
+        )
+        frame_count = round(info["duration"] * fps) or round(coarse.frame_count * fps / self.coarse_fps)
+        logger.info(
+            "Coarse pass found %d candidate windows (%.1fs of %.1fs)",
+            len(windows), sum(end - start for start, end in windows), frame_count / fps,
+        )
+
+        refined: list[tuple[int, frame_metrics.FrameMetrics]] = []
+        for start, end in windows:
+            first, last = round(start * fps), min(round(end * fps), frame_count)
+            if refined and first < refined[-1][0] + refined[-1][1].frame_count:
+                # The previous window already grew into this one
+                first, window = refined.pop()
+            else:
+                floor = refined[-1][0] + refined[-1][1].frame_count - 1 if refined else 0
+                first, window = self._refine_backwards(video_path, info, first, last, floor)
+                if refined and first == floor:
+                    first, previous = refined.pop()
+                    window = frame_metrics.join_metrics(previous, window)
+            refined.append((first, self._refine_forwards(video_path, info, first, window, last, frame_count)))
+        logger.info(
+            "Decoded %.1fs of %.1fs at full rate",
+            sum(window.frame_count for _, window in refined) / fps, frame_count / fps,
+        )
+
+        metrics = frame_metrics.assemble_metrics(coarse, refined, fps, frame_count)
+        return self._scenes_from_metrics(metrics)
+
+    def _decode_frames(self, video_path: str, info: dict, first: int, last: int) -> frame_metrics.FrameMetrics:
+        fps = info["fps"]
+        # Seek half a frame early so the first decoded frame is exactly `first`
+        return frame_metrics.compute_metrics(
+            video_path,
+            start=max(0.0, (first - 0.5) / fps),
+            duration=(last - first) / fps,
+            info=info,
+        )
+
+    def _runs_hot(self, content: np.ndarray) -> bool:
+        return bool(np.any(content >= self.content_threshold))
+
+    def _refine_backwards(
+        self, video_path: str, info: dict, first: int, last: int, floor: int
+    ) -> tuple[int, frame_metrics.FrameMetrics]:
+        """Decode frames ``first`` to ``last`` at full rate, starting earlier (down
+        to ``floor``) while the window opens inside a run of frames above the
+        content threshold: the flash filter has to see such runs whole.
+        """
+        window = self._decode_frames(video_path, info, first, last)
+        grow = round(REFINE_STEP * info["fps"])
+        edge = frame_metrics.MIN_SCENE_FRAMES
+        while first > floor and self._runs_hot(window.content[1:1 + edge]):
+            head_first = max(floor, first - grow)
+            head = self._decode_frames(video_path, info, head_first, first + 1)
+            window, first = frame_metrics.join_metrics(head, window), head_first
+        return first, window
+
+    def _refine_forwards(
+        self,
+        video_path: str,
+        info: dict,
+        first: int,
+        window: frame_metrics.FrameMetrics,
+        last: int,
+        frame_count: int,
+    ) -> frame_metrics.FrameMetrics:
+        """Extend a full-rate window to frame ``last``, and further while it ends
+        inside a run of frames above the content threshold.
+        """
+        grow = round(REFINE_STEP * info["fps"])
+        edge = frame_metrics.MIN_SCENE_FRAMES
+        end = first + window.frame_count
+        while end < last or (end < frame_count and self._runs_hot(window.content[-edge:])):
+            tail = self._decode_frames(video_path, info, end - 1, min(frame_count, max(last, end + grow)))
+            if tail.frame_count < 2:
+                break
+            window = frame_metrics.join_metrics(window, tail)
+            end = first + window.frame_count
+        return window
+
+
+class LiveSceneDetector:
+    """Incremental scene detection over the low-res stream tee'd from a capture.
+
+    Raw ``bgr24`` frames are fed as they arrive; a scene is reported through
+    ``on_scene`` as soon as no later cut or short-scene merge can change it.
+    ``finish`` closes the last scene once recording stops and extracts all
+    thumbnails from the finalized capture file.
+    """
+
+    def __init__(
+        self,
+        detector: SceneDetector,
+        width: int,
+        height: int,
+        fps: float,
+        on_scene: Callable[[dict], Awaitable[None]] | None = None,
+    ):
+        self.detector = detector
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.on_scene = on_scene
+        self.scenes: list[dict] = []
+        self._frame_size = width * height * 3
+        self._buffer = bytearray()
+        self._accumulator = frame_metrics.MetricsAccumulator()
+        self._tracker = frame_metrics.CutTracker(detector.content_threshold, detector.fade_threshold)
+
+    @property
+    def frame_count(self) -> int:
+        return self._tracker.frame_count
+
+    async def feed(self, data: bytes) -> None:
+        self._buffer += data
+        usable = len(self._buffer) - len(self._buffer) % self._frame_size
+        if not usable:
+            return
+        frames = np.frombuffer(bytes(self._buffer[:usable]), np.uint8).reshape(
+            -1, self.height, self.width, 3
+        )
+        del self._buffer[:usable]
+        await asyncio.to_thread(self._process, frames)
+        await self._report_scenes()
+
+    async def skip(self, frames: int) -> None:
+        """Account for ``frames`` the capture dropped before analysis; keeps scene times right."""
+        self._buffer.clear()
+        self._tracker.skip(frames)
+        await self._report_scenes()
+
+    async def _report_scenes(self) -> None:
+        for start, end in self._confirmed_scenes()[len(self.scenes):]:
+            scene = {
+                "id": str(uuid.uuid4()),
+                "scene_index": len(self.scenes) + 1,
+                "start_time": start,
+                "end_time": end,
+                "duration": round(end - start, 3),
+                "thumbnail_path": None,
+            }
+            self.scenes.append(scene)
+            if self.on_scene:
+                await self.on_scene(scene)
+
+    def _process(self, frames: np.ndarray) -> None:
+        content, luma = self._accumulator.add_batch(frames)
+        self._tracker.feed(content, luma)
+
+    def _confirmed_scenes(self) -> list[tuple[float, float]]:
+        settled = self._tracker.settled_frame
+        cuts = sorted(c for c in self._tracker.cuts if c < settled)
+        if not cuts:
+            return []
+        scenes = self.detector.filter_short_scenes(
+            self.detector.cuts_to_scenes(cuts[:-1], cuts[-1], self.fps)
+        )
+        # The last scene may still absorb short scenes that follow it
+        return scenes[:-1]
+
+    def final_scenes(self) -> list[tuple[float, float]]:
+        if self.frame_count == 0:
+            return []
+        cuts = sorted(self._tracker.cuts)
+        return self.detector.filter_short_scenes(
+            self.detector.cuts_to_scenes(cuts, self.frame_count, self.fps)
+        )
+
+    async def finish(self, video_path: str, thumbnail_dir: str, duration: float | None = None) -> list[dict]:
+        """Close the scene list and extract thumbnails; scene ids already reported are kept.
+
+        ``duration`` drops the scenes past the end of a capture that was cut short.
+        """
+        final = self.final_scenes()
+        if duration is not None:
+            final = [(start, min(end, duration)) for start, end in final if start < duration]
+        scenes = self.detector._scene_records(
+            final, thumbnail_dir, ids=[s["id"] for s in self.scenes]
+        )
+        await self.detector._extract_scene_thumbnails(video_path, scenes)
+        return scenes
@@ -1,12 +1,61 @@
 import asyncio
+import bisect
+import glob
 import logging
+import math
 import os
+import shutil
 from collections.abc import Awaitable, Callable
 
+from digitizer import frame_metrics
+from digitizer.ffmpeg_runner import FFmpegProgress, run_ffmpeg
+
 logger = logging.getLogger(__name__)
 
+SPLIT_MODES = ("segment", "per_scene", "smart")
+SEGMENT_PATTERN = ".segment_%03d.mp4"
+# The segment muxer cuts at the first keyframe at most this much before a boundary
+SEGMENT_TIME_DELTA = 0.01
+# Scene edges closer than this (seconds) are treated as touching
+BOUNDARY_TOLERANCE = 0.001
+
+
+def format_time(seconds: float) -> str:
+    """Millisecond precision, or microseconds for times that need it (keyframe-snapped)."""
+    if abs(seconds - round(seconds, 3)) < 1e-9:
+        return f"{seconds:.3f}"
+    return f"{seconds:.6f}"
+
+
+def frames_between(start: float, end: float, anchor: float, fps: float) -> int:
+    """Frames of a constant-rate video presented in ``[start, end)``.
+
+    Frames sit at ``anchor + n / fps``; any keyframe's time works as anchor.
+    """
+    # Times are rounded to microseconds; a frame that close to a bound counts as on it
+    first = math.ceil((start - anchor) * fps - 1e-3)
+    last = math.ceil((end - anchor) * fps - 1e-3)
+    return max(0, last - first)
+
+
+def source_fingerprint(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def split_key(fingerprint: str, start_time: float, end_time: float, mode: str) -> str:
+    """Identity of a split output: source file, scene boundaries and split mode."""
+    return f"{fingerprint}:{start_time:.6f}:{end_time:.6f}:{mode}"
+
 
 class VideoSplitter:
+    def __init__(self, encoding_preset: str = "fast", crf_quality: int = 23):
+        # Used for the re-encoded GOP edges in smart mode. They should match
+        # the capture's encoder settings: x264 then writes the same SPS/PPS,
+        # and the copied GOPs decode with the headers of the edge before them.
+        self.encoding_preset = encoding_preset
+        self.crf_quality = crf_quality
+
     def build_split_command(
         self,
         input_path: str,
@@ -14,17 +63,147 @@ class VideoSplitter:
         end_time: float,
         output_path: str,
     ) -> list[str]:
+        # Input-side seek: ffmpeg jumps to the keyframe instead of reading
+        # everything before the scene (exactly onto it for snapped scenes)
+        return [
+            "ffmpeg",
+            "-y",
+            "-ss", format_time(start_time),
+            "-i", input_path,
+            "-t", format_time(end_time - start_time),
+            "-c", "copy",
+            "-movflags", "+faststart",
+            output_path,
+        ]
+
+    def plan_smart_parts(
+        self, start_time: float, end_time: float, keyframes: list[float]
+    ) -> list[tuple[str, float, float]]:
+        """Split a scene into ``("encode" | "copy", start, end)`` parts.
+
+        Only the partial GOPs before the first and after the last keyframe
+        inside the scene are re-encoded; whole GOPs in between are copied.
+        """
+        first = bisect.bisect_left(keyframes, start_time - BOUNDARY_TOLERANCE)
+        last = bisect.bisect_right(keyframes, end_time + BOUNDARY_TOLERANCE) - 1
+        if first >= len(keyframes) or last < 0 or keyframes[first] >= keyframes[last]:
+            return [("encode", start_time, end_time)]
+
+        copy_start, copy_end = keyframes[first], keyframes[last]
+        parts = []
+        if copy_start - start_time > BOUNDARY_TOLERANCE:
+            parts.append(("encode", start_time, copy_start))
+        parts.append(("copy", copy_start, copy_end))
+        if end_time - copy_end > BOUNDARY_TOLERANCE:
+            parts.append(("encode", copy_end, end_time))
+        return parts
+
+    def build_part_command(
+        self, input_path: str, kind: str, start_time: float, frames: int, output_path: str
+    ) -> list[str]:
+        """Video of one smart-split part: ``frames`` frames from ``start_time``.
+
+        Parts are cut by frame count rather than duration: with B-frames a
+        stream copy limited by ``-t`` keeps packets whose decode time is
+        before the end but that are shown after it. Audio is left out and
+        taken from the source in one piece when the parts are joined.
+        """
+        # MPEG-TS parts carry their own SPS/PPS, so re-encoded and copied
+        # pieces can be joined without mismatched codec headers
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-ss", format_time(start_time),
+            "-i", input_path,
+            "-map", "0:v:0",
+            "-frames:v", str(frames),
+        ]
+        if kind == "copy":
+            cmd += ["-c:v", "copy", "-bsf:v", "h264_mp4toannexb"]
+        else:
+            cmd += [
+                "-c:v", "libx264",
+                "-preset", self.encoding_preset,
+                "-crf", str(self.crf_quality),
+            ]
+        cmd += ["-f", "mpegts", output_path]
+        return cmd
+
+    def build_concat_command(
+        self, list_path: str, input_path: str, start_time: float, end_time: float, output_path: str
+    ) -> list[str]:
+        """Join the video parts and add the scene's audio, copied in one piece."""
         return [
             "ffmpeg",
             "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", list_path,
+            "-ss", format_time(start_time),
+            "-t", format_time(end_time - start_time),
             "-i", input_path,
-            "-ss", f"{start_time:.3f}",
-            "-to", f"{end_time:.3f}",
+            "-map", "0:v:0",
+            "-map", "1:a:0?",
             "-c", "copy",
             "-movflags", "+faststart",
             output_path,
         ]
 
+    def segment_boundaries(self, scenes: list[dict]) -> list[float] | None:
+        """Cut times for a one-pass segment split, or None if scenes overlap.
+
+        Gaps between scenes become segments of their own that are discarded.
+        """
+        boundaries = []
+        last_end = 0.0
+        for scene in scenes:
+            start, end = scene["start_time"], scene["end_time"]
+            if start < last_end - BOUNDARY_TOLERANCE or end - start <= BOUNDARY_TOLERANCE:
+                return None
+            if start - last_end > BOUNDARY_TOLERANCE:
+                boundaries.append(start)
+            boundaries.append(end)
+            last_end = end
+        return boundaries
+
+    def segments_line_up(self, boundaries: list[float], keyframes: list[float]) -> bool:
+        """Whether every boundary starts a segment of its own.
+
+        With ``-c copy`` the segment muxer can only cut on a keyframe, so two
+        boundaries inside one GOP (a scene or gap shorter than it) share a
+        cut and every later segment number shifts. A last boundary past the
+        final keyframe only loses the discarded tail.
+        """
+        cuts = []
+        for boundary in boundaries:
+            i = bisect.bisect_left(keyframes, boundary - SEGMENT_TIME_DELTA)
+            if i >= len(keyframes):
+                cuts.append(None)
+            elif cuts and cuts[-1] is not None and keyframes[i] <= cuts[-1]:
+                return False
+            else:
+                cuts.append(keyframes[i])
+        return None not in cuts[:-1]
+
+    def build_segment_command(
+        self, input_path: str, boundaries: list[float], output_pattern: str
+    ) -> list[str]:
+        return [
+            "ffmpeg",
+            "-y",
+            "-i", input_path,
+            "-map", "0:v:0",
+            "-map", "0:a:0?",
+            "-c", "copy",
+            "-f", "segment",
+            "-segment_times", ",".join(format_time(t) for t in boundaries),
+            "-segment_time_delta", f"{SEGMENT_TIME_DELTA:g}",
+            "-segment_format", "mp4",
+            "-segment_format_options", "movflags=+faststart",
+            "-reset_timestamps", "1",
+            output_pattern,
+        ]
+
     async def split_scene(
         self,
         input_path: str,
@@ -34,15 +213,51 @@ class VideoSplitter:
     ) -> bool:
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         cmd = self.build_split_command(input_path, start_time, end_time, output_path)
-        logger.info("Splitting: %s", " ".join(cmd))
+        return await self._run(cmd)
 
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.DEVNULL,
-        )
-        await proc.wait()
-        return proc.returncode == 0
+    async def split_scene_smart(
+        self,
+        input_path: str,
+        start_time: float,
+        end_time: float,
+        output_path: str,
+        keyframes: list[float],
+        fps: float,
+    ) -> bool:
+        """Frame-accurate split that only re-encodes the partial GOPs at the edges.
+
+        ``fps`` is the input's (constant) frame rate, used to count the frames
+        of each part.
+        """
+        parts = self.plan_smart_parts(start_time, end_time, keyframes)
+        anchor = keyframes[0] if keyframes else 0.0
+        base, _ = os.path.splitext(output_path)
+        work_dir = os.path.join(os.path.dirname(output_path), "." + os.path.basename(base))
+        os.makedirs(work_dir, exist_ok=True)
+        try:
+            part_paths = []
+            for i, (kind, part_start, part_end) in enumerate(parts):
+                part_path = os.path.join(work_dir, f"part_{i}.ts")
+                frames = frames_between(part_start, part_end, anchor, fps)
+                cmd = self.build_part_command(input_path, kind, part_start, frames, part_path)
+                if not await self._run(cmd):
+                    return False
+                part_paths.append(part_path)
+
+            list_path = os.path.join(work_dir, "parts.txt")
+            with open(list_path, "w") as f:
+                for part_path in part_paths:
+                    escaped = part_path.replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            return await self._run(
+                self.build_concat_command(list_path, input_path, start_time, end_time, output_path)
+            )
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def _run(self, cmd: list[str]) -> bool:
+        result = await run_ffmpeg(cmd)
+        return result.ok
 
     async def split_all(
         self,
@@ -50,28 +265,212 @@ class VideoSplitter:
         scenes: list[dict],
         output_dir: str,
         on_progress: Callable[[int, int], Awaitable[None]] | None = None,
-    ) -> list[str]:
+        concurrency: int = 1,
+        mode: str = "per_scene",
+        keyframes: list[float] | None = None,
+    ) -> list[str | None]:
+        """Split every scene into ``output_dir``.
+
+        ``per_scene`` runs up to ``concurrency`` ffmpeg processes at once.
+        ``segment`` mode reads the input once and writes all scenes through
+        ffmpeg's segment muxer (cuts snap to keyframes); it needs the input's
+        sorted ``keyframes`` times to check that each scene gets a segment of
+        its own, and falls back to ``per_scene`` when one doesn't, when scenes
+        overlap or when the pass fails. ``smart`` works like ``per_scene`` but
+        is frame-accurate, re-encoding only the partial GOPs at each cut; it
+        also needs ``keyframes`` and an H.264 input, and falls back to
+        ``per_scene`` for anything else.
+
+        The result is aligned with ``scenes``: each entry is the output path or
+        ``None`` if that scene failed. Progress is reported in the order of
+        ``scenes`` even when later scenes finish first.
+        """
         os.makedirs(output_dir, exist_ok=True)
-        output_paths = []
+        if mode == "segment" and scenes:
+            # The segment pass reads up to the last scene's end; a handful of
+            # scenes out of a long tape is cheaper with one seek each
+            covered = sum(s["end_time"] - s["start_time"] for s in scenes)
+            if covered < max(s["end_time"] for s in scenes) / 2:
+                mode = "per_scene"
+        if mode == "segment":
+            boundaries = self.segment_boundaries(scenes)
+            if boundaries is None:
+                logger.info("Scenes overlap, using per-scene splitting")
+            elif keyframes is None or not self.segments_line_up(boundaries, keyframes):
+                logger.info("Scene cuts share keyframes, using per-scene splitting")
+            else:
+                paths = await self._split_segments(input_path, scenes, boundaries, output_dir, on_progress)
+                if paths is not None:
+                    return paths
+                logger.warning("Segment split failed, falling back to per-scene splitting")
+        fps = None
+        if mode == "smart":
+            if keyframes is None:
+                raise ValueError("Smart splitting needs a keyframe index")
+            info = await asyncio.to_thread(frame_metrics.probe_video, input_path)
+            if info.get("codec") == "h264" and info["fps"] > 0:
+                fps = info["fps"]
+            else:
+                # The edges are encoded with libx264 and joined to copied GOPs
+                logger.info("Smart splitting needs constant-rate H.264, using per-scene splitting")
+        return await self._split_per_scene(
+            input_path, scenes, output_dir, on_progress, concurrency,
+            keyframes=keyframes if fps else None, fps=fps,
+        )
+
+    async def split_changed(
+        self,
+        input_path: str,
+        scenes: list[dict],
+        output_dir: str,
+        on_progress: Callable[[int, int], Awaitable[None]] | None = None,
+        concurrency: int = 1,
+        mode: str = "per_scene",
+        keyframes: list[float] | None = None,
+    ) -> tuple[list[str | None], list[str | None]]:
+        """Re-split only scenes whose output no longer matches.
+
+        A scene's existing ``split_path`` is reused (renamed if its index
+        changed) when its ``split_key`` still matches the source fingerprint,
+        boundaries and mode; everything else goes through ``split_all``.
+        Returns paths and split keys aligned with ``scenes`` (``None`` for
+        scenes that failed) and removes outputs no scene refers to anymore.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        fingerprint = source_fingerprint(input_path)
+        keys = [split_key(fingerprint, s["start_time"], s["end_time"], mode) for s in scenes]
+        targets = [os.path.join(output_dir, f"scene_{s['scene_index']:03d}.mp4") for s in scenes]
+        reuse = [
+            bool(s.get("split_path")) and s.get("split_key") == key and os.path.exists(s["split_path"])
+            for s, key in zip(scenes, keys)
+        ]
 
+        # Park moved files first so renames and new splits can't clobber them
+        parked = {}
         for i, scene in enumerate(scenes):
-            idx = scene["scene_index"]
-            output_path = os.path.join(output_dir, f"scene_{idx:03d}.mp4")
+            if reuse[i] and scene["split_path"] != targets[i]:
+                parked[i] = os.path.join(output_dir, f".reuse_{i:03d}.mp4")
+                os.replace(scene["split_path"], parked[i])
+        for i, path in parked.items():
+            os.replace(path, targets[i])
 
-            success = await self.split_scene(
-                input_path=input_path,
-                start_time=scene["start_time"],
-                end_time=scene["end_time"],
-                output_path=output_path,
-            )
+        todo = [i for i in range(len(scenes)) if not reuse[i]]
+        logger.info("Re-splitting %d of %d scenes", len(todo), len(scenes))
+        results = await self.split_all(
+            input_path, [scenes[i] for i in todo], output_dir,
+            on_progress=on_progress, concurrency=concurrency, mode=mode, keyframes=keyframes,
+        )
+
+        paths: list[str | None] = list(targets)
+        for i, path in zip(todo, results):
+            paths[i] = path
+        keep = {p for p in paths if p}
+        for stale in glob.glob(os.path.join(output_dir, "scene_*.mp4")):
+            if stale not in keep:
+                os.remove(stale)
+        return paths, [key if path else None for key, path in zip(keys, paths)]
+
+    async def _split_segments(
+        self,
+        input_path: str,
+        scenes: list[dict],
+        boundaries: list[float],
+        output_dir: str,
+        on_progress: Callable[[int, int], Awaitable[None]] | None,
+    ) -> list[str | None] | None:
+        for stale in glob.glob(os.path.join(output_dir, ".segment_*.mp4")):
+            os.remove(stale)
+        cmd = self.build_segment_command(input_path, boundaries, os.path.join(output_dir, SEGMENT_PATTERN))
+        reported = 0
+
+        async def report(progress: FFmpegProgress):
+            nonlocal reported
+            while reported < len(scenes) and scenes[reported]["end_time"] <= progress.out_time:
+                reported += 1
+                if on_progress:
+                    await on_progress(int(reported / len(scenes) * 100), scenes[reported - 1]["scene_index"])
+
+        result = await run_ffmpeg(cmd, on_progress=report)
+        if not result.ok:
+            return None
 
-            if success:
+        # Segment numbers follow the boundaries, with gap segments in between scenes
+        output_paths = []
+        segment = 0
+        last_end = 0.0
+        for scene in scenes:
+            if scene["start_time"] - last_end > BOUNDARY_TOLERANCE:
+                segment += 1
+            source = os.path.join(output_dir, SEGMENT_PATTERN % segment)
+            output_path = os.path.join(output_dir, f"scene_{scene['scene_index']:03d}.mp4")
+            if os.path.exists(source):
+                os.replace(source, output_path)
                 output_paths.append(output_path)
             else:
+                logger.error("Failed to split scene %d", scene["scene_index"])
+                output_paths.append(None)
+            segment += 1
+            last_end = scene["end_time"]
+        for leftover in glob.glob(os.path.join(output_dir, ".segment_*.mp4")):
+            os.remove(leftover)
+
+        if on_progress:
+            while reported < len(scenes):
+                reported += 1
+                await on_progress(int(reported / len(scenes) * 100), scenes[reported - 1]["scene_index"])
+        return output_paths
+
+    async def _split_per_scene(
+        self,
+        input_path: str,
+        scenes: list[dict],
+        output_dir: str,
+        on_progress: Callable[[int, int], Awaitable[None]] | None,
+        concurrency: int,
+        keyframes: list[float] | None = None,
+        fps: float | None = None,
+    ) -> list[str | None]:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def split_one(scene: dict) -> str | None:
+            idx = scene["scene_index"]
+            output_path = os.path.join(output_dir, f"scene_{idx:03d}.mp4")
+            async with semaphore:
+                try:
+                    if keyframes is None:
+                        success = await self.split_scene(
+                            input_path=input_path,
+                            start_time=scene["start_time"],
+                            end_time=scene["end_time"],
+                            output_path=output_path,
+                        )
+                    else:
+                        success = await self.split_scene_smart(
+                            input_path=input_path,
+                            start_time=scene["start_time"],
+                            end_time=scene["end_time"],
+                            output_path=output_path,
+                            keyframes=keyframes,
+                            fps=fps,
+                        )
+                except OSError:
+                    logger.exception("Failed to split scene %d", idx)
+                    return None
+            if not success:
                 logger.error("Failed to split scene %d", idx)
+                return None
+            return output_path
 
-            if on_progress:
-                pct = int(((i + 1) / len(scenes)) * 100)
-                await on_progress(pct, idx)
+        tasks = [asyncio.create_task(split_one(scene)) for scene in scenes]
+        output_paths = []
+        try:
+            for i, (scene, task) in enumerate(zip(scenes, tasks)):
+                output_paths.append(await task)
+                if on_progress:
+                    pct = int(((i + 1) / len(scenes)) * 100)
+                    await on_progress(pct, scene["scene_index"])
+        finally:
+            for task in tasks:
+                task.cancel()
 
         return output_paths
@@ -0,0 +1,199 @@
+"""Ripping every title of a multi-episode disc.
+
+The whole disc is mirrored to scratch in one sequential read, after which it
+can be ejected, and the titles are then remuxed from the mirror in parallel,
+each into a child job under the disc's job. Mirrors from every drive share
+one remux queue: discs are remuxed one at a time, and like the rip pipeline
+only a few mirrors can wait, so the next disc holds its drive until there is
+room and scratch space stays bounded.
+"""
+import asyncio
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+
+from digitizer.jobs import JobManager
+from digitizer.models import Job, JobStatus
+from digitizer.pipeline import MAX_QUEUED_REMUXES
+from digitizer.ripper import DVDRipper
+from digitizer.ws import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+RIP_TITLES = ("main", "all")
+
+
+def select_titles(disc_info: dict, min_length: float) -> list[dict]:
+    """Titles at least ``min_length`` seconds long, or just the main title if none are."""
+    titles = [t for t in disc_info.get("titles", []) if t["duration"] >= min_length]
+    if not titles:
+        titles = [{"number": disc_info["main_title"], "duration": disc_info["duration"]}]
+    return titles
+
+
+class TitleSetRip:
+    def __init__(
+        self,
+        ripper: DVDRipper,
+        job_manager: JobManager,
+        ws_manager: ConnectionManager,
+        scratch_dir: str,
+        concurrency: int = 2,
+        drive_id: str | None = None,
+    ):
+        self.ripper = ripper
+        self.job_manager = job_manager
+        self.ws_manager = ws_manager
+        self.scratch_dir = scratch_dir
+        self.concurrency = max(1, concurrency)
+        self.drive_id = drive_id
+
+    async def read(self, parent: Job, children: list[Job]) -> str | None:
+        """Mirror the disc; returns the mirror, or None (all jobs failed) if the read failed."""
+        started = datetime.now(timezone.utc)
+        disc_dir = await self.ripper.read_disc(self.scratch_dir)
+        await self.job_manager.record_stage(parent.id, "read", started, datetime.now(timezone.utc))
+
+        if disc_dir is None:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+            for job in [*children, parent]:
+                await self._fail(job.id, "DVD read failed")
+            return None
+
+        await self._progress(parent.id, 50)
+        return disc_dir
+
+    async def remux(self, parent: Job, children: list[Job], disc_dir: str) -> bool:
+        """Remux every title from the mirror, then complete the disc job."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done = 0
+
+        async def remux_one(child: Job) -> bool:
+            nonlocal done
+            async with semaphore:
+                ok = await self._remux_child(child, disc_dir)
+            done += 1
+            await self._progress(parent.id, 50 + 50 * done // len(children))
+            return ok
+
+        started = datetime.now(timezone.utc)
+        try:
+            results = await asyncio.gather(*(remux_one(child) for child in children))
+        finally:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+        await self.job_manager.record_stage(parent.id, "remux", started, datetime.now(timezone.utc))
+
+        failures = results.count(False)
+        if failures:
+            await self._fail(parent.id, f"{failures} of {len(children)} titles failed")
+            return False
+        file_size = 0
+        for child in children:
+            job = await self.job_manager.get_job(child.id)
+            file_size += job.file_size or 0
+        completed = await self.job_manager.mark_complete(parent.id, file_size=file_size)
+        await self.ws_manager.broadcast({
+            "event": "job_complete",
+            "data": {**completed.model_dump(), "drive_id": self.drive_id},
+        })
+        return True
+
+    async def fail_unfinished(self, parent: Job, children: list[Job], error: str):
+        """Fail the disc job and its unfinished titles, and remove the mirror."""
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+        for job in [*children, parent]:
+            current = await self.job_manager.get_job(job.id)
+            if current is not None and current.status not in (JobStatus.COMPLETE, JobStatus.FAILED):
+                await self._fail(job.id, error)
+
+    async def _remux_child(self, child: Job, disc_dir: str) -> bool:
+        await self.job_manager.mark_ripping(child.id)
+        started = datetime.now(timezone.utc)
+        try:
+            ok = await self.ripper.remux_title(
+                source=disc_dir,
+                duration=child.disc_info.duration,
+                output_path=child.output_path,
+                on_progress=lambda pct: self._progress(child.id, pct),
+                title_number=child.disc_info.main_title,
+            )
+        except Exception:
+            logger.exception("Remux of title %d failed", child.disc_info.main_title)
+            ok = False
+        await self.job_manager.record_stage(child.id, "remux", started, datetime.now(timezone.utc))
+
+        if not ok:
+            await self._fail(child.id, "FFmpeg remux failed")
+            return False
+        file_size = os.path.getsize(child.output_path) if os.path.exists(child.output_path) else 0
+        completed = await self.job_manager.mark_complete(child.id, file_size=file_size)
+        await self.ws_manager.broadcast({
+            "event": "job_complete",
+            "data": {**completed.model_dump(), "drive_id": self.drive_id},
+        })
+        return True
+
+    async def _progress(self, job_id: str, progress: int):
+        await self.job_manager.update_progress(job_id, progress)
+        await self.ws_manager.broadcast({
+            "event": "job_progress",
+            "data": {"job_id": job_id, "drive_id": self.drive_id, "progress": progress},
+        })
+
+    async def _fail(self, job_id: str, error: str):
+        failed = await self.job_manager.mark_failed(job_id, error=error)
+        await self.ws_manager.broadcast({
+            "event": "job_failed",
+            "data": {**failed.model_dump(), "drive_id": self.drive_id},
+        })
+
+
+class TitleSetQueue:
+    """Remuxes of mirrored discs, one disc at a time across all drives."""
+
+    def __init__(self, max_queued: int = MAX_QUEUED_REMUXES):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._current: tuple | None = None
+
+    @property
+    def busy(self) -> bool:
+        """Whether a remux is running or queued."""
+        return self._current is not None or not self.queue.empty()
+
+    async def put(self, rip: TitleSetRip, parent: Job, children: list[Job], disc_dir: str) -> asyncio.Event:
+        """Queue a mirrored disc, waiting while the queue is full; the returned event is set once it is done."""
+        done = asyncio.Event()
+        try:
+            await self.queue.put((rip, parent, children, disc_dir, done))
+        except asyncio.CancelledError:
+            await rip.fail_unfinished(parent, children, "Remux interrupted")
+            raise
+        return done
+
+    async def run(self):
+        """Remux queued discs until cancelled; the running and queued ones then fail."""
+        try:
+            while True:
+                self._current = await self.queue.get()
+                rip, parent, children, disc_dir, done = self._current
+                try:
+                    await rip.remux(parent, children, disc_dir)
+                except Exception as e:
+                    logger.exception("Remux of disc job %s failed", parent.id)
+                    await rip.fail_unfinished(parent, children, str(e))
+                finally:
+                    self.queue.task_done()
+                # Left set when cancelled, for the failure below
+                self._current = None
+                done.set()
+        except asyncio.CancelledError:
+            pending = [self._current] if self._current is not None else []
+            self._current = None
+            while not self.queue.empty():
+                pending.append(self.queue.get_nowait())
+                self.queue.task_done()
+            for rip, parent, children, _, done in pending:
+                await rip.fail_unfinished(parent, children, "Remux interrupted")
+                done.set()
+            raise
@@ -0,0 +1,252 @@
+"""Re-encoding finished captures in the background.
+
+Captures are encoded with whatever preset keeps up with the tape, which
+leaves them much larger than they need to be. Queued captures are encoded
+again with a slower preset (optionally deinterlaced and denoised) while the
+machine is otherwise idle: the encode runs at the lowest CPU priority, waits
+for running captures and rips to finish, and is suspended whenever a new one
+starts. The new file is written next to the capture and renamed over it, so
+a failed or interrupted encode leaves the original untouched.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from digitizer.ffmpeg_runner import FFmpegProcess, FFmpegProgress
+from digitizer.jobs import JobManager
+from digitizer.ws import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+TRANSCODE_NICENESS = 19
+# Seconds between checks for a capture or rip starting or finishing
+BUSY_POLL = 2.0
+
+
+def build_transcode_command(
+    input_path: str,
+    output_path: str,
+    preset: str = "slow",
+    crf: int = 23,
+    deinterlace: bool = False,
+    denoise: bool = False,
+    keyframe_interval: float = 2.0,
+    fragmented: bool = False,
+) -> list[str]:
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-i", input_path,
+        "-map", "0:v:0",
+        "-map", "0:a?",
+    ]
+    filters = []
+    if deinterlace:
+        filters.append("yadif")
+    if denoise:
+        filters.append("hqdn3d")
+    if filters:
+        cmd += ["-vf", ",".join(filters)]
+    cmd += [
+        "-c:v", "libx264",
+        "-preset", preset,
+        "-crf", str(crf),
+    ]
+    if keyframe_interval > 0:
+        # Same keyframe spacing as the capture, so scene splits stay as precise
+        cmd += ["-force_key_frames", f"expr:gte(t,n_forced*{keyframe_interval:g})"]
+    # Written like the captures: fragments avoid the faststart rewrite at the end
+    movflags = "+frag_keyframe+empty_moov+default_base_moof" if fragmented else "+faststart"
+    cmd += [
+        "-c:a", "copy",
+        "-movflags", movflags,
+        output_path,
+    ]
+    return cmd
+
+
+def transcode_path(output_path: str) -> str:
+    """Where the new encode is written before it replaces ``output_path``."""
+    base, ext = os.path.splitext(output_path)
+    return f"{base}.transcode{ext}"
+
+
+def original_path(output_path: str) -> str:
+    """Where the capture as recorded is kept with ``transcode_keep_original``."""
+    base, ext = os.path.splitext(output_path)
+    return f"{base}_original{ext}"
+
+
+class TranscodeQueue:
+    def __init__(
+        self,
+        job_manager: JobManager,
+        ws_manager: ConnectionManager,
+        is_busy: Callable[[], bool],
+        keyframe_interval: float = 2.0,
+        fragmented: bool = False,
+    ):
+        self.job_manager = job_manager
+        self.db = job_manager.db
+        self.ws_manager = ws_manager
+        self.is_busy = is_busy
+        self.keyframe_interval = keyframe_interval
+        self.fragmented = fragmented
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def enqueue(self, job_id: str):
+        await self.db.update_job(job_id, transcode_status="queued")
+        await self.queue.put(job_id)
+
+    async def recover(self):
+        """Queue again whatever was queued or encoding when the process stopped."""
+        for job in await self.job_manager.list_jobs(limit=-1, source_type="vhs", status="complete"):
+            if job.transcode_status not in ("queued", "transcoding"):
+                continue
+            partial = transcode_path(job.output_path)
+            if os.path.exists(partial):
+                os.remove(partial)
+            await self.enqueue(job.id)
+
+    async def run(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self.transcode(job_id)
+            except Exception as e:
+                logger.exception("Transcode of job %s failed", job_id)
+                await self._fail(job_id, str(e))
+            finally:
+                self.queue.task_done()
+
+    async def _wait_until_idle(self):
+        while self.is_busy():
+            await asyncio.sleep(BUSY_POLL)
+
+    async def transcode(self, job_id: str):
+        job = await self.job_manager.get_job(job_id)
+        if job is None:
+            return
+        if job.status != "complete" or not job.output_path or not os.path.exists(job.output_path):
+            await self._fail(job_id, "Capture file is missing")
+            return
+
+        await self._wait_until_idle()
+        settings = await self.db.get_settings()
+        preset = settings.get("transcode_preset", "slow")
+        crf = int(settings.get("transcode_crf", 23))
+        deinterlace = settings.get("transcode_deinterlace", False)
+        denoise = settings.get("transcode_denoise", False)
+        keep_original = settings.get("transcode_keep_original", False)
+
+        started = datetime.now(timezone.utc)
+        await self.db.update_job(job_id, transcode_status="transcoding")
+        await self.ws_manager.broadcast({"event": "transcode_started", "data": {"job_id": job_id}})
+
+        async def on_progress(progress: FFmpegProgress):
+            await self.ws_manager.broadcast({
+                "event": "transcode_progress",
+                "data": {"job_id": job_id, "elapsed": progress.out_time, "speed": progress.speed},
+            })
+
+        partial = transcode_path(job.output_path)
+        runner = FFmpegProcess(
+            build_transcode_command(
+                job.output_path, partial, preset=preset, crf=crf,
+                deinterlace=deinterlace, denoise=denoise, keyframe_interval=self.keyframe_interval,
+                fragmented=self.fragmented,
+            ),
+            on_progress=on_progress,
+            niceness=TRANSCODE_NICENESS,
+        )
+        try:
+            await runner.start()
+            holder = asyncio.create_task(self._hold_while_busy(runner, job_id))
+            try:
+                result = await runner.wait()
+            finally:
+                holder.cancel()
+                (paused_seconds,) = await asyncio.gather(holder, return_exceptions=True)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        await self.job_manager.record_stage(job_id, "transcode", started, datetime.now(timezone.utc))
+
+        if not result.ok:
+            if os.path.exists(partial):
+                os.remove(partial)
+            await self._fail(job_id, " ".join(result.stderr[-3:]) or "FFmpeg transcode failed")
+            return
+
+        original_size = os.path.getsize(job.output_path)
+        size = os.path.getsize(partial)
+        replaced = size < original_size
+        kept = None
+        if replaced:
+            try:
+                if keep_original:
+                    kept = original_path(job.output_path)
+                    if os.path.exists(kept):
+                        os.remove(kept)
+                    os.link(job.output_path, kept)
+                os.replace(partial, job.output_path)
+            except OSError:
+                os.remove(partial)
+                raise
+            # Keyframes moved with the new encode; the index is rebuilt on demand
+            await self.db.replace_keyframes(job_id, [])
+        else:
+            # A slower preset rarely loses, but never swap in a larger file
+            os.remove(partial)
+
+        transcode = {
+            "preset": preset,
+            "crf": crf,
+            "deinterlace": deinterlace,
+            "denoise": denoise,
+            "original_size": original_size,
+            "size": size if replaced else original_size,
+            "saved": original_size - size if replaced else 0,
+            "replaced": replaced,
+            "original_path": kept,
+            "paused_seconds": round(paused_seconds, 1) if isinstance(paused_seconds, float) else 0.0,
+            **result.stats.to_dict(),
+        }
+        await self.db.update_job(
+            job_id,
+            transcode_status="transcoded",
+            transcode=transcode,
+            file_size=transcode["size"],
+        )
+        logger.info("Transcoded job %s: %d -> %d bytes", job_id, original_size, transcode["size"])
+        await self.ws_manager.broadcast({"event": "transcode_complete", "data": {"job_id": job_id, **transcode}})
+
+    async def _hold_while_busy(self, runner: FFmpegProcess, job_id: str) -> float:
+        """Suspend the encode while the machine is busy; returns the seconds spent paused."""
+        paused_seconds = 0.0
+        paused_at = 0.0
+        try:
+            while True:
+                await asyncio.sleep(BUSY_POLL)
+                busy = self.is_busy()
+                if busy and not runner.paused:
+                    runner.pause()
+                    paused_at = time.monotonic()
+                    await self.ws_manager.broadcast({"event": "transcode_paused", "data": {"job_id": job_id}})
+                elif not busy and runner.paused:
+                    runner.resume()
+                    paused_seconds += time.monotonic() - paused_at
+                    await self.ws_manager.broadcast({"event": "transcode_resumed", "data": {"job_id": job_id}})
+        except asyncio.CancelledError:
+            if runner.paused:
+                runner.resume()
+                paused_seconds += time.monotonic() - paused_at
+            return paused_seconds
+
+    async def _fail(self, job_id: str, error: str):
+        await self.db.update_job(job_id, transcode_status="failed")
+        await self.ws_manager.broadcast({"event": "transcode_failed", "data": {"job_id": job_id, "error": error}})
@@ -1,9 +1,17 @@
 import os
+import shutil
 import tempfile
 
 import pytest
 
 
+@pytest.fixture
+def real_ffmpeg():
+    """Skip tests that decode or encode real media when ffmpeg isn't installed."""
+    if shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None:
+        pytest.skip("ffmpeg and ffprobe are not installed")
+
+
 @pytest.fixture
 def tmp_db_path():
     fd, path = tempfile.mkstemp(suffix=".db")
@@ -17,3 +25,15 @@ def tmp_output_dir(tmp_path):
     out = tmp_path / "output" / "dvd"
     out.mkdir(parents=True)
     return str(out)
+
+
+@pytest.fixture
+def video_ts_dir(tmp_path):
+    """A disc image laid out like a mounted DVD: two titles, the first spanning two VOBs."""
+    disc = tmp_path / "disc"
+    video_ts = disc / "VIDEO_TS"
+    video_ts.mkdir(parents=True)
+    (video_ts / "VIDEO_TS.IFO").write_bytes(b"DVDVIDEO-VMG")
+    for name in ("VTS_01_0.IFO", "VTS_01_1.VOB", "VTS_01_2.VOB", "VTS_02_0.IFO", "VTS_02_1.VOB"):
+        (video_ts / name).write_bytes(name.encode() * 64)
+    return str(disc)
@@ -0,0 +1,113 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from digitizer.calibration import PresetCalibrator, X264_PRESETS, pick_preset
+from digitizer.main import create_app
+
+# Speeds a mid-range host might reach at 720x480
+SPEEDS = {
+    "ultrafast": 9.0, "superfast": 6.5, "veryfast": 4.1, "faster": 2.6, "fast": 1.9,
+    "medium": 1.4, "slow": 0.8, "slower": 0.4, "veryslow": 0.1,
+}
+
+
+async def fake_benchmark(self, preset):
+    return {"preset": preset, "speed": SPEEDS[preset], "fps": None, "wall_time": 1.0, "cpu_time": 1.0, "peak_rss": 0}
+
+
+def test_benchmark_command_encodes_synthetic_source():
+    cmd = PresetCalibrator(crf_quality=20, size=(640, 480), fps="25", seconds=5).build_benchmark_command("slow")
+    assert cmd[cmd.index("-f") + 1] == "lavfi"
+    assert cmd[cmd.index("-i") + 1].startswith("testsrc2=size=640x480:rate=25,")
+    assert cmd[cmd.index("-preset") + 1] == "slow"
+    assert cmd[cmd.index("-crf") + 1] == "20"
+    assert cmd[cmd.index("-t") + 1] == "5"
+    assert cmd[-3:] == ["-f", "null", "-"]
+
+
+def test_pick_preset_is_slowest_with_headroom():
+    results = [{"preset": p, "speed": s} for p, s in SPEEDS.items()]
+    assert pick_preset(results, 0.25) == "medium"
+    assert pick_preset(results, 1.0) == "faster"
+    assert pick_preset(results, 10.0) is None
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_benchmark_reads_final_speed(mock_exec):
+    proc = AsyncMock()
+    proc.stdout = asyncio.StreamReader()
+    proc.stdout.feed_data(b"fps=150.2\nspeed=5.01x\nprogress=continue\nfps=151.0\nspeed=5.04x\nprogress=end\n")
+    proc.stdout.feed_eof()
+    proc.returncode = 0
+    mock_exec.return_value = proc
+
+    result = await PresetCalibrator().benchmark("veryfast")
+
+    assert result["preset"] == "veryfast"
+    assert result["speed"] == 5.04
+    assert result["fps"] == 151.0
+
+
+@patch.object(PresetCalibrator, "benchmark", fake_benchmark)
+async def test_calibrate_stops_at_first_preset_below_target():
+    seen = []
+
+    async def on_result(result):
+        seen.append(result["preset"])
+
+    calibration = await PresetCalibrator().calibrate(margin=0.25, on_result=on_result)
+
+    assert seen == list(X264_PRESETS[:X264_PRESETS.index("slow") + 1])
+    assert calibration["recommended"] == "medium"
+    assert [r["preset"] for r in calibration["results"]] == seen
+
+
+@pytest.fixture
+async def app(tmp_db_path, tmp_output_dir):
+    application = await create_app(db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False)
+    application.state.ws_manager.broadcast = AsyncMock()
+    yield application
+    await application.state.db.close()
+
+
+@pytest.fixture
+async def client(app):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def test_calibration_applies_recommended_preset(client, app):
+    assert (await client.get("/api/calibration")).status_code == 404
+
+    with patch.object(PresetCalibrator, "benchmark", fake_benchmark):
+        resp = await client.post("/api/calibration", json={"margin": 1.0, "apply": True})
+        assert resp.status_code == 202
+        assert (await client.post("/api/calibration")).status_code == 409
+        for _ in range(100):
+            if not app.state._calibrating:
+                break
+            await asyncio.sleep(0.01)
+
+    calibration = (await client.get("/api/calibration")).json()
+    assert calibration["recommended"] == "faster"
+    assert calibration["applied"] is True
+    assert calibration["margin"] == 1.0
+    assert (await client.get("/api/settings")).json()["encoding_preset"] == "faster"
+
+    # Capture encodes with the calibrated preset
+    with patch.object(app.state.vhs_capture, "start", new_callable=AsyncMock, return_value=True):
+        job_id = (await client.post("/api/capture/start")).json()["job_id"]
+        for _ in range(100):
+            if (await client.get(f"/api/jobs/{job_id}")).json()["status"] == "complete":
+                break
+            await asyncio.sleep(0.01)
+    assert app.state.vhs_capture.encoding_preset == "faster"
+
+
+async def test_calibration_rejects_bad_margin(client):
+    resp = await client.post("/api/calibration", json={"margin": "lots"})
+    assert resp.status_code == 400
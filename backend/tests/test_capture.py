@@ -1,10 +1,12 @@
 import asyncio
+import math
 import signal
 from unittest.mock import AsyncMock, patch, MagicMock, PropertyMock
 
 import pytest
 
-from digitizer.capture import VHSCapture
+from digitizer.capture import SLOW_WARNING_SECONDS, SPEED_WINDOW, CaptureHealth, VHSCapture
+from digitizer.ffmpeg_runner import FFmpegProgress
 
 
 @pytest.fixture
@@ -47,18 +49,6 @@ def test_build_ffmpeg_command_custom_preset(capture):
     assert "20" in cmd
 
 
-def test_parse_elapsed_time(capture):
-    line = "frame=  100 fps=30.0 q=28.0 size=   5120kB time=00:05:30.00 bitrate=1234.5kbits/s speed=1.0x"
-    seconds = capture.parse_elapsed_time(line)
-    assert seconds == 330.0
-
-
-def test_parse_elapsed_time_no_match(capture):
-    line = "Some random output"
-    seconds = capture.parse_elapsed_time(line)
-    assert seconds is None
-
-
 @patch("digitizer.capture.asyncio.create_subprocess_exec")
 async def test_start_recording(mock_exec, capture):
     mock_proc = AsyncMock()
@@ -105,3 +95,210 @@ async def test_stop_recording(mock_exec, capture):
 async def test_stop_while_not_recording_raises(capture):
     with pytest.raises(RuntimeError, match="Not recording"):
         await capture.stop()
+
+
+def test_build_ffmpeg_command_with_analysis_tee(capture):
+    cmd = capture.build_ffmpeg_command(output_path="/output/vhs/test.mp4", analysis=True)
+    # The archival output is unchanged; the analysis stream follows it
+    assert cmd.index("/output/vhs/test.mp4") < cmd.index("rawvideo")
+    assert "fps=15.0,scale=256:192" in cmd
+    assert "bgr24" in cmd
+    assert cmd[-1] == "pipe:1"
+
+
+@patch("digitizer.capture.asyncio.create_subprocess_exec")
+async def test_start_pumps_analysis_frames(mock_exec, capture):
+    frame = 256 * 192 * 3
+    stdout = asyncio.StreamReader()
+    stdout.feed_data(b"\x00" * (frame * 20))
+    stdout.feed_eof()
+
+    mock_proc = AsyncMock()
+    mock_proc.pid = 12345
+    mock_proc.stdout = stdout
+    mock_proc.stderr = AsyncMock()
+    mock_proc.stderr.__aiter__ = lambda self: self
+    mock_proc.stderr.__anext__ = AsyncMock(side_effect=StopAsyncIteration)
+    mock_proc.wait = AsyncMock(return_value=0)
+    mock_proc.returncode = 0
+    mock_exec.return_value = mock_proc
+
+    on_frames = AsyncMock(side_effect=RuntimeError("boom"))
+    result = await capture.start(output_path="/tmp/test.mp4", on_frames=on_frames)
+
+    assert result is True
+    assert mock_exec.call_args.kwargs["stdout"] == asyncio.subprocess.PIPE
+    # First batch failed: analysis is dropped but the pipe is still drained
+    assert on_frames.await_count == 1
+    assert stdout.at_eof()
+
+
+@patch("digitizer.capture.asyncio.create_subprocess_exec")
+async def test_slow_analysis_drops_frames_not_capture(mock_exec, capture):
+    from digitizer.capture import LIVE_BATCH_FRAMES, LIVE_BUFFER_BATCHES
+
+    frame = 256 * 192 * 3
+    stdout = asyncio.StreamReader()
+    stdout.feed_data(b"\x00" * (frame * LIVE_BATCH_FRAMES * 20))
+    stdout.feed_eof()
+
+    mock_proc = AsyncMock()
+    mock_proc.pid = 12345
+    mock_proc.stdout = stdout
+    mock_proc.stderr = AsyncMock()
+    mock_proc.stderr.__aiter__ = lambda self: self
+    mock_proc.stderr.__anext__ = AsyncMock(side_effect=StopAsyncIteration)
+    mock_proc.wait = AsyncMock(return_value=0)
+    mock_proc.returncode = 0
+    mock_exec.return_value = mock_proc
+
+    delivered = []
+    dropped = []
+
+    async def on_frames(data):
+        # Analysis stalls until ffmpeg has written everything
+        while not stdout.at_eof():
+            await asyncio.sleep(0.01)
+        delivered.append(len(data) // frame)
+
+    async def on_frames_dropped(count):
+        dropped.append(count)
+
+    assert await capture.start(output_path="/tmp/test.mp4", on_frames=on_frames, on_frames_dropped=on_frames_dropped)
+
+    assert stdout.at_eof()
+    assert len(delivered) <= LIVE_BUFFER_BATCHES + 1
+    assert dropped
+    assert sum(delivered) + sum(dropped) == LIVE_BATCH_FRAMES * 20
+
+
+def test_build_ffmpeg_command_keyframe_interval(capture):
+    cmd = capture.build_ffmpeg_command(output_path="/output/vhs/test.mp4")
+    assert cmd[cmd.index("-force_key_frames") + 1] == "expr:gte(t,n_forced*2)"
+    capture.keyframe_interval = 0
+    assert "-force_key_frames" not in capture.build_ffmpeg_command(output_path="/output/vhs/test.mp4")
+
+
+def test_build_ffmpeg_command_fragmented(capture):
+    cmd = capture.build_ffmpeg_command(output_path="/output/vhs/test.mp4")
+    assert cmd[cmd.index("-movflags") + 1] == "+frag_keyframe+empty_moov+default_base_moof"
+    capture.fragmented = False
+    cmd = capture.build_ffmpeg_command(output_path="/output/vhs/test.mp4")
+    assert cmd[cmd.index("-movflags") + 1] == "+faststart"
+
+
+def test_build_ffmpeg_command_with_master(capture):
+    capture.proxy_threads = 2
+    capture.master_threads = 6
+    cmd = capture.build_ffmpeg_command(
+        output_path="/output/vhs/test.mp4", analysis=True, master_path="/output/vhs/test_master.mkv"
+    )
+    # One input, then proxy, master and analysis outputs in that order
+    assert cmd.count("-i") == 1
+    proxy = cmd[:cmd.index("/output/vhs/test.mp4")]
+    master = cmd[len(proxy) + 1:cmd.index("/output/vhs/test_master.mkv")]
+    assert proxy[proxy.index("-c:v") + 1] == "libx264"
+    assert proxy[proxy.index("-threads") + 1] == "2"
+    assert master[master.index("-c:v") + 1] == "ffv1"
+    assert master[master.index("-threads") + 1] == "6"
+    assert master[master.index("-c:a") + 1] == "flac"
+    assert "-g" in master and "-slicecrc" in master
+    assert cmd[-1] == "pipe:1"
+
+
+def test_build_ffmpeg_command_with_preview(capture):
+    cmd = capture.build_ffmpeg_command(
+        output_path="/output/vhs/test.mp4", analysis=True, preview_path="/tmp/preview/job.jpg"
+    )
+    preview = cmd[cmd.index("/output/vhs/test.mp4") + 1:cmd.index("/tmp/preview/job.jpg")]
+    # Dropped to one frame a second before scaling and encoding
+    assert preview[preview.index("-vf") + 1] == "fps=1,scale=320:-2"
+    assert preview[preview.index("-update") + 1] == "1"
+    assert cmd.count("-i") == 1
+    assert cmd[-1] == "pipe:1"
+
+
+def test_build_ffmpeg_command_default_threads_left_to_ffmpeg(capture):
+    cmd = capture.build_ffmpeg_command(output_path="/output/vhs/test.mp4", master_path="/output/vhs/m.mkv")
+    assert "-threads" not in cmd
+
+
+def health_after(samples, health=None):
+    """Feed (wall seconds, media seconds) samples; returns the health and the warning flags."""
+    health = health or CaptureHealth()
+    warnings = [
+        health.update(FFmpegProgress({"out_time_us": str(int(media * 1_000_000))}), now=wall)
+        for wall, media in samples
+    ]
+    return health, warnings
+
+
+def test_capture_health_real_time_is_healthy():
+    health, warnings = health_after([(t, t) for t in range(20)])
+    assert health.speed == 1.0
+    assert health.backlog == 0.0
+    assert not any(warnings)
+
+
+def test_capture_health_warns_once_per_slow_stretch():
+    slow = [(t, t * 0.8) for t in range(1, 30)]
+    health, warnings = health_after(slow)
+    assert health.speed == 0.8
+    assert warnings.count(True) == 1
+    # Speed is known once half a window has passed; the warning follows
+    # SLOW_WARNING_SECONDS later
+    first_speed = 1 + math.ceil(SPEED_WINDOW / 2)
+    assert slow[warnings.index(True)][0] == first_speed + SLOW_WARNING_SECONDS
+    assert health.backlog == pytest.approx(28 * 0.2)
+
+    # Recovering resets the warning; a new slow stretch warns again
+    media = 29 * 0.8
+    recover = [(30 + t, media + t * 1.5) for t in range(1, 10)]
+    health, warnings = health_after(recover, health)
+    assert health.speed >= 1.0
+    assert not any(warnings)
+    media += 9 * 1.5
+    health, warnings = health_after([(39 + t, media + t * 0.5) for t in range(1, 25)], health)
+    assert warnings.count(True) == 1
+    assert health.warnings == 2
+    assert health.min_speed == 0.5
+
+
+def test_build_trim_command(capture):
+    cmd = capture.build_trim_command("/output/vhs/test.mp4", 125.5, "/output/vhs/test.trim.mp4")
+    assert cmd[cmd.index("-c") + 1] == "copy"
+    assert cmd[cmd.index("-t") + 1] == "125.500"
+    assert cmd[cmd.index("-movflags") + 1] == "+frag_keyframe+empty_moov+default_base_moof"
+    assert cmd[-1] == "/output/vhs/test.trim.mp4"
+    cmd = capture.build_trim_command("/output/vhs/m.mkv", 10, "/output/vhs/m.trim.mkv")
+    assert "-movflags" not in cmd
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_trim_replaces_capture(mock_exec, capture, tmp_path):
+    path = tmp_path / "test.mp4"
+    path.write_bytes(b"full")
+
+    async def fake_exec(*cmd, **kwargs):
+        with open(cmd[-1], "wb") as f:
+            f.write(b"cut")
+        proc = AsyncMock()
+        proc.stdout = asyncio.StreamReader()
+        proc.stdout.feed_eof()
+        proc.returncode = 0
+        return proc
+
+    mock_exec.side_effect = fake_exec
+    assert await capture.trim(str(path), 60.0) is True
+    assert path.read_bytes() == b"cut"
+    assert not (tmp_path / "test.trim.mp4").exists()
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_trim_never_empties_capture(mock_exec, capture, tmp_path):
+    path = tmp_path / "test.mp4"
+    path.write_bytes(b"full")
+
+    assert await capture.trim(str(path), 0.0) is False
+    assert path.read_bytes() == b"full"
+    mock_exec.assert_not_called()
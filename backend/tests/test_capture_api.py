@@ -1,6 +1,9 @@
+import os
+
 import pytest
 from httpx import AsyncClient, ASGITransport
 
+from digitizer import api
 from digitizer.main import create_app
 
 
@@ -44,6 +47,8 @@ async def test_capture_start_creates_job(client, app):
         assert data["source_type"] == "vhs"
         assert data["status"] == "ripping"
         assert "job_id" in data
+        job = await app.state.job_manager.get_job(data["job_id"])
+        assert job.capture_fragmented is app.state.vhs_capture.fragmented
 
 
 async def test_capture_start_conflict(client, app):
@@ -77,3 +82,286 @@ async def test_jobs_filter_by_source_type(client, app):
     assert resp.status_code == 200
     jobs = resp.json()
     assert all(j["source_type"] == "dvd" for j in jobs)
+
+
+async def test_capture_with_live_analysis_stores_scenes(client, app):
+    import asyncio
+    from unittest.mock import AsyncMock, patch
+
+    import numpy as np
+
+    from digitizer.capture import LIVE_ANALYSIS_SIZE
+
+    width, height = LIVE_ANALYSIS_SIZE
+    frames = np.empty((300, height, width, 3), np.uint8)
+    frames[:150] = (40, 40, 200)
+    frames[150:] = (230, 230, 230)
+
+    async def fake_start(output_path, on_progress=None, on_frames=None, on_health=None,
+                         master_path=None, preview_path=None, on_frames_dropped=None):
+        await on_frames(frames.tobytes())
+        return True
+
+    events = []
+    app.state.ws_manager.broadcast = AsyncMock(side_effect=events.append)
+    await client.put("/api/settings", json={"live_analysis": True})
+    with patch.object(app.state.vhs_capture, "start", side_effect=fake_start), \
+            patch.object(app.state.scene_detector, "_extract_thumbnails", new_callable=AsyncMock):
+        resp = await client.post("/api/capture/start")
+        job_id = resp.json()["job_id"]
+        for _ in range(100):
+            job = (await client.get(f"/api/jobs/{job_id}")).json()
+            if job["analysis_status"] == "analyzed":
+                break
+            await asyncio.sleep(0.01)
+
+    assert job["status"] == "complete"
+    assert job["analysis_status"] == "analyzed"
+    assert job["scene_count"] == 2
+    scenes = (await client.get(f"/api/jobs/{job_id}/scenes")).json()
+    assert [(s["start_time"], s["end_time"]) for s in scenes] == [(0.0, 10.0), (10.0, 20.0)]
+    assert scenes[1]["thumbnail_path"].endswith("scene_002.jpg")
+    assert "analysis_complete" in [e["event"] for e in events]
+
+
+async def test_capture_health_streamed_and_stored(client, app):
+    import asyncio
+    from unittest.mock import AsyncMock, patch
+
+    from digitizer.capture import CaptureHealth, SLOW_WARNING_SECONDS
+    from digitizer.ffmpeg_runner import FFmpegProgress
+
+    async def fake_start(output_path, on_progress=None, on_frames=None, on_health=None,
+                         master_path=None, preview_path=None, on_frames_dropped=None):
+        health = CaptureHealth()
+        # Half real time from the start: 0.5s of video per wall second
+        for t in range(int(SLOW_WARNING_SECONDS) + 4):
+            progress = FFmpegProgress({
+                "out_time_us": str(int((1 + t * 0.5) * 1_000_000)),
+                "drop_frames": str(t * 3),
+                "progress": "continue",
+            })
+            await on_health(health, health.update(progress, now=float(t)))
+        return True
+
+    events = []
+    app.state.ws_manager.broadcast = AsyncMock(side_effect=events.append)
+    with patch.object(app.state.vhs_capture, "start", side_effect=fake_start):
+        resp = await client.post("/api/capture/start")
+        job_id = resp.json()["job_id"]
+        for _ in range(100):
+            job = (await client.get(f"/api/jobs/{job_id}")).json()
+            if job["status"] == "complete":
+                break
+            await asyncio.sleep(0.01)
+
+    warnings = [e["data"] for e in events if e["event"] == "capture_warning"]
+    assert len(warnings) == 1
+    assert warnings[0]["job_id"] == job_id
+    assert warnings[0]["speed"] == 0.5
+    assert any(e["event"] == "capture_health" for e in events)
+    assert job["capture_health"]["drop_frames"] == 39
+    assert job["capture_health"]["min_speed"] == 0.5
+    assert job["capture_health"]["warnings"] == 1
+    assert job["capture_health"]["backlog"] == 6.5
+
+
+async def test_capture_records_master_path(client, app):
+    import asyncio
+    from unittest.mock import AsyncMock, patch
+
+    await client.put("/api/settings", json={"archival_master": True})
+    with patch.object(app.state.vhs_capture, "start", new_callable=AsyncMock, return_value=True) as mock_start:
+        data = (await client.post("/api/capture/start")).json()
+        for _ in range(100):
+            job = (await client.get(f"/api/jobs/{data['job_id']}")).json()
+            if job["status"] == "complete":
+                break
+            await asyncio.sleep(0.01)
+
+    assert data["master_path"] == data["output_path"].removesuffix(".mp4") + "_master.mkv"
+    assert job["master_path"] == data["master_path"]
+    assert mock_start.call_args.kwargs["master_path"] == data["master_path"]
+
+
+async def test_interrupted_captures_recovered_on_startup(tmp_db_path, tmp_output_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("DIGITIZER_VHS_OUTPUT_PATH", str(tmp_path / "vhs"))
+    app = await create_app(db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False)
+    jm = app.state.job_manager
+    kept = await jm.create_job(disc_info={}, source_type="vhs")
+    lost = await jm.create_job(disc_info={}, source_type="vhs")
+    for job in (kept, lost):
+        await jm.mark_ripping(job.id)
+    await app.state.db.update_job(kept.id, analysis_status="analyzing")
+    await app.state.db.create_scene("s1", kept.id, 1, 0.0, 5.0, 5.0)
+    os.makedirs(os.path.dirname(kept.output_path), exist_ok=True)
+    with open(kept.output_path, "wb") as f:
+        f.write(b"\0" * 4096)
+    await app.state.db.close()
+
+    # Restart
+    app = await create_app(db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False)
+    try:
+        recovered = await app.state.job_manager.get_job(kept.id)
+        failed = await app.state.job_manager.get_job(lost.id)
+        scenes = await app.state.db.list_scenes(kept.id)
+    finally:
+        await app.state.db.close()
+
+    assert recovered.status == "complete"
+    assert recovered.file_size == 4096
+    assert recovered.error.startswith("Capture interrupted")
+    assert recovered.analysis_status is None
+    assert scenes == []
+    assert failed.status == "failed"
+
+
+async def test_recovery_uses_each_capture_own_mode(tmp_db_path, tmp_output_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("DIGITIZER_VHS_OUTPUT_PATH", str(tmp_path / "vhs"))
+    app = await create_app(db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False)
+    jm = app.state.job_manager
+    fragmented = await jm.create_job(disc_info={}, source_type="vhs")
+    plain = await jm.create_job(disc_info={}, source_type="vhs")
+    for job, mode in ((fragmented, True), (plain, False)):
+        await jm.mark_ripping(job.id)
+        await app.state.db.update_job(job.id, capture_fragmented=mode)
+        os.makedirs(os.path.dirname(job.output_path), exist_ok=True)
+        with open(job.output_path, "wb") as f:
+            f.write(b"\0" * 4096)
+    await app.state.db.close()
+
+    # Restart with the opposite default
+    monkeypatch.setenv("DIGITIZER_CAPTURE_FRAGMENTED", "false")
+    app = await create_app(db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False)
+    try:
+        kept = await app.state.job_manager.get_job(fragmented.id)
+        lost = await app.state.job_manager.get_job(plain.id)
+    finally:
+        await app.state.db.close()
+
+    assert kept.status == "complete"
+    assert kept.capture_fragmented is True
+    assert lost.status == "failed"
+
+
+async def test_capture_preview_served_while_recording(client, app):
+    import asyncio
+    from unittest.mock import patch
+
+    assert (await client.get("/api/capture/preview")).status_code == 404
+    stopped = asyncio.Event()
+    written = asyncio.Event()
+
+    async def fake_start(output_path, on_progress=None, on_frames=None, on_health=None,
+                         master_path=None, preview_path=None, on_frames_dropped=None):
+        os.makedirs(os.path.dirname(preview_path), exist_ok=True)
+        with open(preview_path, "wb") as f:
+            f.write(b"\xff\xd8jpeg")
+        written.set()
+        await stopped.wait()
+        return True
+
+    with patch.object(app.state.vhs_capture, "start", side_effect=fake_start):
+        job_id = (await client.post("/api/capture/start")).json()["job_id"]
+        await asyncio.wait_for(written.wait(), 1)
+        resp = await client.get("/api/capture/preview")
+        stopped.set()
+        # Wait for the capture to wind down, which removes the preview
+        for _ in range(100):
+            if app.state._capture_job_id is None:
+                break
+            await asyncio.sleep(0.01)
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "image/jpeg"
+    assert resp.headers["cache-control"] == "no-store"
+    assert resp.content == b"\xff\xd8jpeg"
+    # The preview is temporary and goes away with the capture
+    assert (await client.get("/api/capture/preview")).status_code == 404
+    assert not os.path.exists(api._preview_path(job_id))
+
+
+async def test_capture_stops_and_trims_at_end_of_tape(tmp_db_path, tmp_output_dir, tmp_path, monkeypatch):
+    import asyncio
+    from unittest.mock import AsyncMock, patch
+
+    import numpy as np
+
+    from digitizer.capture import LIVE_ANALYSIS_FPS, LIVE_ANALYSIS_SIZE
+
+    monkeypatch.setenv("DIGITIZER_VHS_OUTPUT_PATH", str(tmp_path / "vhs"))
+    app = await create_app(db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False)
+    vhs = app.state.vhs_capture
+    events = []
+    app.state.ws_manager.broadcast = AsyncMock(side_effect=events.append)
+
+    width, height = LIVE_ANALYSIS_SIZE
+    fps = int(LIVE_ANALYSIS_FPS)
+    picture = np.broadcast_to(np.linspace(0, 255, width, dtype=np.uint8)[None, :, None], (height, width, 3))
+    frames = np.empty((fps * 10, height, width, 3), np.uint8)
+    frames[:fps * 4] = picture
+    frames[fps * 4:] = (200, 40, 40)  # VCR blue screen
+    stopped = asyncio.Event()
+
+    async def fake_start(output_path, on_progress=None, on_frames=None, on_health=None,
+                         master_path=None, preview_path=None, on_frames_dropped=None):
+        vhs._recording = True
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "wb") as f:
+            f.write(b"\0" * 4096)
+        await on_frames(frames.tobytes())
+        await stopped.wait()
+        return True
+
+    async def fake_stop():
+        vhs._recording = False
+        stopped.set()
+
+    async def fake_trim(path, duration):
+        with open(path, "wb") as f:
+            f.write(b"\0" * 1024)
+        return True
+
+    transport = ASGITransport(app=app)
+    try:
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.put("/api/settings", json={
+                "live_analysis": True, "end_of_tape": "trim", "end_of_tape_seconds": "3",
+            })
+            with patch.object(vhs, "start", side_effect=fake_start), \
+                    patch.object(vhs, "stop", side_effect=fake_stop), \
+                    patch.object(vhs, "trim", side_effect=fake_trim) as mock_trim, \
+                    patch.object(app.state.scene_detector, "_extract_thumbnails", new_callable=AsyncMock):
+                job_id = (await client.post("/api/capture/start")).json()["job_id"]
+                for _ in range(200):
+                    job = (await client.get(f"/api/jobs/{job_id}")).json()
+                    if job["analysis_status"] == "analyzed":
+                        break
+                    await asyncio.sleep(0.01)
+            scenes = (await client.get(f"/api/jobs/{job_id}/scenes")).json()
+    finally:
+        await app.state.db.close()
+
+    auto_stop = [e["data"] for e in events if e["event"] == "capture_auto_stop"]
+    assert auto_stop == [{"job_id": job_id, "reason": "blue_screen", "content_end": 4.0}]
+    assert job["status"] == "complete"
+    assert job["stop_reason"] == "blue_screen"
+    mock_trim.assert_awaited_once_with(job["output_path"], 4.0)
+    assert job["file_size"] == 1024
+    # Scenes end with the tape's content
+    assert max(s["end_time"] for s in scenes) == 4.0
+
+
+async def test_capture_stopped_by_hand_records_stop_reason(client, app):
+    import asyncio
+    from unittest.mock import AsyncMock, patch
+
+    with patch.object(app.state.vhs_capture, "start", new_callable=AsyncMock, return_value=True):
+        job_id = (await client.post("/api/capture/start")).json()["job_id"]
+        for _ in range(100):
+            job = (await client.get(f"/api/jobs/{job_id}")).json()
+            if job["status"] == "complete":
+                break
+            await asyncio.sleep(0.01)
+
+    assert job["stop_reason"] == "manual"
@@ -103,3 +103,18 @@ async def test_get_next_sequence_number(db):
     )
     seq = await db.get_next_sequence("2026-02-09")
     assert seq == 2
+
+
+async def test_save_and_get_disc(db):
+    info = {"disc_title": "MOVIE", "main_title": 1, "titles": [{"number": 1, "duration": 60.0}]}
+    assert await db.get_disc("abc") is None
+
+    await db.save_disc("abc", info, job_id="job-1")
+    await db.record_disc_title("abc", 1, "job-1")
+    await db.save_disc("abc", info)  # seen again, no new job
+
+    disc = await db.get_disc("abc")
+    assert disc["disc_title"] == "MOVIE"
+    assert disc["disc_info"]["titles"] == info["titles"]
+    assert disc["job_id"] == "job-1"
+    assert disc["titles"] == {1: "job-1"}
@@ -0,0 +1,80 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from digitizer.drive_monitor import DriveMonitor
+from digitizer.drives import Drive
+from digitizer.main import _rip_disc, create_app
+from digitizer.models import JobStatus
+
+LSDVD_OUTPUT = """Disc Title: MOVIE
+Title: 01, Length: 01:30:00.000 Chapters: 20, Cells: 21, Audio streams: 02, Subpictures: 03
+Longest track: 01
+"""
+
+
+@pytest.fixture
+async def app(tmp_db_path, tmp_output_dir):
+    application = await create_app(
+        db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False
+    )
+    application.state.ws_manager.broadcast = AsyncMock()
+    yield application
+    await application.state.db.close()
+
+
+@pytest.fixture
+def drive():
+    ripper = MagicMock()
+    ripper.rip = AsyncMock(return_value=True)
+    ripper.eject = AsyncMock(return_value=True)
+    return Drive("sr0", "/dev/sr0", monitor=DriveMonitor("/dev/sr0"), ripper=ripper)
+
+
+def disc_info():
+    return DriveMonitor("/dev/sr0").parse_lsdvd(LSDVD_OUTPUT)
+
+
+def events(app, name):
+    return [c.args[0]["data"] for c in app.state.ws_manager.broadcast.call_args_list if c.args[0]["event"] == name]
+
+
+async def test_known_disc_resolves_to_existing_job(app, drive):
+    await _rip_disc(app, drive, disc_info())
+    first = (await app.state.job_manager.list_jobs())[0]
+    assert first.status == JobStatus.COMPLETE
+
+    await _rip_disc(app, drive, disc_info())
+
+    assert drive.ripper.rip.await_count == 1
+    assert len(await app.state.job_manager.list_jobs()) == 1
+    assert events(app, "disc_known") == [
+        {"drive_id": "sr0", "fingerprint": disc_info()["fingerprint"], "job_id": first.id},
+    ]
+    assert drive.ripper.eject.await_count == 2
+
+
+async def test_failed_title_is_ripped_again(app, drive):
+    drive.ripper.rip = AsyncMock(side_effect=[False, True])
+
+    await _rip_disc(app, drive, disc_info())
+    await _rip_disc(app, drive, disc_info())
+
+    jobs = await app.state.job_manager.list_jobs()
+    assert sorted(j.status for j in jobs) == ["complete", "failed"]
+    disc = await app.state.db.get_disc(disc_info()["fingerprint"])
+    complete = next(j for j in jobs if j.status == "complete")
+    assert disc["job_id"] == complete.id
+    assert disc["titles"] == {1: complete.id}
+    assert events(app, "disc_known") == []
+
+
+@pytest.mark.parametrize("mode, rips", [("skip", 1), ("always", 2)])
+async def test_duplicate_discs_setting(app, drive, mode, rips):
+    drive.ripper.rip = AsyncMock(return_value=False)
+    await app.state.db.update_settings(duplicate_discs=mode)
+
+    await _rip_disc(app, drive, disc_info())
+    await _rip_disc(app, drive, disc_info())
+
+    assert drive.ripper.rip.await_count == rips
@@ -3,7 +3,17 @@ from unittest.mock import AsyncMock, patch, MagicMock
 
 import pytest
 
-from digitizer.drive_monitor import DriveMonitor
+from digitizer.drive_monitor import (
+    CDROM_DRIVE_STATUS,
+    CDS_DISC_OK,
+    CDS_DRIVE_NOT_READY,
+    CDS_NO_DISC,
+    CDS_TRAY_OPEN,
+    CDSL_CURRENT,
+    DriveMonitor,
+    IoctlStatusSource,
+    StatusSource,
+)
 from digitizer.models import DriveStatus
 
 
@@ -51,3 +61,124 @@ def test_parse_lsdvd_output(monitor):
     assert info["title_count"] == 1
     assert info["main_title"] == 1
     assert info["duration"] == 5400.0
+
+
+class FakeStatusSource(StatusSource):
+    def __init__(self, states):
+        self.states = list(states)
+
+    async def drive_status(self):
+        return self.states.pop(0)
+
+
+@patch("digitizer.drive_monitor.asyncio.create_subprocess_exec")
+async def test_lsdvd_runs_once_per_inserted_disc(mock_exec):
+    mock_proc = AsyncMock()
+    mock_proc.communicate = AsyncMock(return_value=(LSDVD_OUTPUT.encode(), b""))
+    mock_proc.returncode = 0
+    mock_exec.return_value = mock_proc
+    source = FakeStatusSource([
+        CDS_NO_DISC, CDS_TRAY_OPEN, CDS_DRIVE_NOT_READY,
+        CDS_DISC_OK, CDS_DISC_OK, CDS_DISC_OK,
+        CDS_TRAY_OPEN, CDS_DISC_OK,
+    ])
+    monitor = DriveMonitor(device="/dev/sr0", status_source=source)
+
+    results = [await monitor.poll_once() for _ in range(8)]
+
+    assert mock_exec.call_count == 2
+    detected = [i for i, (_, info) in enumerate(results) if info is not None]
+    assert detected == [3, 7]
+    assert results[6][0] == DriveStatus.EMPTY
+    assert monitor.event_driven
+
+
+@patch("digitizer.drive_monitor.asyncio.create_subprocess_exec")
+async def test_lsdvd_retried_with_backoff_until_disc_reads(mock_exec, monkeypatch):
+    from digitizer import drive_monitor
+
+    clock = [100.0]
+    monkeypatch.setattr(drive_monitor.time, "monotonic", lambda: clock[0])
+    failed = AsyncMock()
+    failed.communicate = AsyncMock(return_value=(b"", b"libdvdread: Can't open /dev/sr0"))
+    failed.returncode = 5
+    read = AsyncMock()
+    read.communicate = AsyncMock(return_value=(LSDVD_OUTPUT.encode(), b""))
+    read.returncode = 0
+    mock_exec.side_effect = [failed, failed, read]
+    monitor = DriveMonitor(device="/dev/sr0", status_source=FakeStatusSource([CDS_DISC_OK] * 6))
+
+    assert (await monitor.poll_once())[1] is None  # spinning up
+    clock[0] += 1.0
+    assert (await monitor.poll_once())[1] is None  # waiting out the first 2s
+    clock[0] += 1.0
+    assert (await monitor.poll_once())[1] is None  # retried, failed again
+    clock[0] += 3.0
+    assert (await monitor.poll_once())[1] is None  # waiting out 4s
+    clock[0] += 1.0
+    status, info = await monitor.poll_once()
+    assert status == DriveStatus.DISC_DETECTED
+    assert info is not None
+    assert (await monitor.poll_once())[1] is None
+    assert mock_exec.call_count == 3
+
+
+@patch("digitizer.drive_monitor.asyncio.create_subprocess_exec")
+async def test_disc_left_in_drive_is_not_ripped_again(mock_exec):
+    mock_proc = AsyncMock()
+    mock_proc.communicate = AsyncMock(return_value=(LSDVD_OUTPUT.encode(), b""))
+    mock_proc.returncode = 0
+    mock_exec.return_value = mock_proc
+    monitor = DriveMonitor(device="/dev/sr0", status_source=FakeStatusSource([CDS_DISC_OK] * 3))
+
+    assert (await monitor.poll_once())[1] is not None
+    monitor.set_empty()  # rip finished without ejecting
+    assert (await monitor.poll_once())[1] is None
+    assert (await monitor.poll_once())[1] is None
+    assert mock_exec.call_count == 1
+
+
+@patch("digitizer.drive_monitor.asyncio.create_subprocess_exec")
+async def test_unreadable_tray_state_falls_back_to_lsdvd(mock_exec, tmp_path):
+    mock_proc = AsyncMock()
+    mock_proc.communicate = AsyncMock(return_value=(LSDVD_OUTPUT.encode(), b""))
+    mock_proc.returncode = 0
+    mock_exec.return_value = mock_proc
+    # A VIDEO_TS directory is not a drive: the ioctl fails and every poll runs lsdvd
+    monitor = DriveMonitor(device=str(tmp_path))
+
+    status, info = await monitor.poll_once()
+    await monitor.poll_once()
+
+    assert status == DriveStatus.DISC_DETECTED
+    assert info is not None
+    assert not monitor.event_driven
+    assert mock_exec.call_count == 2
+
+
+def test_ioctl_status_source_reads_drive_status(tmp_path):
+    device = tmp_path / "sr0"
+    device.write_bytes(b"")
+    source = IoctlStatusSource(str(device))
+    assert source.read() is None  # regular file: ENOTTY
+
+    with patch("digitizer.drive_monitor.fcntl.ioctl", return_value=CDS_DISC_OK) as mock_ioctl:
+        assert source.read() == CDS_DISC_OK
+    assert mock_ioctl.call_args.args[1:] == (CDROM_DRIVE_STATUS, CDSL_CURRENT)
+
+
+def test_parse_lsdvd_title_table_and_fingerprint(monitor):
+    output = """Disc Title: SERIES_S1_D1
+Title: 01, Length: 00:44:10.100 Chapters: 06, Cells: 07, Audio streams: 02, Subpictures: 03
+Title: 02, Length: 00:43:58.500 Chapters: 06, Cells: 06, Audio streams: 02, Subpictures: 03
+Longest track: 01
+"""
+    info = monitor.parse_lsdvd(output)
+    assert info["disc_title"] == "SERIES_S1_D1"
+    assert info["titles"][1] == {
+        "number": 2, "duration": 2638.0, "length": "00:43:58.500",
+        "chapters": 6, "cells": 6, "audio_streams": 2, "subpictures": 3,
+    }
+    assert info["fingerprint"] == monitor.parse_lsdvd(output)["fingerprint"]
+    other = monitor.parse_lsdvd(output.replace("Cells: 06", "Cells: 08"))
+    assert other["fingerprint"] != info["fingerprint"]
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import stat
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from digitizer.drive_monitor import DriveMonitor
+from digitizer.drives import Drive, aggregate_status, drive_ids, parse_drive_devices
+from digitizer.main import _stop_monitors, create_app
+from digitizer.models import DriveStatus
+from digitizer.ripper import DVDRipper
+
+
+# Fake drives are directories: a disc is "inserted" while VIDEO_TS exists
+STUBS = {
+    "lsdvd": """#!/bin/sh
+[ -d "$1/VIDEO_TS" ] || exit 1
+echo "Title: 01, Length: 00:01:00.000 Chapters: 01, Cells: 01, Audio streams: 01, Subpictures: 00"
+echo "Longest track: 01"
+""",
+    "dvdbackup": """#!/bin/sh
+while [ $# -gt 0 ]; do
+  case "$1" in
+    -i) src="$2"; shift 2 ;;
+    -o) out="$2"; shift 2 ;;
+    *) shift ;;
+  esac
+done
+mkdir -p "$out/DISC" && cp -r "$src/VIDEO_TS" "$out/DISC/"
+""",
+    "ffmpeg": """#!/bin/sh
+sleep 0.5
+for last; do :; done
+echo remuxed > "$last"
+""",
+    "eject": """#!/bin/sh
+mv "$1/VIDEO_TS" "$1/EJECTED"
+""",
+}
+
+
+@pytest.fixture
+def stub_tools(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name, script in STUBS.items():
+        path = bin_dir / name
+        path.write_text(script)
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def fake_drive(tmp_path, name: str) -> str:
+    video_ts = tmp_path / name / "VIDEO_TS"
+    video_ts.mkdir(parents=True)
+    (video_ts / "VTS_01_1.VOB").write_bytes(b"\0" * 2048)
+    return str(tmp_path / name)
+
+
+def test_parse_drive_devices():
+    assert parse_drive_devices("/dev/sr0, /dev/sr1,") == ["/dev/sr0", "/dev/sr1"]
+    assert drive_ids(["/dev/sr0", "/dev/sr1"]) == ["sr0", "sr1"]
+    assert drive_ids(["/a/sr0", "/b/sr0/"]) == ["sr0", "sr0-2"]
+
+
+def test_aggregate_status_reports_busiest_drive():
+    drives = [
+        Drive(f"sr{i}", f"/dev/sr{i}", DriveMonitor(f"/dev/sr{i}"), DVDRipper(f"/dev/sr{i}"))
+        for i in range(2)
+    ]
+    assert aggregate_status(drives) == DriveStatus.EMPTY
+    drives[1].monitor.set_ripping()
+    assert aggregate_status(drives) == DriveStatus.RIPPING
+
+
+async def test_drives_rip_concurrently(stub_tools, tmp_path, tmp_db_path, tmp_output_dir, monkeypatch):
+    drive_a = fake_drive(tmp_path, "drive_a")
+    drive_b = fake_drive(tmp_path, "drive_b")
+    monkeypatch.setenv("DIGITIZER_DRIVE_DEVICES", f"{drive_a},{drive_b}")
+    monkeypatch.setenv("DIGITIZER_RIP_MODE", "backup")
+    monkeypatch.setenv("DIGITIZER_POLL_INTERVAL", "0.05")
+
+    app = await create_app(db_path=tmp_db_path, output_base=tmp_output_dir)
+    events = []
+
+    async def capture(message):
+        events.append(message)
+
+    app.state.ws_manager.broadcast = capture
+    try:
+        for _ in range(200):
+            jobs = await app.state.job_manager.list_jobs()
+            idle = aggregate_status(app.state.drives.values()) == DriveStatus.EMPTY
+            if len(jobs) == 2 and all(j.status == "complete" for j in jobs) and idle:
+                break
+            await asyncio.sleep(0.05)
+        else:
+            pytest.fail(f"rips did not finish: {[j.status for j in jobs]}")
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.get("/api/drive")
+    finally:
+        await _stop_monitors(app.state.monitor_tasks)
+        await app.state.db.close()
+
+    assert resp.json() == {
+        "status": "empty",
+        "drives": [
+            {"id": "drive_a", "device": drive_a, "status": "empty"},
+            {"id": "drive_b", "device": drive_b, "status": "empty"},
+        ],
+    }
+    assert all(os.path.getsize(j.output_path) > 0 for j in jobs)
+    assert jobs[0].output_path != jobs[1].output_path
+    assert os.path.isdir(os.path.join(drive_a, "EJECTED"))
+    assert os.path.isdir(os.path.join(drive_b, "EJECTED"))
+
+    # Both drives were ripping before either rip finished
+    names = [(e["event"], e["data"].get("status"), e["data"].get("drive_id")) for e in events]
+    first_complete = next(i for i, n in enumerate(names) if n[0] == "job_complete")
+    ripping = {n[2] for n in names[:first_complete] if n[:2] == ("drive_status", "ripping")}
+    assert ripping == {"drive_a", "drive_b"}
+    assert {e["data"]["drive_id"] for e in events if e["event"] == "job_complete"} == {"drive_a", "drive_b"}
+
+
+async def test_stream_mode_falls_back_without_dvdvideo(tmp_path, tmp_db_path, tmp_output_dir, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    ffmpeg = bin_dir / "ffmpeg"
+    ffmpeg.write_text('#!/bin/sh\necho " D  vob             MPEG-PS (VOB)"\n')
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("DIGITIZER_DRIVE_DEVICES", "/dev/sr0")
+    monkeypatch.delenv("DIGITIZER_RIP_MODE", raising=False)
+
+    app = await create_app(db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False)
+    await app.state.db.close()
+
+    assert app.state.drives["sr0"].ripper.rip_mode == "backup"
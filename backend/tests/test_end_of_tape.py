@@ -0,0 +1,97 @@
+from unittest.mock import AsyncMock
+
+import numpy as np
+
+from digitizer.end_of_tape import BLUE_SCREEN, NO_SIGNAL, STATIC, EndOfTapeDetector, classify_frames
+
+WIDTH, HEIGHT, FPS = 64, 48, 10
+
+
+def solid(bgr, count=1):
+    frames = np.empty((count, HEIGHT, WIDTH, 3), np.uint8)
+    frames[:] = bgr
+    return frames
+
+
+def picture(count=1):
+    """A smooth gradient with some texture, like real footage."""
+    rng = np.random.default_rng(1)
+    ramp = np.linspace(0, 255, WIDTH)[None, :] + np.linspace(0, 60, HEIGHT)[:, None]
+    luma = np.clip(ramp + rng.normal(0, 3, (HEIGHT, WIDTH)), 0, 255).astype(np.uint8)
+    return np.repeat(np.repeat(luma[None, :, :, None], 3, axis=3), count, axis=0)
+
+
+def snow(count=1):
+    rng = np.random.default_rng(2)
+    luma = rng.integers(0, 256, (count, HEIGHT, WIDTH, 1), dtype=np.uint8)
+    return np.repeat(luma, 3, axis=3)
+
+
+def test_classify_frames():
+    frames = np.concatenate([
+        solid((200, 40, 40)), solid((0, 0, 0)), solid((128, 128, 128)), snow(), picture(),
+    ])
+    assert classify_frames(frames) == [BLUE_SCREEN, NO_SIGNAL, NO_SIGNAL, STATIC, None]
+
+
+async def test_detector_fires_once_after_timeout():
+    on_end = AsyncMock()
+    detector = EndOfTapeDetector(WIDTH, HEIGHT, FPS, timeout=2.0, on_end=on_end)
+
+    await detector.feed(picture(30).tobytes())
+    # Mostly snow with a flat frame or two still counts as one run
+    await detector.feed(snow(12).tobytes())
+    await detector.feed(solid((0, 0, 0), 1).tobytes())
+    assert not detector.ended
+    # Split across feeds mid-frame
+    data = snow(20).tobytes()
+    await detector.feed(data[:1000])
+    await detector.feed(data[1000:])
+
+    assert detector.ended
+    on_end.assert_awaited_once_with(STATIC, 3.0)
+    await detector.feed(snow(20).tobytes())
+    assert on_end.await_count == 1
+
+
+async def test_detector_resets_on_content():
+    on_end = AsyncMock()
+    detector = EndOfTapeDetector(WIDTH, HEIGHT, FPS, timeout=2.0, on_end=on_end)
+
+    # A fade to black between programmes is shorter than the timeout
+    for _ in range(5):
+        await detector.feed(solid((0, 0, 0), 15).tobytes())
+        await detector.feed(picture(10).tobytes())
+
+    assert not detector.ended
+    on_end.assert_not_awaited()
+
+
+async def test_dropped_frames_end_the_run():
+    on_end = AsyncMock()
+    detector = EndOfTapeDetector(WIDTH, HEIGHT, FPS, timeout=2.0, on_end=on_end)
+
+    await detector.feed(picture(10).tobytes())
+    await detector.feed(snow(15).tobytes())
+    # Frames never analyzed may have held content
+    await detector.skip(15)
+    await detector.feed(snow(15).tobytes())
+    assert not detector.ended
+
+    await detector.feed(snow(5).tobytes())
+    assert detector.ended
+    on_end.assert_awaited_once_with(STATIC, 4.0)
+
+
+async def test_blank_lead_in_does_not_end_tape():
+    on_end = AsyncMock()
+    detector = EndOfTapeDetector(WIDTH, HEIGHT, FPS, timeout=2.0, on_end=on_end)
+
+    # Blue screen until play is pressed
+    await detector.feed(solid((200, 40, 40), 50).tobytes())
+    assert not detector.ended
+    await detector.feed(picture(10).tobytes())
+    await detector.feed(solid((200, 40, 40), 20).tobytes())
+
+    assert detector.ended
+    on_end.assert_awaited_once_with(BLUE_SCREEN, 6.0)
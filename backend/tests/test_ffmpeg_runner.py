@@ -0,0 +1,170 @@
+import asyncio
+import os
+import stat
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from digitizer import ffmpeg_runner
+from digitizer.ffmpeg_runner import FFmpegProcess, FFmpegProgress, ProcessStats, run_ffmpeg
+
+
+def fake_proc(progress: bytes = b"", stderr: bytes = b"", returncode: int = 0) -> AsyncMock:
+    proc = AsyncMock()
+    proc.stdout = asyncio.StreamReader()
+    proc.stdout.feed_data(progress)
+    proc.stdout.feed_eof()
+    proc.stderr = asyncio.StreamReader()
+    proc.stderr.feed_data(stderr)
+    proc.stderr.feed_eof()
+    proc.returncode = returncode
+    return proc
+
+
+def test_progress_block_is_parsed():
+    progress = FFmpegProgress({
+        "frame": "250",
+        "fps": "29.97",
+        "out_time_us": "8341000",
+        "total_size": "1048576",
+        "speed": "1.02x",
+        "drop_frames": "3",
+        "dup_frames": "1",
+        "progress": "continue",
+    })
+    assert progress.out_time == 8.341
+    assert progress.speed == 1.02
+    assert progress.fps == 29.97
+    assert progress.frame == 250
+    assert (progress.drop_frames, progress.dup_frames) == (3, 1)
+    assert progress.total_size == 1048576
+    assert not progress.done
+
+
+def test_progress_before_first_frame():
+    progress = FFmpegProgress({"out_time_us": "N/A", "speed": "N/A", "total_size": "N/A", "progress": "end"})
+    assert progress.out_time == 0.0
+    assert progress.speed is None
+    assert progress.total_size is None
+    assert progress.done
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_run_reports_each_block_and_keeps_stderr_tail(mock_exec):
+    mock_exec.return_value = fake_proc(
+        progress=b"out_time_us=1000000\nspeed=2x\nprogress=continue\nout_time_us=2000000\nspeed=2x\nprogress=end\n",
+        stderr=b"".join(f"line {i}\n".encode() for i in range(100)),
+        returncode=1,
+    )
+    seen = []
+
+    async def on_progress(progress):
+        seen.append((progress.out_time, progress.done))
+
+    result = await run_ffmpeg(["ffmpeg", "-i", "in.mp4", "out.mp4"], on_progress=on_progress)
+
+    assert mock_exec.call_args.args == (
+        "ffmpeg", "-progress", "pipe:1", "-nostats", "-i", "in.mp4", "out.mp4",
+    )
+    assert seen == [(1.0, False), (2.0, True)]
+    assert not result.ok
+    assert len(result.stderr) == ffmpeg_runner.STDERR_LINES
+    assert result.stderr[-1] == "line 99"
+    assert result.stats.wall_time > 0
+
+
+@pytest.fixture
+def hanging_ffmpeg(tmp_path, monkeypatch):
+    """An ffmpeg that never exits until signalled."""
+    monkeypatch.setattr(ffmpeg_runner, "TERMINATE_GRACE", 0.5)
+    path = tmp_path / "ffmpeg"
+    path.write_text("#!/bin/sh\nexec sleep 30\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+async def test_timeout_terminates_process(hanging_ffmpeg):
+    result = await run_ffmpeg([hanging_ffmpeg, "-i", "in", "out"], timeout=0.2)
+
+    assert result.timed_out
+    assert not result.ok
+    assert result.returncode != 0
+
+
+async def test_cancelled_wait_stops_process(hanging_ffmpeg):
+    proc = FFmpegProcess([hanging_ffmpeg, "-i", "in", "out"])
+    await proc.start()
+    task = asyncio.create_task(proc.wait())
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert proc.process.returncode is not None
+
+
+def process_state(pid: int) -> str:
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().rsplit(")", 1)[1].split()[0]
+
+
+async def test_low_priority_process_pauses_and_stops(hanging_ffmpeg):
+    proc = FFmpegProcess([hanging_ffmpeg, "-i", "in", "out"], niceness=5)
+    await proc.start()
+    pid = proc.process.pid
+    assert os.getpriority(os.PRIO_PROCESS, pid) == min(os.getpriority(os.PRIO_PROCESS, 0) + 5, 19)
+
+    proc.pause()
+    await asyncio.sleep(0.1)
+    assert proc.paused
+    assert process_state(pid) == "T"
+    proc.resume()
+    await asyncio.sleep(0.1)
+    assert process_state(pid) != "T"
+
+    # Cancelling a paused process still gets it to exit
+    proc.pause()
+    proc.cancel()
+    result = await asyncio.wait_for(proc.wait(), 2)
+    assert result.cancelled
+    assert not proc.paused
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_stdout_pipe_moves_progress_to_extra_fd(mock_exec):
+    proc = fake_proc()
+    mock_exec.return_value = proc
+
+    runner = FFmpegProcess(["ffmpeg", "-i", "in", "pipe:1"], stdout_pipe=True)
+    await runner.start()
+    result = await runner.wait()
+
+    (write_fd,) = mock_exec.call_args.kwargs["pass_fds"]
+    assert mock_exec.call_args.args[1:3] == ("-progress", f"pipe:{write_fd}")
+    assert runner.stdout is proc.stdout
+    assert result.ok
+
+
+def test_process_stats_sample_own_process():
+    stats = ProcessStats()
+    stats.sample(os.getpid())
+    assert stats.cpu_time > 0
+    assert stats.peak_rss > 0
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec", side_effect=FileNotFoundError("ffmpeg"))
+async def test_stdout_pipe_closed_when_ffmpeg_fails_to_start(mock_exec, monkeypatch):
+    fds = []
+    real_pipe = os.pipe
+
+    def pipe():
+        fds.extend(real_pipe())
+        return tuple(fds)
+
+    monkeypatch.setattr("digitizer.ffmpeg_runner.os.pipe", pipe)
+    with pytest.raises(FileNotFoundError):
+        await FFmpegProcess(["ffmpeg", "-i", "in", "pipe:1"], stdout_pipe=True).start()
+
+    for fd in fds:
+        with pytest.raises(OSError):
+            os.fstat(fd)
@@ -0,0 +1,157 @@
+import asyncio
+
+import numpy as np
+import pytest
+from scenedetect.detectors import ContentDetector, ThresholdDetector
+
+from digitizer.frame_metrics import (
+    CutTracker,
+    FrameMetrics,
+    MetricsAccumulator,
+    analysis_size,
+    assemble_metrics,
+    build_rawvideo_command,
+    candidate_windows,
+    detect_cuts,
+    parse_probe_output,
+    read_frames,
+)
+
+
+def make_frames() -> np.ndarray:
+    """Hard cuts, short flashes and a strobe (exercise the merge filter) and a fade to black."""
+    rng = np.random.default_rng(0)
+    colors = [(220, 60, 60), (40, 110, 40), (60, 200, 230), (90, 90, 20), (40, 220, 220)]
+    frames = []
+    for n in range(600):
+        color = colors[(n // 110) % len(colors)]
+        frame = np.empty((48, 64, 3), np.float32)
+        frame[:] = color
+        frame += rng.normal(0, 1.5, frame.shape)
+        if 250 <= n < 253 or 262 <= n < 264 or (480 <= n < 500 and n % 2):
+            frame[:] = 255
+        if 400 <= n < 460:
+            frame *= abs(n - 430) / 30
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return np.stack(frames)
+
+
+def pyscenedetect_cuts(frames: np.ndarray, content_threshold: float, fade_threshold: int) -> list[int]:
+    detectors = [ContentDetector(threshold=content_threshold), ThresholdDetector(threshold=fade_threshold)]
+    cuts = set()
+    for n, frame in enumerate(frames):
+        for det in detectors:
+            cuts.update(det.process_frame(n, frame))
+    return sorted(cuts)
+
+
+def numpy_metrics(frames: np.ndarray, batch: int) -> FrameMetrics:
+    acc = MetricsAccumulator()
+    for i in range(0, len(frames), batch):
+        acc.add_batch(frames[i:i + batch])
+    return acc.result(fps=25.0)
+
+
+@pytest.mark.parametrize("batch", [1, 7, 600])
+def test_cuts_match_pyscenedetect(batch):
+    frames = make_frames()
+    expected = pyscenedetect_cuts(frames, 22.0, 12)
+    metrics = numpy_metrics(frames, batch)
+    assert len(expected) >= 4
+    assert detect_cuts(metrics, 22.0, 12) == expected
+
+
+def test_content_score_first_frame_is_zero():
+    metrics = numpy_metrics(make_frames()[:10], batch=4)
+    assert metrics.frame_count == 10
+    assert metrics.content[0] == 0.0
+    assert metrics.luma.dtype == np.float32
+
+
+def test_cut_tracker_streams_same_cuts_as_batch():
+    metrics = numpy_metrics(make_frames(), batch=50)
+    tracker = CutTracker(22.0, 12)
+    streamed = []
+    for i in range(0, metrics.frame_count, 33):
+        streamed += tracker.feed(metrics.content[i:i + 33], metrics.luma[i:i + 33])
+    assert streamed == detect_cuts(metrics, 22.0, 12)
+
+
+async def test_read_frames_batches_stream():
+    data = bytes(range(256)) * 9  # 8x8x3 frames are 192 bytes; three are read as 2 + 1
+    stream = asyncio.StreamReader()
+    stream.feed_data(data[:8 * 8 * 3 * 3])
+    stream.feed_eof()
+    batches = [b async for b in read_frames(stream, 8, 8, batch_frames=2)]
+    assert [b.shape for b in batches] == [(2, 8, 8, 3), (1, 8, 8, 3)]
+
+
+def test_analysis_size_keeps_aspect():
+    assert analysis_size(720, 480) == (256, 170)
+    assert analysis_size(160, 120) == (160, 120)
+
+
+def test_build_rawvideo_command():
+    cmd = build_rawvideo_command("/input/video.mp4", 256, 170, start=12.5, fps=5)
+    assert cmd[0] == "ffmpeg"
+    assert "12.500" in cmd
+    assert "fps=5,scale=256:170:flags=neighbor" in cmd
+    assert "bgr24" in cmd
+    assert cmd[-1] == "pipe:1"
+
+
+def test_parse_probe_output():
+    info = parse_probe_output(
+        '{"streams": [{"width": 720, "height": 480, "avg_frame_rate": "30000/1001"}],'
+        ' "format": {"duration": "3600.5"}}'
+    )
+    assert info["width"] == 720
+    assert round(info["fps"], 2) == 29.97
+    assert info["duration"] == 3600.5
+
+
+def test_candidate_windows_flag_spikes_over_keyframes():
+    # Keyframes every two seconds at 4 samples/s, repeated in between
+    content = np.zeros(80, np.float32)
+    content[8:48:8] = 30.0  # steady motion, above the threshold this far apart
+    content[40] = 80.0  # cut
+    content[72] = 60.0  # cut after a still picture (identical keyframes)
+    luma = np.full(80, 100.0, np.float32)
+    windows = candidate_windows(FrameMetrics(4.0, content, luma), 22.0, 12, padding=0.5)
+    assert windows == [(7.5, 10.75), (15.5, 18.75)]
+
+
+def test_candidate_windows_flag_fade_between_keyframes():
+    content = np.zeros(48, np.float32)
+    content[8::8] = 1.0
+    luma = np.full(48, 100.0, np.float32)
+    luma[16:32] = 40.0  # both keyframes inside the fade equally dim
+    windows = candidate_windows(FrameMetrics(4.0, content, luma), 22.0, 12, padding=0.5)
+    assert windows == [(1.5, 8.75)]
+
+    luma[32:] = 40.0  # a darker scene, no fade back in
+    windows = candidate_windows(FrameMetrics(4.0, content, luma), 22.0, 12, padding=0.5)
+    assert windows == [(1.5, 4.75)]
+
+
+def test_assemble_metrics_fills_windows():
+    coarse = FrameMetrics(1.0, np.zeros(4, np.float32), np.array([100, 100, 5, 5], np.float32))
+    window = FrameMetrics(10.0, np.full(5, 40.0, np.float32), np.full(5, 50.0, np.float32))
+    metrics = assemble_metrics(coarse, [(12, window)], fps=10.0, frame_count=40)
+    assert metrics.frame_count == 40
+    assert metrics.content[12] == 0.0
+    assert (metrics.content[13:17] == 40.0).all()
+    assert metrics.content.sum() == 160.0
+    assert metrics.luma[5] == 100.0 and metrics.luma[14] == 50.0 and metrics.luma[25] == 5.0
+
+
+def test_cut_tracker_settled_frame_holds_back_pending_fade():
+    luma = np.full(60, 100.0, np.float32)
+    luma[30:] = 2.0
+    tracker = CutTracker(22.0, 12)
+    tracker.feed(np.zeros(30, np.float32), luma[:30])
+    assert tracker.settled_frame == 30
+    tracker.feed(np.zeros(30, np.float32), luma[30:])
+    # Fading out since frame 30: the eventual cut lands at or after it
+    assert tracker.settled_frame == 30
+    assert tracker.frame_count == 60
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from unittest.mock import AsyncMock
 
@@ -37,6 +38,12 @@ async def test_create_job_generates_output_path(job_manager):
     assert "_rip_001" in job.output_path
 
 
+async def test_concurrent_jobs_get_distinct_paths(job_manager):
+    disc_info = {"title_count": 1, "main_title": 1, "duration": 3600.0}
+    jobs = await asyncio.gather(*(job_manager.create_job(disc_info=disc_info) for _ in range(3)))
+    assert sorted(j.output_path.rsplit("_", 1)[-1] for j in jobs) == ["001.mp4", "002.mp4", "003.mp4"]
+
+
 async def test_mark_ripping(job_manager):
     disc_info = {"title_count": 1, "main_title": 1, "duration": 100.0}
     job = await job_manager.create_job(disc_info=disc_info)
@@ -0,0 +1,95 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from digitizer.db import Database
+from digitizer.keyframes import (
+    build_index,
+    build_index_command,
+    parse_index_output,
+    snap_scenes,
+    snap_time,
+)
+
+PROBE_OUTPUT = """\
+pts_time=0.066733|size=40210|pos=48|flags=K__
+pts_time=0.166833|size=1200|pos=40258|flags=___
+pts_time=0.100100|size=900|pos=41458|flags=___
+pts_time=2.068733|size=38000|pos=42358|flags=K__
+pts_time=2.102100|size=1100|pos=80358|flags=___
+pts_time=N/A|size=10|pos=81458|flags=K_D
+pts_time=4.070733|size=39000|pos=81468|flags=K__
+start_time=0.066733
+"""
+
+
+def test_build_index_command():
+    cmd = build_index_command("/input/video.mp4")
+    assert cmd[0] == "ffprobe"
+    assert "v:0" in cmd
+    assert cmd[-1] == "/input/video.mp4"
+
+
+def test_parse_index_output_groups_packets_per_gop():
+    index = parse_index_output(PROBE_OUTPUT)
+    # Times are relative to the container start, as -ss expects
+    assert [kf["pts_time"] for kf in index] == [0.0, 2.002, 4.004]
+    assert index[0] == {"pts_time": 0.0, "pos": 48, "packets": 3, "size": 42310}
+    assert index[1]["packets"] == 2
+
+
+def test_snap_time_modes():
+    times = [0.0, 2.0, 4.0]
+    assert snap_time(times, 2.9) == 2.0
+    assert snap_time(times, 3.1) == 4.0
+    assert snap_time(times, 2.9, "after") == 4.0
+    assert snap_time(times, 3.9, "before") == 2.0
+    assert snap_time(times, 9.0) == 4.0
+    assert snap_time([], 1.5) == 1.5
+
+
+def test_snap_scenes_keeps_tail_and_drops_collapsed():
+    scenes = [
+        {"id": "a", "scene_index": 1, "start_time": 0.0, "end_time": 2.3},
+        {"id": "b", "scene_index": 2, "start_time": 2.3, "end_time": 2.6},
+        {"id": "c", "scene_index": 3, "start_time": 2.6, "end_time": 9.5},
+    ]
+    snapped = snap_scenes(scenes, [0.0, 2.0, 4.0, 6.0])
+    assert [(s["id"], s["scene_index"], s["start_time"], s["end_time"]) for s in snapped] == [
+        ("a", 1, 0.0, 2.0),
+        ("c", 2, 2.0, 9.5),
+    ]
+
+
+@patch("digitizer.keyframes.asyncio.create_subprocess_exec")
+async def test_build_index_runs_ffprobe(mock_exec):
+    mock_proc = AsyncMock()
+    mock_proc.communicate = AsyncMock(return_value=(PROBE_OUTPUT.encode(), b""))
+    mock_proc.returncode = 0
+    mock_exec.return_value = mock_proc
+
+    index = await build_index("/input/video.mp4")
+    assert len(index) == 3
+    assert mock_exec.call_args.args[0] == "ffprobe"
+
+
+@patch("digitizer.keyframes.asyncio.create_subprocess_exec")
+async def test_build_index_failure_raises(mock_exec):
+    mock_proc = AsyncMock()
+    mock_proc.communicate = AsyncMock(return_value=(b"", b"Invalid data found"))
+    mock_proc.returncode = 1
+    mock_exec.return_value = mock_proc
+
+    with pytest.raises(RuntimeError, match="Invalid data found"):
+        await build_index("/input/video.mp4")
+
+
+async def test_keyframes_stored_per_job(tmp_db_path):
+    db = Database(tmp_db_path)
+    await db.init()
+    await db.replace_keyframes("job-1", parse_index_output(PROBE_OUTPUT))
+    await db.replace_keyframes("job-2", [{"pts_time": 0.0, "pos": 0, "packets": 1, "size": 10}])
+    await db.replace_keyframes("job-1", parse_index_output(PROBE_OUTPUT))
+    assert [kf["pts_time"] for kf in await db.list_keyframes("job-1")] == [0.0, 2.002, 4.004]
+    assert len(await db.list_keyframes("job-2")) == 1
+    await db.close()
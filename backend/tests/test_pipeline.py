@@ -0,0 +1,200 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from digitizer.db import Database
+from digitizer.drives import Drive
+from digitizer.jobs import JobManager
+from digitizer.main import _recover_rips, _rip_disc
+from digitizer.models import JobStatus
+from digitizer.pipeline import RipPipeline
+
+
+DISC_INFO = {"title_count": 1, "main_title": 1, "duration": 60.0}
+
+
+@pytest.fixture
+async def db(tmp_db_path):
+    database = Database(tmp_db_path)
+    await database.init()
+    yield database
+    await database.close()
+
+
+@pytest.fixture
+def job_manager(db, tmp_output_dir):
+    return JobManager(db=db, output_base=tmp_output_dir)
+
+
+class FakeRipper:
+    """Reads instantly; each remux waits until the test releases it."""
+
+    def __init__(self):
+        self.reads = []
+        self.released = {}
+        self.remux_started = asyncio.Event()
+        self.eject = AsyncMock(return_value=True)
+
+    async def read_title(self, title_number, duration, scratch_dir, on_progress=None):
+        os.makedirs(scratch_dir, exist_ok=True)
+        source = os.path.join(scratch_dir, "title_01.vob")
+        open(source, "wb").close()
+        self.reads.append(source)
+        await on_progress(100)
+        return source
+
+    async def remux_title(self, source, duration, output_path, on_progress=None):
+        self.remux_started.set()
+        release = self.released.setdefault(source, asyncio.Event())
+        await release.wait()
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "wb") as f:
+            f.write(b"x" * 10)
+        await on_progress(100)
+        return True
+
+
+async def test_pipeline_reads_next_disc_while_remuxing(job_manager, tmp_path):
+    ripper = FakeRipper()
+    ws = MagicMock()
+    ws.broadcast = AsyncMock()
+    pipeline = RipPipeline(ripper, job_manager, ws, scratch_dir=str(tmp_path / "scratch"))
+    pipeline.start()
+    try:
+        first = await job_manager.create_job(disc_info=DISC_INFO)
+        second = await job_manager.create_job(disc_info=DISC_INFO)
+
+        assert await pipeline.read(first, DISC_INFO) is True
+        await asyncio.wait_for(ripper.remux_started.wait(), timeout=1)
+        # The first remux is still running, yet the second disc can be read
+        assert await pipeline.read(second, DISC_INFO) is True
+        assert len(ripper.reads) == 2
+        assert (await job_manager.get_job(first.id)).progress == 50
+
+        for source in ripper.reads:
+            ripper.released.setdefault(source, asyncio.Event()).set()
+        await asyncio.wait_for(pipeline.queue.join(), timeout=1)
+    finally:
+        await pipeline.stop()
+
+    for job in (first, second):
+        done = await job_manager.get_job(job.id)
+        assert done.status == JobStatus.COMPLETE
+        assert done.file_size == 10
+        assert set(done.stage_timings) == {"read", "queued", "remux"}
+        assert not os.path.exists(tmp_path / "scratch" / job.id)
+
+
+async def test_pipeline_read_failure_marks_job_failed(job_manager, tmp_path):
+    ripper = MagicMock()
+    ripper.read_title = AsyncMock(return_value=None)
+    ws = MagicMock()
+    ws.broadcast = AsyncMock()
+    pipeline = RipPipeline(ripper, job_manager, ws, scratch_dir=str(tmp_path / "scratch"))
+
+    job = await job_manager.create_job(disc_info=DISC_INFO)
+    assert await pipeline.read(job, DISC_INFO) is False
+
+    failed = await job_manager.get_job(job.id)
+    assert failed.status == JobStatus.FAILED
+    assert "read" in failed.stage_timings
+    assert pipeline.queue.empty()
+    assert ws.broadcast.call_args.args[0]["event"] == "job_failed"
+
+
+async def test_rip_disc_ejects_before_remux_finishes(db, job_manager, tmp_path):
+    ripper = FakeRipper()
+    ws = MagicMock()
+    ws.broadcast = AsyncMock()
+    pipeline = RipPipeline(ripper, job_manager, ws, scratch_dir=str(tmp_path / "scratch"))
+    monitor = MagicMock()
+    drive = Drive("sr0", "/dev/sr0", monitor=monitor, ripper=ripper, pipeline=pipeline)
+    app = MagicMock()
+    app.state.db = db
+    app.state.ws_manager = ws
+    app.state.job_manager = job_manager
+
+    pipeline.start()
+    try:
+        await _rip_disc(app, drive, DISC_INFO)
+        await asyncio.wait_for(ripper.remux_started.wait(), timeout=1)
+
+        ripper.eject.assert_awaited_once()
+        monitor.set_empty.assert_called()
+        job = (await job_manager.list_jobs())[0]
+        assert job.status == JobStatus.RIPPING
+
+        ripper.released.setdefault(ripper.reads[0], asyncio.Event()).set()
+        await asyncio.wait_for(pipeline.queue.join(), timeout=1)
+    finally:
+        await pipeline.stop()
+
+    assert (await job_manager.get_job(job.id)).status == JobStatus.COMPLETE
+
+
+async def test_pipeline_read_waits_for_queue_room(job_manager, tmp_path):
+    ripper = FakeRipper()
+    ws = MagicMock()
+    ws.broadcast = AsyncMock()
+    pipeline = RipPipeline(ripper, job_manager, ws, scratch_dir=str(tmp_path / "scratch"), max_queued=1)
+    pipeline.start()
+    try:
+        jobs = [await job_manager.create_job(disc_info=DISC_INFO) for _ in range(3)]
+        assert await pipeline.read(jobs[0], DISC_INFO) is True
+        await asyncio.wait_for(ripper.remux_started.wait(), timeout=1)
+        assert await pipeline.read(jobs[1], DISC_INFO) is True
+
+        # One remux running and one queued: the third read holds its drive
+        third = asyncio.create_task(pipeline.read(jobs[2], DISC_INFO))
+        await asyncio.sleep(0.05)
+        assert not third.done()
+
+        ripper.released.setdefault(ripper.reads[0], asyncio.Event()).set()
+        assert await asyncio.wait_for(third, timeout=1) is True
+        for source in ripper.reads:
+            ripper.released.setdefault(source, asyncio.Event()).set()
+        await asyncio.wait_for(pipeline.queue.join(), timeout=1)
+    finally:
+        await pipeline.stop()
+
+
+async def test_pipeline_stop_fails_unfinished_remuxes(job_manager, tmp_path):
+    ripper = FakeRipper()
+    ws = MagicMock()
+    ws.broadcast = AsyncMock()
+    pipeline = RipPipeline(ripper, job_manager, ws, scratch_dir=str(tmp_path / "scratch"))
+    pipeline.start()
+    running = await job_manager.create_job(disc_info=DISC_INFO)
+    queued = await job_manager.create_job(disc_info=DISC_INFO)
+    await pipeline.read(running, DISC_INFO)
+    await asyncio.wait_for(ripper.remux_started.wait(), timeout=1)
+    await pipeline.read(queued, DISC_INFO)
+
+    await pipeline.stop()
+
+    for job in (running, queued):
+        stopped = await job_manager.get_job(job.id)
+        assert stopped.status == JobStatus.FAILED
+        assert stopped.error == "Remux interrupted"
+        assert not os.path.exists(tmp_path / "scratch" / job.id)
+    assert pipeline.queue.empty()
+
+
+async def test_recover_rips_fails_interrupted_jobs(job_manager, tmp_path):
+    ripping = await job_manager.create_job(disc_info=DISC_INFO)
+    await job_manager.mark_ripping(ripping.id)
+    waiting = await job_manager.create_job(disc_info=DISC_INFO)
+    done = await job_manager.create_job(disc_info=DISC_INFO)
+    await job_manager.mark_complete(done.id, file_size=10)
+    scratch = tmp_path / "scratch"
+    (scratch / ripping.id).mkdir(parents=True)
+    (scratch / ripping.id / "title_01.vob").write_bytes(b"x")
+
+    await _recover_rips(job_manager, str(scratch))
+
+    assert not os.path.exists(scratch / ripping.id)
+    for job in (ripping, waiting):
+        assert (await job_manager.get_job(job.id)).status == JobStatus.FAILED
+    assert (await job_manager.get_job(done.id)).status == JobStatus.COMPLETE
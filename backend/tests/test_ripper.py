@@ -3,7 +3,7 @@ from unittest.mock import AsyncMock, patch, MagicMock
 
 import pytest
 
-from digitizer.ripper import DVDRipper
+from digitizer.ripper import DVDRipper, dvdvideo_supported, parse_demuxers
 
 
 @pytest.fixture
@@ -24,18 +24,6 @@ def test_build_ffmpeg_command(ripper):
     assert "copy" in cmd
 
 
-def test_parse_progress_line(ripper):
-    line = "frame=  100 fps=30.0 q=-1.0 size=   51200kB time=00:01:30.00 bitrate=4652.8kbits/s speed=2.0x"
-    seconds = ripper.parse_time_from_progress(line)
-    assert seconds == 90.0
-
-
-def test_parse_progress_line_no_time(ripper):
-    line = "Some random ffmpeg output"
-    seconds = ripper.parse_time_from_progress(line)
-    assert seconds is None
-
-
 def test_calculate_progress_percent(ripper):
     pct = ripper.calculate_progress(current_seconds=45.0, total_seconds=90.0)
     assert pct == 50
@@ -69,3 +57,156 @@ async def test_rip_calls_ffmpeg(mock_exec, ripper):
     )
     assert result is True
     mock_exec.assert_called_once()
+
+
+def stderr_proc(lines: list[bytes], returncode: int = 0, progress: bytes = b"") -> AsyncMock:
+    proc = AsyncMock()
+    proc.stdout = asyncio.StreamReader()
+    proc.stdout.feed_data(progress)
+    proc.stdout.feed_eof()
+
+    async def aiter():
+        for line in lines:
+            yield line
+
+    proc.stderr = aiter()
+    proc.wait = AsyncMock(return_value=returncode)
+    proc.returncode = returncode
+    return proc
+
+
+@patch("digitizer.ripper.asyncio.create_subprocess_exec")
+async def test_stream_rip_reads_title_without_temp_copy(mock_exec, video_ts_dir, tmp_path):
+    ripper = DVDRipper(drive_device=video_ts_dir)
+    mock_exec.return_value = stderr_proc([], progress=(
+        b"frame=100\nout_time_us=30000000\nspeed=2.0x\nprogress=continue\n"
+        b"frame=200\nout_time_us=60000000\nspeed=2.0x\nprogress=end\n"
+    ))
+
+    progress_cb = AsyncMock()
+    with patch("digitizer.ripper.tempfile.TemporaryDirectory") as mock_tmp:
+        result = await ripper.rip(
+            title_number=2,
+            duration=120.0,
+            output_path=str(tmp_path / "out" / "rip.mp4"),
+            on_progress=progress_cb,
+        )
+
+    assert result is True
+    mock_tmp.assert_not_called()
+    cmd = mock_exec.call_args.args
+    assert cmd[0] == "ffmpeg"
+    assert cmd[cmd.index("-f") + 1] == "dvdvideo"
+    assert cmd[cmd.index("-title") + 1] == "2"
+    assert cmd[cmd.index("-i") + 1] == video_ts_dir
+    assert [c.args[0] for c in progress_cb.call_args_list] == [25, 50]
+
+
+@patch("digitizer.ripper.asyncio.create_subprocess_exec")
+async def test_backup_rip_concatenates_title_vobs(mock_exec, video_ts_dir, tmp_path):
+    import shutil
+
+    ripper = DVDRipper(drive_device=video_ts_dir, rip_mode="backup")
+
+    async def fake_exec(*cmd, **kwargs):
+        if cmd[0] == "dvdbackup":
+            out = cmd[cmd.index("-o") + 1]
+            # dvdbackup -t copies only the title set holding that title
+            shutil.copytree(video_ts_dir, f"{out}/DISC", ignore=shutil.ignore_patterns("VTS_02_*"))
+            proc = AsyncMock()
+            proc.wait = AsyncMock(return_value=0)
+            proc.returncode = 0
+            return proc
+        return stderr_proc([])
+
+    mock_exec.side_effect = fake_exec
+    result = await ripper.rip(title_number=1, duration=60.0, output_path=str(tmp_path / "rip.mp4"))
+
+    assert result is True
+    ffmpeg_cmd = mock_exec.call_args_list[1].args
+    source = ffmpeg_cmd[ffmpeg_cmd.index("-i") + 1]
+    assert source.startswith("concat:")
+    assert [p.rsplit("/", 1)[-1] for p in source[7:].split("|")] == ["VTS_01_1.VOB", "VTS_01_2.VOB"]
+
+
+@patch("digitizer.ripper.asyncio.create_subprocess_exec")
+async def test_read_title_copies_to_scratch_then_remux(mock_exec, video_ts_dir, tmp_path):
+    ripper = DVDRipper(drive_device=video_ts_dir)
+    mock_exec.return_value = stderr_proc([])
+    scratch = str(tmp_path / "scratch" / "job")
+
+    source = await ripper.read_title(title_number=3, duration=60.0, scratch_dir=scratch)
+
+    assert source == f"{scratch}/title_03.vob"
+    read_cmd = mock_exec.call_args.args
+    assert read_cmd[read_cmd.index("-i") + 1] == video_ts_dir
+    assert read_cmd[read_cmd.index("-c") + 1] == "copy"
+    assert "aac" not in read_cmd
+    assert read_cmd[-1] == source
+
+    mock_exec.return_value = stderr_proc([])
+    assert await ripper.remux_title(source, 60.0, str(tmp_path / "out" / "rip.mp4")) is True
+    remux_cmd = mock_exec.call_args.args
+    assert remux_cmd[remux_cmd.index("-i") + 1] == source
+    assert "aac" in remux_cmd
+
+
+@patch("digitizer.ripper.asyncio.create_subprocess_exec")
+async def test_read_title_fails_when_ffmpeg_fails(mock_exec, tmp_path):
+    ripper = DVDRipper(drive_device="/dev/sr0")
+    mock_exec.return_value = stderr_proc([b"Error opening input\n"], returncode=1)
+
+    assert await ripper.read_title(1, 60.0, str(tmp_path / "scratch")) is None
+
+
+def test_parse_demuxers():
+    output = (
+        "File formats:\n"
+        " D. = Demuxing supported\n"
+        " .E = Muxing supported\n"
+        " --\n"
+        " D  dvdvideo        DVD-Video\n"
+        " D  mov,mp4,m4a,3gp,3g2,mj2 QuickTime / MOV\n"
+    )
+    assert parse_demuxers(output) == {"dvdvideo", "mov", "mp4", "m4a", "3gp", "3g2", "mj2"}
+
+
+@patch("digitizer.ripper.asyncio.create_subprocess_exec")
+async def test_dvdvideo_supported(mock_exec):
+    proc = AsyncMock()
+    proc.communicate = AsyncMock(return_value=(b" D  vob             MPEG-PS (VOB)\n", b""))
+    mock_exec.return_value = proc
+    assert await dvdvideo_supported() is False
+
+    proc.communicate = AsyncMock(return_value=(b" D  dvdvideo        DVD-Video\n", b""))
+    assert await dvdvideo_supported() is True
+
+    mock_exec.side_effect = FileNotFoundError("ffmpeg")
+    assert await dvdvideo_supported() is False
+
+
+@patch("digitizer.ripper.asyncio.create_subprocess_exec")
+async def test_backup_remux_title_extracts_vobs_from_mirror(mock_exec, video_ts_dir, tmp_path):
+    import shutil
+
+    ripper = DVDRipper(drive_device="/dev/sr0", rip_mode="backup")
+
+    async def fake_exec(*cmd, **kwargs):
+        if cmd[0] == "dvdbackup":
+            out = cmd[cmd.index("-o") + 1]
+            shutil.copytree(video_ts_dir, f"{out}/DISC", ignore=shutil.ignore_patterns("VTS_01_*"))
+            proc = AsyncMock()
+            proc.wait = AsyncMock(return_value=0)
+            proc.returncode = 0
+            return proc
+        return stderr_proc([])
+
+    mock_exec.side_effect = fake_exec
+    ok = await ripper.remux_title(video_ts_dir, 60.0, str(tmp_path / "out" / "t2.mp4"), title_number=2)
+
+    assert ok is True
+    backup_cmd, ffmpeg_cmd = (c.args for c in mock_exec.call_args_list)
+    assert backup_cmd[backup_cmd.index("-i") + 1] == video_ts_dir
+    assert backup_cmd[backup_cmd.index("-t") + 1] == "2"
+    assert "dvdvideo" not in ffmpeg_cmd
+    assert ffmpeg_cmd[ffmpeg_cmd.index("-i") + 1].endswith("VIDEO_TS/VTS_02_1.VOB")
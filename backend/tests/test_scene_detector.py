@@ -2,6 +2,8 @@ import os
 import uuid
 from unittest.mock import patch, MagicMock, AsyncMock
 
+import cv2
+import numpy as np
 import pytest
 
 from digitizer.scene_detector import SceneDetector
@@ -16,6 +18,32 @@ def detector():
     )
 
 
+@pytest.fixture
+def synthetic_video(tmp_path):
+    """60s MJPEG clip with hard cuts (two next to chunk seams) and a fade to black."""
+    path = str(tmp_path / "synthetic.avi")
+    fps = 25
+    colors = [
+        (0.0, (220, 60, 60)), (8.0, (40, 110, 40)), (19.5, (60, 60, 230)),
+        (24.0, (90, 90, 20)), (33.0, (40, 220, 220)), (41.0, (100, 30, 100)),
+        (50.0, (200, 200, 200)),
+    ]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (160, 120))
+    ramp = np.linspace(0.6, 1.0, 160, dtype=np.float32)[None, :, None]
+    for n in range(60 * fps):
+        t = n / fps
+        color = [c for start, c in colors if start <= t][-1]
+        frame = np.empty((120, 160, 3), np.float32)
+        frame[:] = color
+        frame *= np.roll(ramp, n % 160, axis=1)
+        if 29.0 <= t < 33.0:
+            # Fade out to black and back in
+            frame *= abs(t - 31.0) / 2.0
+        writer.write(frame.astype(np.uint8))
+    writer.release()
+    return path
+
+
 def test_default_thresholds(detector):
     assert detector.content_threshold == 22.0
     assert detector.fade_threshold == 12
@@ -54,16 +82,31 @@ def test_filter_short_scenes_single_scene(detector):
     assert len(filtered) == 1
 
 
-def test_build_thumbnail_command(detector):
-    cmd = detector.build_thumbnail_command(
+def test_build_thumbnails_command(detector):
+    cmd = detector.build_thumbnails_command(
         video_path="/input/video.mp4",
-        timestamp=45.2,
-        output_path="/thumbs/scene_001.jpg",
+        thumbnails=[(45.2, "/thumbs/scene_001.jpg"), (90.0, "/thumbs/scene_002.jpg")],
     )
     assert "ffmpeg" in cmd[0]
-    assert "-ss" in cmd
-    assert "45.200" in cmd
-    assert "/thumbs/scene_001.jpg" in cmd
+    assert cmd.count("-i") == 2
+    # Seeks are input-side: one keyframe seek per thumbnail, not a full decode
+    assert cmd.index("45.200") < cmd.index("-i")
+    assert "90.000" in cmd
+    assert cmd[cmd.index("/thumbs/scene_001.jpg") - 6:cmd.index("/thumbs/scene_001.jpg")] == [
+        "-map", "0:v:0", "-frames:v", "1", "-q:v", "2",
+    ]
+    assert cmd[-1] == "/thumbs/scene_002.jpg"
+    assert "1:v:0" in cmd
+
+
+async def test_extract_thumbnails_single_process(detector, tmp_path):
+    thumbnails = [(i * 10.0, str(tmp_path / f"scene_{i:03d}.jpg")) for i in range(1, 41)]
+    proc = AsyncMock()
+    proc.returncode = 0
+    with patch("digitizer.scene_detector.asyncio.create_subprocess_exec", return_value=proc) as mock_exec:
+        assert await detector._extract_thumbnails("/input/video.mp4", thumbnails)
+    assert mock_exec.call_count == 1
+    assert mock_exec.call_args.args.count("-i") == 40
 
 
 @patch("digitizer.scene_detector.open_video")
@@ -86,7 +129,7 @@ async def test_analyze_returns_scenes(mock_sm_cls, mock_open_video, detector, tm
     mock_sm.get_scene_list.return_value = [mock_scene1, mock_scene2]
 
     thumb_dir = str(tmp_path / "thumbs")
-    with patch.object(detector, "_extract_thumbnail", new_callable=AsyncMock) as mock_thumb:
+    with patch.object(detector, "_extract_thumbnails", new_callable=AsyncMock) as mock_thumb:
         mock_thumb.return_value = True
         scenes = await detector.analyze(
             video_path="/input/video.mp4",
@@ -98,3 +141,241 @@ async def test_analyze_returns_scenes(mock_sm_cls, mock_open_video, detector, tm
     assert scenes[0]["end_time"] == 60.0
     assert scenes[1]["start_time"] == 60.0
     assert scenes[1]["end_time"] == 180.0
+    mock_thumb.assert_awaited_once()
+    assert [t for t, _ in mock_thumb.call_args.args[1]] == [0.5, 60.5]
+
+
+def test_plan_chunks_splits_across_workers():
+    detector = SceneDetector(workers=4, chunk_overlap=10.0)
+    chunks = detector.plan_chunks(3600.0)
+    assert len(chunks) == 4
+    assert chunks[0] == (0.0, 900.0)
+    assert chunks[-1][1] == 3600.0
+
+
+def test_plan_chunks_short_video_stays_serial():
+    detector = SceneDetector(workers=8, chunk_overlap=10.0)
+    assert detector.plan_chunks(30.0) == [(0.0, 30.0)]
+    assert len(detector.plan_chunks(60.0)) == 3
+
+
+def test_merge_chunk_cuts_drops_seam_duplicates(detector):
+    chunk_cuts = [[100, 240, 260], [240, 260, 400, 560], [560, 700]]
+    owned = [(0, 250), (250, 500), (500, 750)]
+    assert detector.merge_chunk_cuts(chunk_cuts, owned) == [100, 240, 260, 400, 560, 700]
+
+
+def test_parallel_matches_serial(synthetic_video):
+    serial = SceneDetector(min_scene_length=0.0)._detect_scenes(synthetic_video)
+    parallel = SceneDetector(min_scene_length=0.0, workers=3, chunk_overlap=3.0)._detect_scenes(synthetic_video)
+    assert len(serial) == 8
+    assert parallel == serial
+
+
+def test_with_thresholds_returns_copy(detector):
+    tuned = detector.with_thresholds(content_threshold=30.0, min_scene_length=2.0)
+    assert tuned.content_threshold == 30.0
+    assert tuned.min_scene_length == 2.0
+    assert tuned.fade_threshold == detector.fade_threshold
+    assert detector.content_threshold == 22.0
+
+
+def test_unknown_engine_rejected():
+    with pytest.raises(ValueError, match="Unknown scene detection engine"):
+        SceneDetector(engine="opencv")
+
+
+def test_cuts_to_scenes_needs_frame_rate(detector):
+    assert detector.cuts_to_scenes([50], 100, 25.0) == [(0.0, 2.0), (2.0, 4.0)]
+    with pytest.raises(ValueError, match="frame rate"):
+        detector.cuts_to_scenes([50], 100, 0.0)
+
+
+def test_metrics_cache_skips_decode(synthetic_video, tmp_path):
+    metrics_dir = str(tmp_path / "metrics")
+    first = SceneDetector(min_scene_length=0.0)._detect_scenes(synthetic_video, metrics_dir)
+    assert os.path.exists(os.path.join(metrics_dir, "metrics.npy"))
+
+    tuned = SceneDetector(content_threshold=60.0, min_scene_length=0.0)
+    expected = tuned._detect_scenes(synthetic_video)
+    with patch("digitizer.scene_detector.open_video", side_effect=AssertionError("decoded")):
+        assert SceneDetector(min_scene_length=0.0)._detect_scenes(synthetic_video, metrics_dir) == first
+        assert tuned._detect_scenes(synthetic_video, metrics_dir) == expected
+    assert len(expected) < len(first)
+
+
+def test_parallel_collects_same_metrics_as_serial(synthetic_video, tmp_path):
+    from digitizer.frame_metrics import load_metrics
+
+    SceneDetector()._detect_scenes(synthetic_video, str(tmp_path / "serial"))
+    SceneDetector(workers=3, chunk_overlap=3.0)._detect_scenes(synthetic_video, str(tmp_path / "parallel"))
+    serial = load_metrics(str(tmp_path / "serial"), synthetic_video)
+    parallel = load_metrics(str(tmp_path / "parallel"), synthetic_video)
+    assert serial.frame_count == parallel.frame_count == 1500
+    # PySceneDetect's decode thread can report the first couple of frames of a
+    # run nondeterministically, so only compare from frame 3 onwards
+    assert np.allclose(serial.luma[3:], parallel.luma[3:])
+    assert np.allclose(serial.content[3:], parallel.content[3:])
+
+
+def test_stale_metrics_cache_is_ignored(synthetic_video, tmp_path):
+    from digitizer.frame_metrics import load_metrics
+
+    metrics_dir = str(tmp_path / "metrics")
+    SceneDetector()._detect_scenes(synthetic_video, metrics_dir)
+    assert load_metrics(metrics_dir, synthetic_video) is not None
+    with open(synthetic_video, "ab") as f:
+        f.write(b"\0")
+    assert load_metrics(metrics_dir, synthetic_video) is None
+
+
+def test_coarse_to_fine_matches_full_decode():
+    from digitizer import frame_metrics
+
+    fps = 25.0
+    rng = np.random.default_rng(1)
+    colors = [(220, 60, 60), (40, 110, 40), (60, 200, 230), (90, 90, 20), (40, 220, 220)]
+    starts = [0, 410, 833, 1190, 1602, 2350, 2777]
+    frames = np.empty((3000, 24, 32, 3), np.uint8)
+    for n in range(3000):
+        scene = sum(1 for s in starts if s <= n) - 1
+        frame = np.full((24, 32, 3), colors[scene % len(colors)], np.float32)
+        frame += rng.normal(0, 1.5, frame.shape)
+        if 1950 <= n < 2030:
+            frame *= abs(n - 1990) / 40
+        frames[n] = np.clip(frame, 0, 255)
+
+    analysed = []
+
+    def fake_compute(video_path, target_width=256, batch_frames=240, start=None, duration=None,
+                     sample_fps=None, fast_decode=False, info=None):
+        first = int(np.ceil((start or 0.0) * fps - 1e-9))
+        end = len(frames) if duration is None else min(len(frames), first + round(duration * fps))
+        indices = np.arange(first, end)
+        if sample_fps:
+            indices = np.round(np.arange(0, (end - first) / fps, 1 / sample_fps) * fps).astype(int) + first
+            indices = indices[indices < end]
+        if fast_decode:
+            # Keyframes every two seconds, as captures force them
+            indices -= indices % 50
+        analysed.append(len(np.unique(indices)))
+        acc = frame_metrics.MetricsAccumulator()
+        acc.add_batch(frames[indices])
+        return acc.result(sample_fps or fps)
+
+    info = {"width": 32, "height": 24, "fps": fps, "duration": len(frames) / fps}
+    detector = SceneDetector(engine="coarse_to_fine", min_scene_length=0.0)
+    with patch("digitizer.frame_metrics.probe_video", return_value=info), \
+            patch("digitizer.frame_metrics.compute_metrics", side_effect=fake_compute):
+        scenes = detector._detect_scenes("/input/video.mp4")
+
+    full = fake_compute("/input/video.mp4")
+    expected = detector.cuts_to_scenes(frame_metrics.detect_cuts(full, 22.0, 12), len(frames), fps)
+    assert len(expected) == 8
+    assert scenes == expected
+    # The coarse pass decodes only keyframes, and the windows around cuts and
+    # the fade a small share of the rest
+    assert analysed[0] == 60
+    assert sum(analysed[:-1]) < len(frames) / 4
+
+
+async def test_extract_thumbnails_real_frames(real_ffmpeg, detector, synthetic_video, tmp_path, monkeypatch):
+    """Every output gets the frame at its own timestamp, across process batches too."""
+    monkeypatch.setattr("digitizer.scene_detector.THUMBNAILS_PER_PROCESS", 2)
+    # synthetic_video colours (BGR) at each timestamp; the moving ramp averages to 0.8
+    expected = {
+        4.0: (220, 60, 60), 10.0: (40, 110, 40), 20.0: (60, 60, 230), 45.0: (100, 30, 100), 55.5: (200, 200, 200),
+    }
+    thumbnails = [(t, str(tmp_path / "thumbs" / f"scene_{i:03d}.jpg")) for i, t in enumerate(expected, 1)]
+
+    assert await detector._extract_thumbnails(synthetic_video, thumbnails)
+
+    for t, path in thumbnails:
+        image = cv2.imread(path)
+        assert image.shape == (120, 160, 3)
+        assert image.reshape(-1, 3).mean(axis=0) == pytest.approx(np.array(expected[t]) * 0.8, abs=12)
+
+
+@pytest.mark.parametrize("codec", ["mjpeg", "h264"])
+def test_coarse_to_fine_matches_pyscenedetect_on_real_video(real_ffmpeg, synthetic_video, tmp_path, codec):
+    """Seeking, ``-skip_frame`` and window timing against real decoding, B-frames included."""
+    import subprocess
+
+    video = synthetic_video
+    if codec == "h264":
+        video = str(tmp_path / "synthetic.mp4")
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", synthetic_video, "-c:v", "libx264", "-preset", "veryfast",
+             "-crf", "18", "-bf", "3", "-force_key_frames", "expr:gte(t,n_forced*2)", "-pix_fmt", "yuv420p",
+             video],
+            check=True,
+        )
+
+    from digitizer import frame_metrics
+
+    expected = SceneDetector(min_scene_length=0.0)._detect_scenes(video)
+    with patch("digitizer.frame_metrics.compute_metrics", wraps=frame_metrics.compute_metrics) as compute:
+        scenes = SceneDetector(engine="coarse_to_fine", min_scene_length=0.0)._detect_scenes(video)
+
+    assert len(expected) == 8
+    assert scenes == pytest.approx(expected, abs=1 / 25)
+    # Six cuts and a fade in a minute, yet most of it is never decoded at full rate
+    refined = sum(c.kwargs["duration"] for c in compute.call_args_list if not c.kwargs.get("sample_fps"))
+    assert refined < 20.0
+
+
+def live_frames() -> np.ndarray:
+    """25fps at 32x24: cuts at 4s, 4.8s (short scene, merged back) and 10s, fade out and in at 14-16s."""
+    colors = [(40, 40, 200), (230, 230, 230), (40, 200, 40), (200, 40, 200)]
+    bounds = [100, 120, 250, 500]
+    frames = np.empty((500, 24, 32, 3), np.uint8)
+    for n in range(500):
+        frames[n] = colors[sum(n >= b for b in bounds[:-1])]
+        if 350 <= n < 400:
+            frames[n] = (frames[n] * (abs(n - 375) / 25)).astype(np.uint8)
+    return frames
+
+
+async def test_live_detector_confirms_scenes_incrementally(tmp_path):
+    from digitizer.scene_detector import LiveSceneDetector
+
+    detector = SceneDetector(min_scene_length=1.0)
+    emitted = []
+
+    async def on_scene(scene):
+        emitted.append((scene["start_time"], scene["end_time"], live.frame_count))
+
+    live = LiveSceneDetector(detector, 32, 24, 25.0, on_scene=on_scene)
+    data = live_frames().tobytes()
+    step = 32 * 24 * 3 * 7 + 100  # misaligned with frame boundaries
+    for i in range(0, len(data), step):
+        await live.feed(data[i:i + step])
+
+    final = live.final_scenes()
+    assert final == [(0.0, 4.8), (4.8, 10.0), (10.0, 15.0), (15.0, 20.0)]
+    # Scenes were reported before the end of the stream and never revised
+    assert [(s, e) for s, e, _ in emitted] == final[:len(emitted)]
+    assert len(emitted) >= 2
+    assert emitted[0][2] < 500
+
+    with patch.object(detector, "_extract_thumbnails", new_callable=AsyncMock) as mock_thumb:
+        scenes = await live.finish("/input/video.mp4", str(tmp_path / "thumbs"))
+    mock_thumb.assert_awaited_once()
+    assert [s["id"] for s in scenes[:len(emitted)]] == [s["id"] for s in live.scenes]
+    assert scenes[-1]["thumbnail_path"].endswith("scene_004.jpg")
+
+
+async def test_live_detector_skips_dropped_frames():
+    from digitizer.scene_detector import LiveSceneDetector
+
+    frames = live_frames()
+    live = LiveSceneDetector(SceneDetector(min_scene_length=1.0), 32, 24, 25.0)
+    await live.feed(frames[:200].tobytes())
+    await live.skip(25)
+    await live.feed(frames[225:240].tobytes())
+    # The cut at 10s falls inside this gap: it lands on the first frame after
+    await live.skip(20)
+    await live.feed(frames[260:].tobytes())
+
+    assert live.frame_count == 500
+    assert live.final_scenes() == [(0.0, 4.8), (4.8, 10.4), (10.4, 15.0), (15.0, 20.0)]
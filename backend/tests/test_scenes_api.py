@@ -1,3 +1,4 @@
+import os
 import uuid
 from unittest.mock import AsyncMock, patch
 
@@ -63,6 +64,32 @@ async def test_analyze_starts_detection(client, vhs_job, app):
         assert len(scenes) == 2
 
 
+async def test_analyze_accepts_threshold_overrides(client, vhs_job, app):
+    from digitizer.scene_detector import SceneDetector
+
+    with patch.object(SceneDetector, "analyze", autospec=True) as mock_analyze:
+        mock_analyze.return_value = []
+        resp = await client.post(
+            f"/api/jobs/{vhs_job.id}/analyze",
+            json={"content_threshold": 35, "min_scene_length": 2.5},
+        )
+        assert resp.status_code == 202
+
+        import asyncio
+        await asyncio.sleep(0.1)
+
+    tuned = mock_analyze.call_args.args[0]
+    assert tuned.content_threshold == 35.0
+    assert tuned.min_scene_length == 2.5
+    assert app.state.scene_detector.content_threshold == 22.0
+    assert mock_analyze.call_args.kwargs["metrics_dir"].endswith(f"metrics/{vhs_job.id}")
+
+
+async def test_analyze_rejects_bad_threshold(client, vhs_job):
+    resp = await client.post(f"/api/jobs/{vhs_job.id}/analyze", json={"fade_threshold": "dark"})
+    assert resp.status_code == 400
+
+
 async def test_get_scenes_empty(client, vhs_job):
     resp = await client.get(f"/api/jobs/{vhs_job.id}/scenes")
     assert resp.status_code == 200
@@ -111,3 +138,157 @@ async def test_split_scenes(client, vhs_job, app):
         mock_split.return_value = ["/output/scene_001.mp4", "/output/scene_002.mp4"]
         resp = await client.post(f"/api/jobs/{vhs_job.id}/split")
         assert resp.status_code == 202
+
+
+async def test_split_reports_failed_scene_without_shifting_paths(client, vhs_job, app):
+    import asyncio
+
+    db = app.state.db
+    for i in range(3):
+        await db.create_scene(
+            scene_id=f"s{i + 1}", job_id=vhs_job.id, scene_index=i + 1,
+            start_time=i * 100.0, end_time=(i + 1) * 100.0, duration=100.0,
+        )
+    await db.update_settings(split_concurrency="3")
+
+    events = []
+    app.state.ws_manager.broadcast = AsyncMock(side_effect=events.append)
+    with patch.object(app.state.splitter, "split_changed", new_callable=AsyncMock) as mock_split:
+        mock_split.return_value = (
+            ["/output/scene_001.mp4", None, "/output/scene_003.mp4"],
+            ["k1", None, "k3"],
+        )
+        resp = await client.post(f"/api/jobs/{vhs_job.id}/split")
+        assert resp.status_code == 202
+        await asyncio.sleep(0.1)
+
+    assert mock_split.call_args.kwargs["concurrency"] == 3
+    scenes = {s["id"]: s for s in await db.list_scenes(vhs_job.id)}
+    assert scenes["s1"]["split_path"] == "/output/scene_001.mp4"
+    assert scenes["s1"]["split_key"] == "k1"
+    assert scenes["s2"]["split_path"] is None
+    assert scenes["s3"]["split_path"] == "/output/scene_003.mp4"
+    failed = [e["data"] for e in events if e["event"] == "split_scene_failed"]
+    assert [f["scene_index"] for f in failed] == [2]
+    complete = next(e["data"] for e in events if e["event"] == "split_complete")
+    assert complete["scene_count"] == 2
+    assert complete["failed_scenes"] == [2]
+
+
+async def test_snap_scenes_builds_index_once(client, vhs_job, app, tmp_path):
+    db = app.state.db
+    video = tmp_path / "capture.mp4"
+    video.write_bytes(b"\x00")
+    await db.update_job(vhs_job.id, output_path=str(video))
+    await db.create_scene(
+        scene_id="s1", job_id=vhs_job.id, scene_index=1,
+        start_time=0.0, end_time=60.9, duration=60.9,
+    )
+    await db.create_scene(
+        scene_id="s2", job_id=vhs_job.id, scene_index=2,
+        start_time=60.9, end_time=300.0, duration=239.1,
+    )
+    index = [{"pts_time": t, "pos": int(t * 1000), "packets": 60, "size": 500_000} for t in (0.0, 60.06, 62.062)]
+
+    with patch("digitizer.api.keyframes.build_index", new_callable=AsyncMock, return_value=index) as mock_build:
+        resp = await client.post(f"/api/jobs/{vhs_job.id}/scenes/snap")
+        assert resp.status_code == 200
+        assert [(s["start_time"], s["end_time"]) for s in resp.json()] == [(0.0, 60.06), (60.06, 300.0)]
+
+        resp = await client.get(f"/api/jobs/{vhs_job.id}/keyframes")
+        assert resp.json()["count"] == 3
+        mock_build.assert_awaited_once()
+
+    resp = await client.post(f"/api/jobs/{vhs_job.id}/scenes/snap", json={"mode": "sideways"})
+    assert resp.status_code == 400
+
+
+async def test_keyframes_rejects_multi_title_parent(client, app):
+    jm = app.state.job_manager
+    parent = await jm.create_job(disc_info={"title_count": 2, "main_title": 1, "duration": 100}, multi_title=True)
+    os.makedirs(parent.output_path)
+    await jm.mark_complete(parent.id, file_size=0)
+
+    with patch("digitizer.api.keyframes.build_index", new_callable=AsyncMock) as mock_build:
+        resp = await client.get(f"/api/jobs/{parent.id}/keyframes")
+    assert resp.status_code == 400
+    mock_build.assert_not_awaited()
+
+
+async def test_smart_split_passes_keyframe_index(client, vhs_job, app):
+    import asyncio
+
+    db = app.state.db
+    await db.create_scene(
+        scene_id="s1", job_id=vhs_job.id, scene_index=1,
+        start_time=0.0, end_time=150.0, duration=150.0,
+    )
+    await db.replace_keyframes(vhs_job.id, [
+        {"pts_time": t, "pos": 0, "packets": 60, "size": 1000} for t in (0.0, 2.0, 4.0)
+    ])
+    await db.update_settings(split_mode="smart", encoding_preset="medium", crf_quality=20)
+
+    with patch.object(app.state.splitter, "split_changed", new_callable=AsyncMock) as mock_split:
+        mock_split.return_value = (["/output/scene_001.mp4"], ["k1"])
+        resp = await client.post(f"/api/jobs/{vhs_job.id}/split")
+        assert resp.status_code == 202
+        await asyncio.sleep(0.1)
+
+    assert mock_split.call_args.kwargs["mode"] == "smart"
+    assert mock_split.call_args.kwargs["keyframes"] == [0.0, 2.0, 4.0]
+    # Edges are encoded with the capture's encoder settings
+    assert app.state.splitter.encoding_preset == "medium"
+    assert app.state.splitter.crf_quality == 20
+
+
+async def test_update_scenes_keeps_unchanged_rows(client, vhs_job, app):
+    db = app.state.db
+    for i, (start, end) in enumerate([(0.0, 100.0), (100.0, 200.0), (200.0, 300.0)]):
+        await db.create_scene(
+            scene_id=f"s{i + 1}", job_id=vhs_job.id, scene_index=i + 1,
+            start_time=start, end_time=end, duration=end - start,
+            split_path=f"/output/scene_{i + 1:03d}.mp4", split_key=f"k{i + 1}",
+        )
+
+    resp = await client.put(f"/api/jobs/{vhs_job.id}/scenes", json=[
+        {"scene_index": 1, "start_time": 0.0, "end_time": 120.0},
+        {"scene_index": 2, "start_time": 120.0, "end_time": 200.0},
+        {"scene_index": 3, "start_time": 200.0, "end_time": 300.0},
+    ])
+    assert resp.status_code == 200
+    scenes = resp.json()
+    assert [s["id"] == "s3" for s in scenes] == [False, False, True]
+    assert scenes[2]["split_key"] == "k3"
+    assert scenes[2]["split_path"] == "/output/scene_003.mp4"
+    assert {s["id"] for s in await db.list_scenes(vhs_job.id)} & {"s1", "s2"} == set()
+
+
+async def test_update_scenes_keeps_sub_millisecond_edits(client, vhs_job, app):
+    db = app.state.db
+    await db.create_scene(
+        scene_id="s1", job_id=vhs_job.id, scene_index=1,
+        start_time=0.0, end_time=10.0, duration=10.0, split_key="k1",
+    )
+    await db.create_scene(
+        scene_id="s2", job_id=vhs_job.id, scene_index=2,
+        start_time=10.0, end_time=20.0, duration=10.0, split_key="k2",
+    )
+
+    resp = await client.put(f"/api/jobs/{vhs_job.id}/scenes", json=[
+        {"scene_index": 1, "start_time": 0.0, "end_time": 10.0004},
+        {"scene_index": 2, "start_time": 10.0004, "end_time": 20.0},
+    ])
+    assert resp.status_code == 200
+
+    scenes = (await client.get(f"/api/jobs/{vhs_job.id}/scenes")).json()
+    assert [(s["start_time"], s["end_time"]) for s in scenes] == [(0.0, 10.0004), (10.0004, 20.0)]
+    assert {s["id"] for s in scenes} & {"s1", "s2"} == set()
+
+
+async def test_analyze_rejects_malformed_body(client, vhs_job):
+    resp = await client.post(
+        f"/api/jobs/{vhs_job.id}/analyze", content=b"{not json", headers={"content-type": "application/json"}
+    )
+    assert resp.status_code == 400
+    resp = await client.post(f"/api/jobs/{vhs_job.id}/analyze", json=[1, 2])
+    assert resp.status_code == 400
@@ -1,9 +1,10 @@
 import asyncio
+import os
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
-from digitizer.splitter import VideoSplitter
+from digitizer.splitter import VideoSplitter, frames_between
 
 
 @pytest.fixture
@@ -93,3 +94,389 @@ async def test_split_scene_failure(mock_exec, splitter):
         output_path="/output/scene_001.mp4",
     )
     assert result is False
+
+
+async def test_split_all_bounded_concurrency_in_order(splitter, tmp_path):
+    running = 0
+    peak = 0
+
+    async def fake_split(input_path, start_time, end_time, output_path):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        # Later scenes finish first
+        await asyncio.sleep(0.05 - start_time / 1000)
+        running -= 1
+        return start_time != 20.0
+
+    scenes = [
+        {"scene_index": i + 1, "start_time": i * 10.0, "end_time": (i + 1) * 10.0}
+        for i in range(5)
+    ]
+    progress_cb = AsyncMock()
+    with patch.object(splitter, "split_scene", side_effect=fake_split):
+        paths = await splitter.split_all(
+            input_path="/input/video.mp4",
+            scenes=scenes,
+            output_dir=str(tmp_path / "scenes"),
+            on_progress=progress_cb,
+            concurrency=2,
+        )
+
+    assert peak == 2
+    # Aligned with scenes; the failed scene is reported in place
+    assert len(paths) == 5
+    assert paths[2] is None
+    assert paths[4].endswith("scene_005.mp4")
+    assert [c.args[1] for c in progress_cb.call_args_list] == [1, 2, 3, 4, 5]
+    assert progress_cb.call_args_list[-1].args[0] == 100
+
+
+def test_build_split_command_seeks_before_input(splitter):
+    cmd = splitter.build_split_command("/input/video.mp4", 45.2, 120.5, "/output/scene_001.mp4")
+    assert cmd.index("-ss") < cmd.index("-i")
+    assert cmd[cmd.index("-t") + 1] == "75.300"
+
+
+def test_segment_boundaries_gaps_and_overlaps(splitter):
+    scenes = [
+        {"start_time": 0.0, "end_time": 10.0},
+        {"start_time": 10.0, "end_time": 25.0},
+        {"start_time": 30.0, "end_time": 40.0},
+    ]
+    # The 25-30s gap becomes a discarded segment of its own
+    assert splitter.segment_boundaries(scenes) == [10.0, 25.0, 30.0, 40.0]
+    scenes[2]["start_time"] = 20.0
+    assert splitter.segment_boundaries(scenes) is None
+
+
+def test_build_segment_command(splitter):
+    cmd = splitter.build_segment_command("/input/video.mp4", [10.0, 25.5], "/out/.segment_%03d.mp4")
+    assert cmd.count("-i") == 1
+    assert cmd[cmd.index("-f") + 1] == "segment"
+    assert cmd[cmd.index("-segment_times") + 1] == "10.000,25.500"
+    assert "-reset_timestamps" in cmd
+    assert cmd[-1] == "/out/.segment_%03d.mp4"
+
+
+async def test_split_all_segment_mode_single_pass(splitter, tmp_path):
+    output_dir = tmp_path / "scenes"
+    scenes = [
+        {"scene_index": 1, "start_time": 5.0, "end_time": 10.0},
+        {"scene_index": 2, "start_time": 10.0, "end_time": 25.0},
+        {"scene_index": 3, "start_time": 30.0, "end_time": 40.0},
+    ]
+
+    async def fake_exec(*cmd, **kwargs):
+        # Segments: 0-5 (gap), 5-10, 10-25, 25-30 (gap), 30-40, 40-end (trailing)
+        for n in range(6):
+            (output_dir / f".segment_{n:03d}.mp4").write_bytes(str(n).encode())
+        proc = AsyncMock()
+        stdout = asyncio.StreamReader()
+        stdout.feed_data(b"frame=10\nout_time_us=12000000\nprogress=continue\nout_time_us=45000000\nprogress=end\n")
+        stdout.feed_eof()
+        proc.stdout = stdout
+        proc.returncode = 0
+        return proc
+
+    progress_cb = AsyncMock()
+    with patch("digitizer.splitter.asyncio.create_subprocess_exec", side_effect=fake_exec) as mock_exec:
+        paths = await splitter.split_all(
+            input_path="/input/video.mp4",
+            scenes=scenes,
+            output_dir=str(output_dir),
+            on_progress=progress_cb,
+            mode="segment",
+            keyframes=[0.0, 5.0, 10.0, 25.0, 30.0, 40.0],
+        )
+
+    assert mock_exec.call_count == 1
+    assert [open(p).read() for p in paths] == ["1", "2", "4"]
+    assert [os.path.basename(p) for p in paths] == ["scene_001.mp4", "scene_002.mp4", "scene_003.mp4"]
+    assert sorted(os.listdir(output_dir)) == ["scene_001.mp4", "scene_002.mp4", "scene_003.mp4"]
+    assert [c.args for c in progress_cb.call_args_list] == [(33, 1), (66, 2), (100, 3)]
+
+
+async def test_split_all_segment_failure_falls_back(splitter, tmp_path):
+    scenes = [{"scene_index": 1, "start_time": 0.0, "end_time": 10.0}]
+    failed = AsyncMock()
+    failed.stdout = asyncio.StreamReader()
+    failed.stdout.feed_eof()
+    failed.returncode = 1
+    with patch("digitizer.splitter.asyncio.create_subprocess_exec", return_value=failed), \
+            patch.object(splitter, "split_scene", new_callable=AsyncMock, return_value=True) as mock_split:
+        paths = await splitter.split_all(
+            "/input/video.mp4", scenes, str(tmp_path), mode="segment", keyframes=[0.0, 10.0],
+        )
+    mock_split.assert_awaited_once()
+    assert paths == [os.path.join(str(tmp_path), "scene_001.mp4")]
+
+
+def test_segments_line_up(splitter):
+    keyframes = [0.0, 2.0, 4.0, 6.0, 8.0]
+    assert splitter.segments_line_up([2.0, 4.0, 6.0], keyframes)
+    # Cuts land on the next keyframe, so mid-GOP boundaries are fine as long as each gets its own
+    assert splitter.segments_line_up([1.5, 3.0, 9.0], keyframes)
+    # A scene shorter than the GOP: both of its edges cut at 4.0
+    assert not splitter.segments_line_up([2.0, 2.5, 3.0], keyframes)
+    # No keyframe left for a scene that still has to be written
+    assert not splitter.segments_line_up([8.5, 9.0], keyframes)
+
+
+async def test_split_all_segment_needs_aligned_keyframes(splitter, tmp_path):
+    scenes = [
+        {"scene_index": 1, "start_time": 0.0, "end_time": 10.0},
+        {"scene_index": 2, "start_time": 10.0, "end_time": 10.5},
+        {"scene_index": 3, "start_time": 10.5, "end_time": 20.0},
+    ]
+    for keyframes in (None, [0.0, 10.0, 20.0]):
+        with patch.object(splitter, "split_scene", new_callable=AsyncMock, return_value=True) as mock_split, \
+                patch.object(splitter, "_split_segments", new_callable=AsyncMock) as mock_segments:
+            await splitter.split_all("/input/video.mp4", scenes, str(tmp_path), mode="segment", keyframes=keyframes)
+        assert mock_split.await_count == 3
+        mock_segments.assert_not_awaited()
+
+
+async def test_segment_split_real_video(real_ffmpeg, splitter, tmp_path):
+    """Scene outputs line up with the scenes, including a discarded gap."""
+    import subprocess
+
+    from digitizer import keyframes
+
+    source = str(tmp_path / "source.mp4")
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=12:size=160x120:rate=25",
+         "-c:v", "libx264", "-preset", "ultrafast", "-g", "25", "-pix_fmt", "yuv420p", source],
+        check=True,
+    )
+    scenes = [
+        {"scene_index": 1, "start_time": 0.0, "end_time": 3.0},
+        {"scene_index": 2, "start_time": 3.0, "end_time": 7.0},
+        {"scene_index": 3, "start_time": 8.0, "end_time": 12.0},
+    ]
+    index = [kf["pts_time"] for kf in await keyframes.build_index(source)]
+    with patch.object(splitter, "split_scene", new_callable=AsyncMock) as mock_split:
+        paths = await splitter.split_all(source, scenes, str(tmp_path / "scenes"), mode="segment", keyframes=index)
+    mock_split.assert_not_awaited()
+
+    for scene, path in zip(scenes, paths):
+        duration = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        assert float(duration) == pytest.approx(scene["end_time"] - scene["start_time"], abs=0.05)
+
+
+def test_build_split_command_keeps_snapped_precision(splitter):
+    cmd = splitter.build_split_command("/input/video.mp4", 60.060011, 62.062, "/output/scene_002.mp4")
+    assert cmd[cmd.index("-ss") + 1] == "60.060011"
+
+
+def test_plan_smart_parts(splitter):
+    keyframes = [0.0, 2.0, 4.0, 6.0, 8.0]
+    assert splitter.plan_smart_parts(1.5, 6.5, keyframes) == [
+        ("encode", 1.5, 2.0),
+        ("copy", 2.0, 6.0),
+        ("encode", 6.0, 6.5),
+    ]
+    # Cuts already on keyframes are copied whole
+    assert splitter.plan_smart_parts(2.0, 6.0, keyframes) == [("copy", 2.0, 6.0)]
+    # Less than one whole GOP: re-encode it all
+    assert splitter.plan_smart_parts(2.5, 3.5, keyframes) == [("encode", 2.5, 3.5)]
+    assert splitter.plan_smart_parts(8.5, 9.0, keyframes) == [("encode", 8.5, 9.0)]
+
+
+def test_frames_between():
+    fps = 30000 / 1001
+    # Frames at 0.066733 + n / fps, as in a capture with B-frames
+    assert frames_between(0.066733, 2.068733, 0.066733, fps) == 60
+    assert frames_between(3.3, 4.070733, 0.066733, fps) == 23
+    assert frames_between(3.3033, 3.3034, 0.066733, fps) == 1
+    assert frames_between(5.0, 5.0, 0.066733, fps) == 0
+
+
+def test_build_part_commands(splitter):
+    copy = splitter.build_part_command("/input/video.mp4", "copy", 2.0, 100, "/tmp/part_1.ts")
+    assert copy[copy.index("-c:v") + 1] == "copy"
+    assert copy[copy.index("-frames:v") + 1] == "100"
+    assert "h264_mp4toannexb" in copy
+    encode = VideoSplitter(encoding_preset="veryfast", crf_quality=21).build_part_command(
+        "/input/video.mp4", "encode", 1.5, 13, "/tmp/part_0.ts",
+    )
+    assert "libx264" in encode
+    assert encode[encode.index("-preset") + 1] == "veryfast"
+    assert encode[encode.index("-crf") + 1] == "21"
+    # Video only, cut by frame count: audio is added in one piece when joining
+    assert "-t" not in encode
+    assert "0:a:0?" not in encode
+    concat = splitter.build_concat_command("/tmp/parts.txt", "/input/video.mp4", 1.5, 6.5, "/output/scene_001.mp4")
+    assert concat[concat.index("-f") + 1] == "concat"
+    assert concat[concat.index("-ss") + 1] == "1.500"
+    assert concat[concat.index("-t") + 1] == "5.000"
+    assert concat[concat.index("-map") + 1:concat.index("-map") + 4] == ["0:v:0", "-map", "1:a:0?"]
+
+
+async def test_split_scene_smart_encodes_only_edges(splitter, tmp_path):
+    commands = []
+    lists = []
+
+    async def fake_exec(*cmd, **kwargs):
+        commands.append(cmd)
+        if "concat" in cmd:
+            with open(cmd[cmd.index("-i") + 1]) as f:
+                lists.append(f.read())
+        proc = AsyncMock()
+        proc.returncode = 0
+        return proc
+
+    output_path = str(tmp_path / "scenes" / "scene_001.mp4")
+    with patch("digitizer.splitter.asyncio.create_subprocess_exec", side_effect=fake_exec):
+        assert await splitter.split_scene_smart(
+            "/input/video.mp4", 1.5, 6.5, output_path, [0.0, 2.0, 4.0, 6.0, 8.0], fps=25.0,
+        )
+
+    assert ["libx264" in c for c in commands[:3]] == [True, False, True]
+    assert [c[c.index("-frames:v") + 1] for c in commands[:3]] == ["12", "100", "13"]
+    assert commands[-1][-1] == output_path
+    assert lists[0].count("file '") == 3
+    # Intermediate parts are cleaned up
+    assert os.listdir(tmp_path / "scenes") == []
+
+
+def decode_gray(path: str) -> "np.ndarray":
+    import subprocess
+
+    import numpy as np
+
+    out = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", path, "-fps_mode", "passthrough",
+         "-f", "rawvideo", "-pix_fmt", "gray", "-s", "80x60", "-"],
+        capture_output=True, check=True,
+    ).stdout
+    return np.frombuffer(out, np.uint8).reshape(-1, 60, 80).astype(np.int16)
+
+
+async def test_smart_split_real_video(real_ffmpeg, tmp_path):
+    """Frame-accurate cuts that decode cleanly across the joins, with continuous audio."""
+    import subprocess
+
+    from digitizer import keyframes
+
+    source = str(tmp_path / "capture.mp4")
+    # Encoded like a capture: B-frames, forced keyframes and fragmented MP4
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc2=duration=10:size=160x120:rate=25",
+         "-f", "lavfi", "-i", "sine=frequency=440:duration=10",
+         "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-force_key_frames", "expr:gte(t,n_forced*2)",
+         "-c:a", "aac", "-movflags", "+frag_keyframe+empty_moov+default_base_moof", source],
+        check=True,
+    )
+    splitter = VideoSplitter(encoding_preset="veryfast", crf_quality=23)
+    index = [kf["pts_time"] for kf in await keyframes.build_index(source)]
+    scene = {"scene_index": 1, "start_time": 1.3, "end_time": 7.7}
+    (path,) = await splitter.split_all(source, [scene], str(tmp_path / "scenes"), mode="smart", keyframes=index)
+
+    errors = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", path, "-f", "null", "-"], capture_output=True, text=True, check=True,
+    ).stderr
+    assert errors == ""
+
+    def probe(entries, path, stream="v:0"):
+        return subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", stream, "-show_entries", entries, "-of", "csv=p=0", path],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+
+    # Frame times as used by -ss, relative to the start of the file
+    (offset,) = probe("format=start_time", source)
+    times = sorted(float(t.strip(",")) - float(offset) for t in probe("frame=pts_time", source))
+    first = next(i for i, t in enumerate(times) if t >= scene["start_time"])
+    end = next(i for i, t in enumerate(times) if t >= scene["end_time"])
+
+    original = decode_gray(source)
+    frames = decode_gray(path)
+    assert len(frames) == end - first
+    # Copied GOPs are identical and re-encoded edges close; one frame off is not
+    assert abs(frames - original[first:end]).mean(axis=(1, 2)).max() < 2
+    assert abs(frames[1:] - original[first:end - 1]).mean(axis=(1, 2)).min() > 2
+
+    (video,) = (float(d) for d in probe("stream=duration", path))
+    (audio,) = (float(d) for d in probe("stream=duration", path, stream="a:0"))
+    assert video == pytest.approx(6.4, abs=0.001)
+    assert audio == pytest.approx(video, abs=0.05)
+
+
+async def test_split_all_smart_requires_keyframes(splitter, tmp_path):
+    with pytest.raises(ValueError):
+        await splitter.split_all("/input/video.mp4", [], str(tmp_path), mode="smart")
+
+
+async def test_split_all_smart_needs_h264(splitter, tmp_path):
+    scenes = [{"scene_index": 1, "start_time": 1.5, "end_time": 6.5}]
+    info = {"codec": "mpeg2video", "width": 720, "height": 480, "fps": 25.0, "duration": 60.0}
+    with patch("digitizer.splitter.frame_metrics.probe_video", return_value=info), \
+            patch.object(splitter, "split_scene", new_callable=AsyncMock, return_value=True) as mock_split, \
+            patch.object(splitter, "split_scene_smart", new_callable=AsyncMock) as mock_smart:
+        await splitter.split_all("/input/video.mp4", scenes, str(tmp_path), mode="smart", keyframes=[0.0, 2.0])
+    mock_split.assert_awaited_once()
+    mock_smart.assert_not_awaited()
+
+
+async def test_split_changed_regenerates_only_changed_scenes(splitter, tmp_path):
+    from digitizer.splitter import source_fingerprint, split_key
+
+    source = tmp_path / "capture.mp4"
+    source.write_bytes(b"master")
+    output_dir = tmp_path / "scenes"
+    output_dir.mkdir()
+    fingerprint = source_fingerprint(str(source))
+
+    # Previous split: three scenes
+    old = {}
+    for idx, (start, end) in enumerate([(0.0, 10.0), (10.0, 20.0), (20.0, 30.0)], start=1):
+        path = output_dir / f"scene_{idx:03d}.mp4"
+        path.write_text(f"{start}-{end}")
+        old[idx] = (str(path), split_key(fingerprint, start, end, "per_scene"))
+    # The user dropped the cut at 10s and moved the one at 20s; old scene 3 is now scene 2
+    scenes = [
+        {"scene_index": 1, "start_time": 0.0, "end_time": 20.0},
+        {"scene_index": 2, "start_time": 20.0, "end_time": 30.0, "split_path": old[3][0], "split_key": old[3][1]},
+    ]
+
+    async def fake_split(input_path, start_time, end_time, output_path):
+        with open(output_path, "w") as f:
+            f.write(f"new {start_time}-{end_time}")
+        return True
+
+    with patch.object(splitter, "split_scene", side_effect=fake_split) as mock_split:
+        paths, keys = await splitter.split_changed(str(source), scenes, str(output_dir), mode="per_scene")
+
+    assert mock_split.await_count == 1
+    assert [open(p).read() for p in paths] == ["new 0.0-20.0", "20.0-30.0"]
+    assert keys[1] == old[3][1]
+    assert sorted(os.listdir(output_dir)) == ["scene_001.mp4", "scene_002.mp4"]
+
+
+async def test_split_changed_source_change_invalidates(splitter, tmp_path):
+    from digitizer.splitter import split_key
+
+    source = tmp_path / "capture.mp4"
+    source.write_bytes(b"master")
+    output = tmp_path / "scene_001.mp4"
+    output.write_text("old")
+    scenes = [{
+        "scene_index": 1, "start_time": 0.0, "end_time": 10.0,
+        "split_path": str(output), "split_key": split_key("1:1", 0.0, 10.0, "per_scene"),
+    }]
+    with patch.object(splitter, "split_scene", new_callable=AsyncMock, return_value=True) as mock_split:
+        await splitter.split_changed(str(source), scenes, str(tmp_path))
+    mock_split.assert_awaited_once()
+
+
+async def test_split_all_few_scenes_prefer_seeking(splitter, tmp_path):
+    scenes = [{"scene_index": 120, "start_time": 7000.0, "end_time": 7030.0}]
+    with patch.object(splitter, "split_scene", new_callable=AsyncMock, return_value=True) as mock_split, \
+            patch.object(splitter, "_split_segments", new_callable=AsyncMock) as mock_segments:
+        await splitter.split_all("/input/video.mp4", scenes, str(tmp_path), mode="segment")
+    mock_split.assert_awaited_once()
+    mock_segments.assert_not_awaited()
@@ -0,0 +1,262 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from digitizer.drive_monitor import DriveMonitor
+from digitizer.drives import Drive
+from digitizer.main import _rip_disc, create_app
+from digitizer.models import JobStatus
+from digitizer.ripper import DVDRipper
+from digitizer.titles import TitleSetQueue, TitleSetRip, select_titles
+
+LSDVD_OUTPUT = """Disc Title: SERIES_S1_D1
+Title: 01, Length: 00:44:10.100 Chapters: 06, Cells: 07, Audio streams: 02, Subpictures: 03
+Title: 02, Length: 00:43:58.500 Chapters: 06, Cells: 06, Audio streams: 02, Subpictures: 03
+Title: 03, Length: 00:45:02.000 Chapters: 06, Cells: 06, Audio streams: 02, Subpictures: 03
+Title: 04, Length: 00:00:12.000 Chapters: 01, Cells: 01, Audio streams: 01, Subpictures: 00
+Longest track: 03
+"""
+
+
+def disc_info():
+    return DriveMonitor("/dev/sr0").parse_lsdvd(LSDVD_OUTPUT)
+
+
+def test_select_titles_drops_short_titles():
+    assert [t["number"] for t in select_titles(disc_info(), 300)] == [1, 2, 3]
+    # Nothing long enough: fall back to the main title
+    assert [t["number"] for t in select_titles(disc_info(), 7200)] == [3]
+
+
+@patch("digitizer.ripper.asyncio.create_subprocess_exec")
+async def test_read_disc_mirrors_once_and_remuxes_titles_from_mirror(mock_exec, video_ts_dir, tmp_path):
+    import shutil
+
+    ripper = DVDRipper(drive_device=video_ts_dir)
+
+    async def fake_exec(*cmd, **kwargs):
+        proc = AsyncMock()
+        if cmd[0] == "dvdbackup":
+            shutil.copytree(video_ts_dir, os.path.join(cmd[cmd.index("-o") + 1], "SERIES"))
+            proc.wait = AsyncMock(return_value=0)
+            proc.returncode = 0
+            return proc
+
+        async def aiter():
+            return
+            yield
+
+        proc.stderr = aiter()
+        proc.wait = AsyncMock(return_value=0)
+        proc.returncode = 0
+        return proc
+
+    mock_exec.side_effect = fake_exec
+    disc_dir = await ripper.read_disc(str(tmp_path / "scratch"))
+
+    assert disc_dir == str(tmp_path / "scratch" / "SERIES")
+    assert "-M" in mock_exec.call_args.args
+
+    await ripper.remux_title(disc_dir, 60.0, str(tmp_path / "out" / "title_02.mp4"), title_number=2)
+    cmd = mock_exec.call_args.args
+    assert cmd[cmd.index("-f") + 1] == "dvdvideo"
+    assert cmd[cmd.index("-title") + 1] == "2"
+    assert cmd[cmd.index("-i") + 1] == disc_dir
+
+
+@pytest.fixture
+async def app(tmp_db_path, tmp_output_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("DIGITIZER_SCRATCH_PATH", "")
+    monkeypatch.setenv("DIGITIZER_REMUX_WORKERS", "2")
+    application = await create_app(
+        db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False
+    )
+    application.state.ws_manager.broadcast = AsyncMock()
+    await application.state.db.update_settings(rip_titles="all", min_title_length=300)
+    remuxes = asyncio.create_task(application.state.title_remuxes.run())
+    yield application
+    remuxes.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await remuxes
+    await application.state.db.close()
+
+
+class FakeRipper:
+    def __init__(self, tmp_path, fail_titles=()):
+        self.tmp_path = tmp_path
+        self.fail_titles = fail_titles
+        self.running = 0
+        self.max_running = 0
+        self.remuxed = []
+        self.read_disc = AsyncMock(side_effect=self._read_disc)
+        self.eject = AsyncMock(return_value=True)
+        self.rip = AsyncMock(return_value=True)
+
+    async def _read_disc(self, dest_dir):
+        os.makedirs(os.path.join(dest_dir, "DISC", "VIDEO_TS"))
+        return os.path.join(dest_dir, "DISC")
+
+    async def remux_title(self, source, duration, output_path, on_progress=None, title_number=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        self.remuxed.append(title_number)
+        if title_number in self.fail_titles:
+            return False
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "wb") as f:
+            f.write(b"x" * 100)
+        await on_progress(100)
+        return True
+
+
+async def test_all_titles_ripped_from_one_read(app, tmp_path):
+    ripper = FakeRipper(tmp_path)
+    drive = Drive("sr0", "/dev/sr0", monitor=DriveMonitor("/dev/sr0"), ripper=ripper)
+
+    await _rip_disc(app, drive, disc_info())
+
+    ripper.read_disc.assert_awaited_once()
+    ripper.rip.assert_not_called()
+    assert sorted(ripper.remuxed) == [1, 2, 3]
+    assert ripper.max_running == 2
+    ripper.eject.assert_awaited_once()
+
+    jm = app.state.job_manager
+    jobs = await jm.list_jobs()
+    parent = next(j for j in jobs if j.parent_id is None)
+    children = await jm.list_jobs(parent_id=parent.id)
+    assert parent.status == JobStatus.COMPLETE
+    assert parent.file_size == 300
+    assert set(parent.stage_timings) == {"read", "remux"}
+    assert sorted(c.output_path for c in children) == [
+        f"{parent.output_path}/title_{n:02d}.mp4" for n in (1, 2, 3)
+    ]
+    assert all(c.status == JobStatus.COMPLETE for c in children)
+    assert not os.path.exists(ripper.read_disc.call_args.args[0])  # scratch mirror removed
+
+    disc = await app.state.db.get_disc(disc_info()["fingerprint"])
+    assert disc["job_id"] == parent.id
+    assert set(disc["titles"]) == {1, 2, 3}
+
+    # Children do not take up rip sequence numbers
+    next_job = await jm.create_job(disc_info={})
+    assert next_job.output_path.endswith("_rip_002.mp4")
+
+
+async def test_only_failed_titles_are_ripped_again(app, tmp_path):
+    drive = Drive("sr0", "/dev/sr0", monitor=DriveMonitor("/dev/sr0"), ripper=FakeRipper(tmp_path, fail_titles=(2,)))
+    await _rip_disc(app, drive, disc_info())
+
+    jm = app.state.job_manager
+    parent = next(j for j in await jm.list_jobs() if j.parent_id is None)
+    assert parent.status == JobStatus.FAILED
+    assert parent.error == "1 of 3 titles failed"
+
+    retry = FakeRipper(tmp_path)
+    drive.ripper = retry
+    await _rip_disc(app, drive, disc_info())
+
+    assert retry.remuxed == [2]
+    disc = await app.state.db.get_disc(disc_info()["fingerprint"])
+    retried = await jm.get_job(disc["titles"][2])
+    assert retried.status == JobStatus.COMPLETE
+
+
+async def test_failed_read_fails_every_job(app, tmp_path):
+    ripper = FakeRipper(tmp_path)
+    ripper.read_disc = AsyncMock(return_value=None)
+    drive = Drive("sr0", "/dev/sr0", monitor=DriveMonitor("/dev/sr0"), ripper=ripper)
+
+    await _rip_disc(app, drive, disc_info())
+
+    jobs = await app.state.job_manager.list_jobs()
+    assert len(jobs) == 4
+    assert all(j.status == JobStatus.FAILED for j in jobs)
+    assert ripper.remuxed == []
+    ripper.eject.assert_not_called()
+
+
+class StubTitleSet:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+        self.release = asyncio.Event()
+
+    async def remux(self, parent, children, disc_dir):
+        self.log.append(("start", self.name))
+        await self.release.wait()
+        self.log.append(("end", self.name))
+
+    async def fail_unfinished(self, parent, children, error):
+        self.log.append(("failed", self.name, error))
+
+
+async def test_title_set_queue_remuxes_one_disc_at_a_time_and_bounds_waiting():
+    log = []
+    queue = TitleSetQueue(max_queued=1)
+    worker = asyncio.create_task(queue.run())
+    first, second, third = (StubTitleSet(name, log) for name in ("first", "second", "third"))
+    try:
+        first_done = await queue.put(first, None, [], "/scratch/first")
+        await asyncio.sleep(0)
+        await queue.put(second, None, [], "/scratch/second")
+        # Queue full: the third disc waits in its drive
+        third_put = asyncio.create_task(queue.put(third, None, [], "/scratch/third"))
+        await asyncio.sleep(0.05)
+        assert not third_put.done()
+        assert log == [("start", "first")]
+        assert queue.busy
+
+        first.release.set()
+        await asyncio.wait_for(first_done.wait(), timeout=1)
+        await asyncio.wait_for(third_put, timeout=1)
+        assert log == [("start", "first"), ("end", "first"), ("start", "second")]
+    finally:
+        worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await worker
+
+    # Shutdown fails the running and the queued disc
+    assert log[3:] == [("failed", "second", "Remux interrupted"), ("failed", "third", "Remux interrupted")]
+    assert not queue.busy
+
+
+async def test_cancelled_title_set_remux_fails_unfinished_jobs(app, tmp_path):
+    jm = app.state.job_manager
+    ripper = FakeRipper(tmp_path)
+    gate = asyncio.Event()
+    original = ripper.remux_title
+
+    async def remux_title(source, duration, output_path, on_progress=None, title_number=None):
+        if title_number != 1:
+            await gate.wait()
+        return await original(source, duration, output_path, on_progress, title_number)
+
+    ripper.remux_title = remux_title
+    info = disc_info()
+    parent = await jm.create_job(disc_info=info, multi_title=True)
+    children = [await jm.create_title_job(parent, t) for t in select_titles(info, 300)]
+    rip = TitleSetRip(ripper, jm, app.state.ws_manager, scratch_dir=str(tmp_path / "scratch"), concurrency=3)
+    disc_dir = await rip.read(parent, children)
+
+    queue = TitleSetQueue()
+    worker = asyncio.create_task(queue.run())
+    await queue.put(rip, parent, children, disc_dir)
+    for _ in range(100):
+        if (await jm.get_job(children[0].id)).status == JobStatus.COMPLETE:
+            break
+        await asyncio.sleep(0.01)
+    worker.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await worker
+
+    assert (await jm.get_job(children[0].id)).status == JobStatus.COMPLETE
+    for job in (parent, *children[1:]):
+        stopped = await jm.get_job(job.id)
+        assert stopped.status == JobStatus.FAILED
+        assert stopped.error == "Remux interrupted"
+    assert not os.path.exists(tmp_path / "scratch")
@@ -0,0 +1,296 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from digitizer import transcoder
+from digitizer.db import Database
+from digitizer.jobs import JobManager
+from digitizer.main import create_app
+from digitizer.transcoder import TranscodeQueue, build_transcode_command, original_path, transcode_path
+
+
+@pytest.fixture
+async def db(tmp_db_path):
+    database = Database(tmp_db_path)
+    await database.init()
+    yield database
+    await database.close()
+
+
+@pytest.fixture
+def job_manager(db, tmp_path):
+    return JobManager(db=db, vhs_output_base=str(tmp_path / "vhs"))
+
+
+@pytest.fixture
+def queue(job_manager):
+    return TranscodeQueue(job_manager, AsyncMock(), is_busy=lambda: False)
+
+
+async def captured_job(job_manager, size=4096):
+    job = await job_manager.create_job(disc_info={}, source_type="vhs")
+    os.makedirs(os.path.dirname(job.output_path), exist_ok=True)
+    with open(job.output_path, "wb") as f:
+        f.write(b"c" * size)
+    await job_manager.mark_complete(job.id, file_size=size)
+    return job
+
+
+def fake_ffmpeg(size: int, returncode: int = 0):
+    """A create_subprocess_exec writing ``size`` bytes to the command's output file."""
+    async def fake_exec(*cmd, **kwargs):
+        with open(cmd[-1], "wb") as f:
+            f.write(b"t" * size)
+        proc = AsyncMock()
+        proc.pid = None
+        proc.stdout = asyncio.StreamReader()
+        proc.stdout.feed_data(b"out_time_us=5000000\nspeed=3.1x\nprogress=end\n")
+        proc.stdout.feed_eof()
+        proc.stderr = asyncio.StreamReader()
+        proc.stderr.feed_data(b"Conversion failed!\n" if returncode else b"")
+        proc.stderr.feed_eof()
+        proc.returncode = returncode
+        return proc
+
+    return fake_exec
+
+
+def test_build_transcode_command():
+    cmd = build_transcode_command(
+        "/out/cap.mp4", "/out/cap.transcode.mp4", preset="veryslow", crf=21, deinterlace=True, denoise=True,
+    )
+    assert cmd[cmd.index("-i") + 1] == "/out/cap.mp4"
+    assert cmd[cmd.index("-vf") + 1] == "yadif,hqdn3d"
+    assert cmd[cmd.index("-preset") + 1] == "veryslow"
+    assert cmd[cmd.index("-crf") + 1] == "21"
+    assert cmd[cmd.index("-force_key_frames") + 1] == "expr:gte(t,n_forced*2)"
+    assert cmd[cmd.index("-c:a") + 1] == "copy"
+    assert cmd[-1] == "/out/cap.transcode.mp4"
+    assert cmd[cmd.index("-movflags") + 1] == "+faststart"
+    assert "-vf" not in build_transcode_command("/out/cap.mp4", "/out/cap.transcode.mp4")
+    fragmented = build_transcode_command("/out/cap.mp4", "/out/cap.transcode.mp4", fragmented=True)
+    assert fragmented[fragmented.index("-movflags") + 1] == "+frag_keyframe+empty_moov+default_base_moof"
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_transcode_replaces_capture(mock_exec, queue, job_manager, db):
+    job = await captured_job(job_manager)
+    await db.replace_keyframes(job.id, [{"pts_time": 0.0, "pos": 0, "packets": 60, "size": 4096}])
+    mock_exec.side_effect = fake_ffmpeg(1024)
+
+    await queue.transcode(job.id)
+
+    with open(job.output_path, "rb") as f:
+        assert f.read() == b"t" * 1024
+    assert not os.path.exists(transcode_path(job.output_path))
+    done = await job_manager.get_job(job.id)
+    assert done.transcode_status == "transcoded"
+    assert done.file_size == 1024
+    assert done.transcode["original_size"] == 4096
+    assert done.transcode["saved"] == 3072
+    assert done.transcode["preset"] == "slow"
+    assert done.transcode["original_path"] is None
+    assert "transcode" in done.stage_timings
+    assert await db.list_keyframes(job.id) == []
+    events = [c.args[0]["event"] for c in queue.ws_manager.broadcast.await_args_list]
+    assert events == ["transcode_started", "transcode_progress", "transcode_complete"]
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_transcode_keeps_original(mock_exec, queue, job_manager, db):
+    job = await captured_job(job_manager)
+    await db.update_settings(transcode_keep_original=True, transcode_deinterlace=True)
+    mock_exec.side_effect = fake_ffmpeg(1024)
+
+    await queue.transcode(job.id)
+
+    kept = original_path(job.output_path)
+    with open(kept, "rb") as f:
+        assert f.read() == b"c" * 4096
+    done = await job_manager.get_job(job.id)
+    assert done.transcode["original_path"] == kept
+    assert done.transcode["deinterlace"] is True
+    assert "-vf" in mock_exec.call_args.args
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_failed_swap_removes_new_encode(mock_exec, queue, job_manager, db, monkeypatch):
+    job = await captured_job(job_manager)
+    await db.update_settings(transcode_keep_original=True)
+    mock_exec.side_effect = fake_ffmpeg(1024)
+
+    def no_hard_links(src, dst):
+        raise OSError("Operation not permitted")
+
+    monkeypatch.setattr(transcoder.os, "link", no_hard_links)
+    with pytest.raises(OSError):
+        await queue.transcode(job.id)
+
+    assert os.path.getsize(job.output_path) == 4096
+    assert not os.path.exists(transcode_path(job.output_path))
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_transcode_never_grows_capture(mock_exec, queue, job_manager):
+    job = await captured_job(job_manager)
+    mock_exec.side_effect = fake_ffmpeg(8192)
+
+    await queue.transcode(job.id)
+
+    assert os.path.getsize(job.output_path) == 4096
+    assert not os.path.exists(transcode_path(job.output_path))
+    done = await job_manager.get_job(job.id)
+    assert done.transcode["replaced"] is False
+    assert done.transcode["saved"] == 0
+    assert done.file_size == 4096
+
+
+@patch("digitizer.ffmpeg_runner.asyncio.create_subprocess_exec")
+async def test_failed_transcode_leaves_capture(mock_exec, queue, job_manager):
+    job = await captured_job(job_manager)
+    mock_exec.side_effect = fake_ffmpeg(100, returncode=1)
+
+    await queue.transcode(job.id)
+
+    assert os.path.getsize(job.output_path) == 4096
+    assert not os.path.exists(transcode_path(job.output_path))
+    assert (await job_manager.get_job(job.id)).transcode_status == "failed"
+    failed = queue.ws_manager.broadcast.await_args_list[-1].args[0]
+    assert failed["event"] == "transcode_failed"
+    assert "Conversion failed!" in failed["data"]["error"]
+
+
+class FakeRunner:
+    def __init__(self):
+        self.paused = False
+        self.calls = []
+
+    def pause(self):
+        self.paused = True
+        self.calls.append("pause")
+
+    def resume(self):
+        self.paused = False
+        self.calls.append("resume")
+
+
+async def test_encode_is_held_while_busy(monkeypatch, job_manager):
+    monkeypatch.setattr(transcoder, "BUSY_POLL", 0.01)
+    # Still busy when the encode ends: it is resumed so it can exit
+    busy = [False, True, True, True, False, False, True]
+    queue = TranscodeQueue(job_manager, AsyncMock(), is_busy=lambda: busy.pop(0) if busy else True)
+    runner = FakeRunner()
+
+    holder = asyncio.create_task(queue._hold_while_busy(runner, "job"))
+    await asyncio.sleep(0.2)
+    holder.cancel()
+    paused_seconds = await holder
+
+    assert runner.calls == ["pause", "resume", "pause", "resume"]
+    assert paused_seconds > 0
+    events = [c.args[0]["event"] for c in queue.ws_manager.broadcast.await_args_list]
+    assert events == ["transcode_paused", "transcode_resumed", "transcode_paused"]
+
+
+async def test_queue_waits_for_idle(monkeypatch, job_manager):
+    monkeypatch.setattr(transcoder, "BUSY_POLL", 0.01)
+    busy = [True, True, True]
+    queue = TranscodeQueue(job_manager, AsyncMock(), is_busy=lambda: bool(busy) and busy.pop())
+    await queue._wait_until_idle()
+    assert busy == []
+
+
+async def test_recover_requeues_unfinished(queue, job_manager):
+    queued = await captured_job(job_manager)
+    running = await captured_job(job_manager)
+    untouched = await captured_job(job_manager)
+    await queue.db.update_job(queued.id, transcode_status="queued")
+    await queue.db.update_job(running.id, transcode_status="transcoding")
+    with open(transcode_path(running.output_path), "wb") as f:
+        f.write(b"partial")
+
+    await queue.recover()
+
+    assert sorted([queue.queue.get_nowait(), queue.queue.get_nowait()]) == sorted([queued.id, running.id])
+    assert queue.queue.empty()
+    assert not os.path.exists(transcode_path(running.output_path))
+    assert (await job_manager.get_job(untouched.id)).transcode_status is None
+
+
+@pytest.fixture
+async def app(tmp_db_path, tmp_output_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("DIGITIZER_VHS_OUTPUT_PATH", str(tmp_path / "vhs"))
+    application = await create_app(db_path=tmp_db_path, output_base=tmp_output_dir, start_monitor=False)
+    application.state.ws_manager.broadcast = AsyncMock()
+    yield application
+    await application.state.db.close()
+
+
+@pytest.fixture
+async def client(app):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def test_transcode_endpoint_queues_job(client, app):
+    jm = app.state.job_manager
+    job = await captured_job(jm)
+    ripping = await jm.create_job(disc_info={}, source_type="vhs")
+    await jm.mark_ripping(ripping.id)
+
+    resp = await client.post(f"/api/jobs/{job.id}/transcode")
+    assert resp.status_code == 202
+    assert app.state.transcoder.queue.get_nowait() == job.id
+    assert (await client.get(f"/api/jobs/{job.id}")).json()["transcode_status"] == "queued"
+    assert (await client.post(f"/api/jobs/{job.id}/transcode")).status_code == 409
+    assert (await client.post(f"/api/jobs/{ripping.id}/transcode")).status_code == 400
+    assert (await client.post("/api/jobs/nope/transcode")).status_code == 404
+
+
+async def test_capture_queued_for_transcode_when_enabled(client, app):
+    await client.put("/api/settings", json={"transcode_after_capture": True})
+    with patch.object(app.state.vhs_capture, "start", new_callable=AsyncMock, return_value=True):
+        job_id = (await client.post("/api/capture/start")).json()["job_id"]
+        for _ in range(100):
+            job = (await client.get(f"/api/jobs/{job_id}")).json()
+            if job["transcode_status"] == "queued":
+                break
+            await asyncio.sleep(0.01)
+
+    assert job["status"] == "complete"
+    assert job["transcode_status"] == "queued"
+    assert app.state.transcoder.queue.get_nowait() == job_id
+
+
+async def test_transcoder_waits_for_capture(app):
+    from digitizer.main import _node_busy
+
+    assert not _node_busy(app)
+    app.state.vhs_capture._recording = True
+    assert _node_busy(app)
+    app.state.vhs_capture._recording = False
+
+
+async def test_transcoder_waits_for_background_remuxes(app, tmp_path):
+    from digitizer.drive_monitor import DriveMonitor
+    from digitizer.drives import Drive
+    from digitizer.main import _node_busy
+    from digitizer.pipeline import RipPipeline
+    from digitizer.ripper import DVDRipper
+
+    ripper = DVDRipper("/dev/sr0")
+    pipeline = RipPipeline(ripper, app.state.job_manager, AsyncMock(), scratch_dir=str(tmp_path))
+    app.state.drives = {"sr0": Drive("sr0", "/dev/sr0", DriveMonitor("/dev/sr0"), ripper, pipeline=pipeline)}
+    assert not _node_busy(app)
+    pipeline.queue.put_nowait("queued remux")
+    assert _node_busy(app)
+    pipeline.queue.get_nowait()
+
+    app.state.title_remuxes.queue.put_nowait("queued disc")
+    assert _node_busy(app)
+    app.state.title_remuxes.queue.get_nowait()
+    assert not _node_busy(app)
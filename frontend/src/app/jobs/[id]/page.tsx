@@ -4,7 +4,7 @@ import { useEffect, useState } from "react";
 import { useParams, useRouter } from "next/navigation";
 import Link from "next/link";
 import { Job } from "@/lib/types";
-import { getJob, deleteJob, analyzeScenes } from "@/lib/api";
+import { getJob, deleteJob, analyzeScenes, transcodeJob } from "@/lib/api";
 import { useDigitizer } from "@/context/digitizer-context";
 import StatusBadge from "@/components/status-badge";
 import {
@@ -14,6 +14,15 @@ import {
   filenameFromPath,
 } from "@/lib/utils";
 
+const STOP_REASONS: Record<string, string> = {
+  manual: "By hand",
+  failed: "Capture failed",
+  interrupted: "Interrupted",
+  no_signal: "End of tape (no signal)",
+  blue_screen: "End of tape (blue screen)",
+  static: "End of tape (static)",
+};
+
 export default function JobDetailPage() {
   const params = useParams();
   const router = useRouter();
@@ -42,6 +51,16 @@ export default function JobDetailPage() {
     }
   }, [analysisProgress, analyzingLocal, job]);
 
+  const handleTranscode = async () => {
+    if (!job) return;
+    try {
+      await transcodeJob(job.id);
+      setJob({ ...job, transcode_status: "queued" });
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Could not queue re-encode");
+    }
+  };
+
   const handleAnalyze = async () => {
     if (!job) return;
     setAnalyzingLocal(true);
@@ -136,6 +155,12 @@ export default function JobDetailPage() {
             value={job.output_path || "-"}
             mono
           />
+          {job.master_path && (
+            <Field label="Archival Master" value={job.master_path} mono />
+          )}
+          {job.stop_reason && (
+            <Field label="Stopped" value={STOP_REASONS[job.stop_reason] ?? job.stop_reason} />
+          )}
         </div>
 
         {job.error && (
@@ -150,6 +175,38 @@ export default function JobDetailPage() {
         )}
       </div>
 
+      {/* Re-encode Section - VHS jobs only */}
+      {job.source_type === "vhs" && job.status === "complete" && (
+        <div className="rounded-lg border border-[var(--border)] bg-[var(--surface)] p-6">
+          <div className="text-xs uppercase tracking-wider text-[var(--muted)] mb-2">
+            Re-encode
+          </div>
+          <div className="flex items-center justify-between">
+            <span className="text-sm text-[var(--muted)]">
+              {job.transcode_status === "queued" && "Waiting for the machine to be idle..."}
+              {job.transcode_status === "transcoding" && "Re-encoding at low priority..."}
+              {job.transcode_status === "failed" && "Re-encode failed; the capture is unchanged"}
+              {job.transcode_status === "transcoded" &&
+                job.transcode &&
+                (job.transcode.replaced
+                  ? `Saved ${formatBytes(job.transcode.saved)} (${formatBytes(
+                      job.transcode.original_size
+                    )} to ${formatBytes(job.transcode.size)}) with the ${job.transcode.preset} preset`
+                  : "The re-encode was no smaller; the capture was kept as recorded")}
+              {!job.transcode_status && "Shrink this capture with a slower encoder preset"}
+            </span>
+            {job.transcode_status !== "queued" && job.transcode_status !== "transcoding" && (
+              <button
+                onClick={handleTranscode}
+                className="px-4 py-2 text-sm rounded border border-[var(--border)] text-white hover:bg-[var(--background)] transition-colors"
+              >
+                Re-encode
+              </button>
+            )}
+          </div>
+        </div>
+      )}
+
       {/* Scene Analysis Section - VHS jobs only */}
       {job.source_type === "vhs" && job.status === "complete" && (
         <div className="rounded-lg border border-purple-500/20 bg-[var(--surface)] p-6 space-y-4">
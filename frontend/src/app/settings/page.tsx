@@ -1,22 +1,63 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { Settings } from "@/lib/types";
-import { getSettings, updateSettings } from "@/lib/api";
+import { Calibration, Settings } from "@/lib/types";
+import { getCalibration, getSettings, startCalibration, updateSettings } from "@/lib/api";
+
+const X264_PRESETS = [
+  "ultrafast",
+  "superfast",
+  "veryfast",
+  "faster",
+  "fast",
+  "medium",
+  "slow",
+  "slower",
+  "veryslow",
+];
 
 export default function SettingsPage() {
   const [settings, setSettings] = useState<Settings | null>(null);
   const [loading, setLoading] = useState(true);
   const [saving, setSaving] = useState(false);
   const [saved, setSaved] = useState(false);
+  const [calibration, setCalibration] = useState<Calibration | null>(null);
+  const [calibrating, setCalibrating] = useState(false);
 
   useEffect(() => {
     getSettings()
       .then(setSettings)
       .catch(() => {})
       .finally(() => setLoading(false));
+    getCalibration()
+      .then(setCalibration)
+      .catch(() => {});
   }, []);
 
+  const handleCalibrate = async () => {
+    setCalibrating(true);
+    const previous = calibration?.calibrated_at;
+    try {
+      await startCalibration(0.25, true);
+      // Each preset takes a few seconds; poll until a new result is stored
+      for (let i = 0; i < 120; i++) {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        const latest = await getCalibration().catch(() => null);
+        if (latest && latest.calibrated_at !== previous) {
+          setCalibration(latest);
+          if (latest.applied && latest.recommended && settings) {
+            setSettings({ ...settings, encoding_preset: latest.recommended });
+          }
+          break;
+        }
+      }
+    } catch {
+      // ignore - already calibrating or recording
+    } finally {
+      setCalibrating(false);
+    }
+  };
+
   const handleSave = async () => {
     if (!settings) return;
     setSaving(true);
@@ -115,6 +156,66 @@ export default function SettingsPage() {
             />
           </button>
         </div>
+
+        <div>
+          <label className="block text-xs uppercase tracking-wider text-[var(--muted)] mb-2">
+            Titles to Rip
+          </label>
+          <select
+            value={settings.rip_titles ?? "main"}
+            onChange={(e) =>
+              setSettings({ ...settings, rip_titles: e.target.value })
+            }
+            className="w-full px-3 py-2 rounded border border-[var(--border)] bg-[var(--background)] text-white text-sm focus:outline-none focus:border-[var(--accent)] transition-colors"
+          >
+            <option value="main">Main title only</option>
+            <option value="all">All titles (TV series)</option>
+          </select>
+          <p className="mt-1 text-xs text-[var(--muted)]">
+            All titles reads the disc once and saves each title as its own file
+          </p>
+        </div>
+
+        <div>
+          <label className="block text-xs uppercase tracking-wider text-[var(--muted)] mb-2">
+            Minimum Title Length
+          </label>
+          <select
+            value={settings.min_title_length ?? 300}
+            onChange={(e) =>
+              setSettings({ ...settings, min_title_length: Number(e.target.value) })
+            }
+            className="w-full px-3 py-2 rounded border border-[var(--border)] bg-[var(--background)] text-white text-sm focus:outline-none focus:border-[var(--accent)] transition-colors"
+          >
+            <option value={60}>1 minute</option>
+            <option value={300}>5 minutes</option>
+            <option value={600}>10 minutes</option>
+            <option value={1200}>20 minutes</option>
+          </select>
+          <p className="mt-1 text-xs text-[var(--muted)]">
+            Shorter titles (menus, trailers) are skipped when ripping all titles
+          </p>
+        </div>
+
+        <div>
+          <label className="block text-xs uppercase tracking-wider text-[var(--muted)] mb-2">
+            Known Discs
+          </label>
+          <select
+            value={settings.duplicate_discs ?? "missing"}
+            onChange={(e) =>
+              setSettings({ ...settings, duplicate_discs: e.target.value })
+            }
+            className="w-full px-3 py-2 rounded border border-[var(--border)] bg-[var(--background)] text-white text-sm focus:outline-none focus:border-[var(--accent)] transition-colors"
+          >
+            <option value="missing">Rip only missing titles</option>
+            <option value="skip">Skip</option>
+            <option value="always">Rip again</option>
+          </select>
+          <p className="mt-1 text-xs text-[var(--muted)]">
+            What to do when a disc that was already archived is inserted again
+          </p>
+        </div>
       </div>
 
       <div className="rounded-lg border border-[var(--border)] bg-[var(--surface)] p-6 space-y-6">
@@ -147,13 +248,33 @@ export default function SettingsPage() {
             }
             className="w-full px-3 py-2 rounded border border-[var(--border)] bg-[var(--background)] text-white text-sm focus:outline-none focus:border-[var(--accent)] transition-colors"
           >
-            <option value="fast">Fast</option>
-            <option value="medium">Medium</option>
-            <option value="slow">Slow</option>
+            {X264_PRESETS.map((preset) => (
+              <option key={preset} value={preset}>
+                {preset.charAt(0).toUpperCase() + preset.slice(1)}
+              </option>
+            ))}
           </select>
           <p className="mt-1 text-xs text-[var(--muted)]">
             Faster presets encode quicker but produce larger files
           </p>
+          <div className="mt-3 flex items-center justify-between gap-4">
+            <p className="text-xs text-[var(--muted)]">
+              {calibration
+                ? calibration.recommended
+                  ? `Calibrated: ${calibration.recommended} keeps ${Math.round(
+                      calibration.margin * 100
+                    )}% headroom over real time`
+                  : "Calibrated: no preset keeps up with real time on this machine"
+                : "Benchmark this machine to pick the slowest preset that keeps up"}
+            </p>
+            <button
+              onClick={handleCalibrate}
+              disabled={calibrating}
+              className="shrink-0 px-3 py-1.5 rounded text-xs font-semibold border border-[var(--border)] text-white hover:border-[var(--accent)] disabled:opacity-50 transition-colors"
+            >
+              {calibrating ? "Calibrating..." : "Calibrate"}
+            </button>
+          </div>
         </div>
 
         <div>
@@ -192,6 +313,237 @@ export default function SettingsPage() {
             <option value="256k">256 kbps</option>
           </select>
         </div>
+
+        <div className="flex items-center justify-between">
+          <div>
+            <div className="text-xs uppercase tracking-wider text-[var(--muted)]">
+              Live Preview
+            </div>
+            <p className="text-xs text-[var(--muted)] mt-0.5">
+              Show the picture once a second while recording to check tracking
+            </p>
+          </div>
+          <button
+            onClick={() =>
+              setSettings({ ...settings, live_preview: !(settings.live_preview ?? true) })
+            }
+            className={`relative w-11 h-6 rounded-full transition-colors ${
+              settings.live_preview ?? true
+                ? "bg-[var(--accent)]"
+                : "bg-[var(--border)]"
+            }`}
+          >
+            <span
+              className={`absolute top-0.5 w-5 h-5 rounded-full bg-white transition-transform ${
+                settings.live_preview ?? true ? "left-[22px]" : "left-0.5"
+              }`}
+            />
+          </button>
+        </div>
+
+        <div>
+          <label className="block text-xs uppercase tracking-wider text-[var(--muted)] mb-2">
+            End of Tape
+          </label>
+          <select
+            value={settings.end_of_tape ?? "off"}
+            onChange={(e) =>
+              setSettings({ ...settings, end_of_tape: e.target.value })
+            }
+            className="w-full px-3 py-2 rounded border border-[var(--border)] bg-[var(--background)] text-white text-sm focus:outline-none focus:border-[var(--accent)] transition-colors"
+          >
+            <option value="off">Keep recording</option>
+            <option value="stop">Stop recording</option>
+            <option value="trim">Stop and trim the tail</option>
+          </select>
+          {(settings.end_of_tape ?? "off") !== "off" && (
+            <select
+              value={settings.end_of_tape_seconds ?? 60}
+              onChange={(e) =>
+                setSettings({ ...settings, end_of_tape_seconds: Number(e.target.value) })
+              }
+              className="mt-2 w-full px-3 py-2 rounded border border-[var(--border)] bg-[var(--background)] text-white text-sm focus:outline-none focus:border-[var(--accent)] transition-colors"
+            >
+              <option value={30}>After 30 seconds</option>
+              <option value={60}>After 1 minute</option>
+              <option value={120}>After 2 minutes</option>
+              <option value={300}>After 5 minutes</option>
+            </select>
+          )}
+          <p className="mt-1 text-xs text-[var(--muted)]">
+            Blue screen, no signal or snow for this long after the tape has started means it has
+            ended. Trimming rewrites the whole capture (and archival master), so on network
+            storage stopping is much cheaper
+          </p>
+        </div>
+
+        <div className="flex items-center justify-between">
+          <div>
+            <div className="text-xs uppercase tracking-wider text-[var(--muted)]">
+              Archival Master
+            </div>
+            <p className="text-xs text-[var(--muted)] mt-0.5">
+              Also record a lossless FFV1/MKV master in the same pass (about 30 GB per hour)
+            </p>
+          </div>
+          <button
+            onClick={() =>
+              setSettings({ ...settings, archival_master: !settings.archival_master })
+            }
+            className={`relative w-11 h-6 rounded-full transition-colors ${
+              settings.archival_master
+                ? "bg-[var(--accent)]"
+                : "bg-[var(--border)]"
+            }`}
+          >
+            <span
+              className={`absolute top-0.5 w-5 h-5 rounded-full bg-white transition-transform ${
+                settings.archival_master ? "left-[22px]" : "left-0.5"
+              }`}
+            />
+          </button>
+        </div>
+
+        <div className="flex items-center justify-between">
+          <div>
+            <div className="text-xs uppercase tracking-wider text-[var(--muted)]">
+              Re-encode After Capture
+            </div>
+            <p className="text-xs text-[var(--muted)] mt-0.5">
+              Shrink finished captures with a slower preset while nothing is recording or ripping
+            </p>
+          </div>
+          <button
+            onClick={() =>
+              setSettings({
+                ...settings,
+                transcode_after_capture: !settings.transcode_after_capture,
+              })
+            }
+            className={`relative w-11 h-6 rounded-full transition-colors ${
+              settings.transcode_after_capture
+                ? "bg-[var(--accent)]"
+                : "bg-[var(--border)]"
+            }`}
+          >
+            <span
+              className={`absolute top-0.5 w-5 h-5 rounded-full bg-white transition-transform ${
+                settings.transcode_after_capture ? "left-[22px]" : "left-0.5"
+              }`}
+            />
+          </button>
+        </div>
+
+        <div>
+          <label className="block text-xs uppercase tracking-wider text-[var(--muted)] mb-2">
+            Re-encode Preset
+          </label>
+          <select
+            value={settings.transcode_preset ?? "slow"}
+            onChange={(e) =>
+              setSettings({ ...settings, transcode_preset: e.target.value })
+            }
+            className="w-full px-3 py-2 rounded border border-[var(--border)] bg-[var(--background)] text-white text-sm focus:outline-none focus:border-[var(--accent)] transition-colors"
+          >
+            {X264_PRESETS.map((preset) => (
+              <option key={preset} value={preset}>
+                {preset.charAt(0).toUpperCase() + preset.slice(1)}
+              </option>
+            ))}
+          </select>
+          <div className="mt-3 flex flex-wrap gap-4">
+            {(
+              [
+                ["transcode_deinterlace", "Deinterlace"],
+                ["transcode_denoise", "Denoise"],
+                ["transcode_keep_original", "Keep original"],
+              ] as const
+            ).map(([key, label]) => (
+              <label key={key} className="flex items-center gap-2 text-xs text-[var(--muted)]">
+                <input
+                  type="checkbox"
+                  checked={settings[key] ?? false}
+                  onChange={(e) => setSettings({ ...settings, [key]: e.target.checked })}
+                  className="accent-[var(--accent)]"
+                />
+                {label}
+              </label>
+            ))}
+          </div>
+          <p className="mt-1 text-xs text-[var(--muted)]">
+            Encoded at CRF {settings.transcode_crf ?? 23}; the capture is only replaced when the new file is smaller
+          </p>
+        </div>
+
+        <div>
+          <label className="block text-xs uppercase tracking-wider text-[var(--muted)] mb-2">
+            Split Mode
+          </label>
+          <select
+            value={settings.split_mode ?? "per_scene"}
+            onChange={(e) =>
+              setSettings({ ...settings, split_mode: e.target.value })
+            }
+            className="w-full px-3 py-2 rounded border border-[var(--border)] bg-[var(--background)] text-white text-sm focus:outline-none focus:border-[var(--accent)] transition-colors"
+          >
+            <option value="per_scene">One file at a time</option>
+            <option value="segment">Single pass</option>
+            <option value="smart">Frame accurate</option>
+          </select>
+          <p className="mt-1 text-xs text-[var(--muted)]">
+            Single pass reads the tape once and cuts on the nearest keyframe, falling
+            back to one file at a time when scenes are shorter than a keyframe interval;
+            frame accurate re-encodes only the few frames around each cut
+          </p>
+        </div>
+
+        <div>
+          <label className="block text-xs uppercase tracking-wider text-[var(--muted)] mb-2">
+            Parallel Scene Splits
+          </label>
+          <select
+            value={settings.split_concurrency ?? 4}
+            onChange={(e) =>
+              setSettings({ ...settings, split_concurrency: Number(e.target.value) })
+            }
+            className="w-full px-3 py-2 rounded border border-[var(--border)] bg-[var(--background)] text-white text-sm focus:outline-none focus:border-[var(--accent)] transition-colors"
+          >
+            <option value={1}>1</option>
+            <option value={2}>2</option>
+            <option value={4}>4</option>
+            <option value={8}>8</option>
+          </select>
+          <p className="mt-1 text-xs text-[var(--muted)]">
+            Scenes split at the same time; lower this for slow network storage
+          </p>
+        </div>
+
+        <div className="flex items-center justify-between">
+          <div>
+            <div className="text-xs uppercase tracking-wider text-[var(--muted)]">
+              Live Scene Detection
+            </div>
+            <p className="text-xs text-[var(--muted)] mt-0.5">
+              Detect scenes while recording so they are ready when the tape stops
+            </p>
+          </div>
+          <button
+            onClick={() =>
+              setSettings({ ...settings, live_analysis: !settings.live_analysis })
+            }
+            className={`relative w-11 h-6 rounded-full transition-colors ${
+              settings.live_analysis
+                ? "bg-[var(--accent)]"
+                : "bg-[var(--border)]"
+            }`}
+          >
+            <span
+              className={`absolute top-0.5 w-5 h-5 rounded-full bg-white transition-transform ${
+                settings.live_analysis ? "left-[22px]" : "left-0.5"
+              }`}
+            />
+          </button>
+        </div>
       </div>
 
       <div className="flex items-center gap-3">
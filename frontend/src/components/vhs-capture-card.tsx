@@ -1,8 +1,8 @@
 "use client";
 
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { useDigitizer } from "@/context/digitizer-context";
-import { startCapture, stopCapture } from "@/lib/api";
+import { getCapturePreviewUrl, startCapture, stopCapture } from "@/lib/api";
 import { formatBytes } from "@/lib/utils";
 
 function formatElapsed(totalSeconds: number): string {
@@ -13,8 +13,11 @@ function formatElapsed(totalSeconds: number): string {
 }
 
 export default function VHSCaptureCard() {
-  const { captureStatus, captureElapsed, captureFileSize } = useDigitizer();
+  const { captureStatus, captureElapsed, captureFileSize, captureHealth, captureWarning } =
+    useDigitizer();
   const [loading, setLoading] = useState(false);
+  const [previewTick, setPreviewTick] = useState(0);
+  const [previewAvailable, setPreviewAvailable] = useState(false);
 
   const handleStart = async () => {
     setLoading(true);
@@ -40,6 +43,16 @@ export default function VHSCaptureCard() {
 
   const isRecording = captureStatus === "recording";
 
+  // The backend rewrites the preview frame once a second
+  useEffect(() => {
+    if (!isRecording) {
+      setPreviewAvailable(false);
+      return;
+    }
+    const interval = setInterval(() => setPreviewTick((t) => t + 1), 1000);
+    return () => clearInterval(interval);
+  }, [isRecording]);
+
   return (
     <div
       className={`rounded-lg border bg-[var(--surface)] p-6 ${
@@ -61,6 +74,17 @@ export default function VHSCaptureCard() {
             </span>
           </div>
 
+          {/* eslint-disable-next-line @next/next/no-img-element */}
+          <img
+            src={getCapturePreviewUrl(previewTick)}
+            alt="Live preview"
+            onLoad={() => setPreviewAvailable(true)}
+            onError={() => setPreviewAvailable(false)}
+            className={`w-full rounded border border-[var(--border)] bg-black ${
+              previewAvailable ? "" : "hidden"
+            }`}
+          />
+
           <div className="space-y-3">
             <div className="flex justify-between text-sm">
               <span className="text-[var(--muted)]">Elapsed</span>
@@ -74,8 +98,54 @@ export default function VHSCaptureCard() {
                 {formatBytes(captureFileSize)}
               </span>
             </div>
+            {captureHealth && (
+              <>
+                <div className="flex justify-between text-sm">
+                  <span className="text-[var(--muted)]">Encode Speed</span>
+                  <span
+                    className={`font-mono ${
+                      captureHealth.speed !== null && captureHealth.speed < 1
+                        ? "text-amber-400"
+                        : "text-white"
+                    }`}
+                  >
+                    {captureHealth.speed !== null ? `${captureHealth.speed.toFixed(2)}x` : "--"}
+                  </span>
+                </div>
+                <div className="flex justify-between text-sm">
+                  <span className="text-[var(--muted)]">Dropped / Duplicated</span>
+                  <span
+                    className={`font-mono ${
+                      captureHealth.drop_frames > 0 ? "text-amber-400" : "text-white"
+                    }`}
+                  >
+                    {captureHealth.drop_frames} / {captureHealth.dup_frames}
+                  </span>
+                </div>
+                <div className="flex justify-between text-sm">
+                  <span className="text-[var(--muted)]">Encoder Backlog</span>
+                  <span className="text-white font-mono">
+                    {captureHealth.backlog.toFixed(1)}s
+                  </span>
+                </div>
+                {captureHealth.cpu_load !== null && (
+                  <div className="flex justify-between text-sm">
+                    <span className="text-[var(--muted)]">CPU</span>
+                    <span className="text-white font-mono">
+                      {captureHealth.cpu_load.toFixed(2)} cores
+                    </span>
+                  </div>
+                )}
+              </>
+            )}
           </div>
 
+          {captureWarning && (
+            <div className="rounded border border-amber-500/30 bg-amber-500/10 px-3 py-2 text-xs text-amber-400">
+              {captureWarning}
+            </div>
+          )}
+
           <button
             onClick={handleStop}
             disabled={loading}
@@ -9,7 +9,7 @@ import {
   useCallback,
   ReactNode,
 } from "react";
-import { CaptureStatus, DriveStatusType, Job } from "@/lib/types";
+import { CaptureHealth, CaptureStatus, DriveStatusType, Job } from "@/lib/types";
 
 interface AnalysisProgress {
   jobId: string;
@@ -24,6 +24,7 @@ interface SplitProgress {
 
 interface DigitizerState {
   driveStatus: DriveStatusType;
+  drives: Record<string, DriveStatusType>;
   activeJobId: string | null;
   activeJobProgress: number;
   lastCompletedJob: Job | null;
@@ -33,12 +34,15 @@ interface DigitizerState {
   captureJobId: string | null;
   captureElapsed: number;
   captureFileSize: number;
+  captureHealth: CaptureHealth | null;
+  captureWarning: string | null;
   analysisProgress: AnalysisProgress | null;
   splitProgress: SplitProgress | null;
 }
 
 const initialState: DigitizerState = {
   driveStatus: "empty",
+  drives: {},
   activeJobId: null,
   activeJobProgress: 0,
   lastCompletedJob: null,
@@ -48,10 +52,20 @@ const initialState: DigitizerState = {
   captureJobId: null,
   captureElapsed: 0,
   captureFileSize: 0,
+  captureHealth: null,
+  captureWarning: null,
   analysisProgress: null,
   splitProgress: null,
 };
 
+// The busiest state across all drives
+function aggregateDriveStatus(drives: Record<string, DriveStatusType>): DriveStatusType {
+  const statuses = Object.values(drives);
+  if (statuses.includes("ripping")) return "ripping";
+  if (statuses.includes("disc_detected")) return "disc_detected";
+  return "empty";
+}
+
 const DigitizerContext = createContext<DigitizerState>(initialState);
 
 export function useDigitizer() {
@@ -103,17 +117,29 @@ export function DigitizerProvider({ children }: { children: ReactNode }) {
 
         setState((prev) => {
           switch (eventType) {
-            case "drive_status":
+            case "drive_status": {
+              const drives = {
+                ...prev.drives,
+                [(data.drive_id as string) ?? "default"]: data.status as DriveStatusType,
+              };
               return {
                 ...prev,
-                driveStatus: data.status as DriveStatusType,
+                drives,
+                driveStatus: aggregateDriveStatus(drives),
               };
+            }
             case "capture_status":
               return {
                 ...prev,
                 captureStatus: data.status as CaptureStatus,
                 ...(data.status === "idle"
-                  ? { captureJobId: null, captureElapsed: 0, captureFileSize: 0 }
+                  ? {
+                      captureJobId: null,
+                      captureElapsed: 0,
+                      captureFileSize: 0,
+                      captureHealth: null,
+                      captureWarning: null,
+                    }
                   : {}),
               };
             case "job_progress":
@@ -130,6 +156,21 @@ export function DigitizerProvider({ children }: { children: ReactNode }) {
                 activeJobId: data.job_id as string,
                 activeJobProgress: data.progress as number,
               };
+            case "capture_health":
+              return {
+                ...prev,
+                captureHealth: data as unknown as CaptureHealth,
+                // The warning clears once the encoder is back to real time
+                captureWarning:
+                  (data.speed as number | null) !== null && (data.speed as number) >= 1
+                    ? null
+                    : prev.captureWarning,
+              };
+            case "capture_warning":
+              return {
+                ...prev,
+                captureWarning: data.message as string,
+              };
             case "job_complete":
               return {
                 ...prev,
@@ -1,4 +1,12 @@
-import { Job, Scene, Settings, DriveState, CaptureStatusResponse, CaptureStartResponse } from "./types";
+import {
+  Job,
+  Scene,
+  Settings,
+  DriveState,
+  CaptureStatusResponse,
+  CaptureStartResponse,
+  Calibration,
+} from "./types";
 
 const BASE_URL = process.env.NEXT_PUBLIC_API_URL || "";
 
@@ -66,12 +74,33 @@ export async function stopCapture(): Promise<Job> {
   });
 }
 
+export async function getCalibration(): Promise<Calibration> {
+  return request<Calibration>("/api/calibration");
+}
+
+export async function startCalibration(
+  margin: number,
+  apply: boolean
+): Promise<{ status: string; margin: number; apply: boolean }> {
+  return request<{ status: string; margin: number; apply: boolean }>("/api/calibration", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ margin, apply }),
+  });
+}
+
 export async function analyzeScenes(jobId: string): Promise<{ status: string; job_id: string }> {
   return request<{ status: string; job_id: string }>(`/api/jobs/${jobId}/analyze`, {
     method: "POST",
   });
 }
 
+export async function transcodeJob(jobId: string): Promise<{ status: string; job_id: string }> {
+  return request<{ status: string; job_id: string }>(`/api/jobs/${jobId}/transcode`, {
+    method: "POST",
+  });
+}
+
 export async function getScenes(jobId: string): Promise<Scene[]> {
   return request<Scene[]>(`/api/jobs/${jobId}/scenes`);
 }
@@ -93,6 +122,10 @@ export async function splitScenes(jobId: string): Promise<{ status: string; job_
   });
 }
 
+export function getCapturePreviewUrl(tick: number): string {
+  return `${BASE_URL}/api/capture/preview?t=${tick}`;
+}
+
 export function getThumbnailUrl(jobId: string, filename: string): string {
   return `${BASE_URL}/api/thumbs/${jobId}/${filename}`;
 }
@@ -3,10 +3,22 @@ export type DriveStatusType = "empty" | "disc_detected" | "ripping";
 export type CaptureStatus = "idle" | "recording";
 export type AnalysisStatus = "analyzing" | "analyzed" | "splitting" | "split_complete";
 
+export interface DiscTitle {
+  number: number;
+  duration: number;
+  chapters?: number;
+  cells?: number;
+  audio_streams?: number;
+  subpictures?: number;
+}
+
 export interface DiscInfo {
   title_count: number;
   main_title: number;
   duration: number;
+  disc_title?: string;
+  titles?: DiscTitle[];
+  fingerprint?: string | null;
 }
 
 export interface Job {
@@ -16,12 +28,52 @@ export interface Job {
   status: JobStatus;
   progress: number;
   output_path: string | null;
+  master_path: string | null;
   file_size: number | null;
   started_at: string | null;
   completed_at: string | null;
   error: string | null;
   analysis_status: AnalysisStatus | null;
   scene_count: number | null;
+  stage_timings: Record<string, StageTiming> | null;
+  capture_health: CaptureHealth | null;
+  stop_reason: string | null;
+  transcode_status: TranscodeStatus | null;
+  transcode: TranscodeResult | null;
+  capture_fragmented: boolean | null;
+  parent_id: string | null;
+}
+
+export type TranscodeStatus = "queued" | "transcoding" | "transcoded" | "failed";
+
+export interface TranscodeResult {
+  preset: string;
+  crf: number;
+  deinterlace: boolean;
+  denoise: boolean;
+  original_size: number;
+  size: number;
+  saved: number;
+  replaced: boolean;
+  original_path: string | null;
+  paused_seconds: number;
+}
+
+export interface StageTiming {
+  started_at: string;
+  seconds: number;
+}
+
+export interface CaptureHealth {
+  speed: number | null;
+  min_speed: number | null;
+  fps: number | null;
+  drop_frames: number;
+  dup_frames: number;
+  backlog: number;
+  slow_seconds: number;
+  warnings: number;
+  cpu_load: number | null;
 }
 
 export interface Scene {
@@ -45,6 +97,7 @@ export interface CaptureStartResponse {
   source_type: string;
   status: string;
   output_path: string;
+  master_path: string | null;
 }
 
 export interface Settings {
@@ -55,13 +108,57 @@ export interface Settings {
   encoding_preset?: string;
   crf_quality?: number;
   audio_bitrate?: string;
+  live_analysis?: boolean;
+  archival_master?: boolean;
+  live_preview?: boolean;
+  end_of_tape?: string;
+  end_of_tape_seconds?: number;
+  transcode_after_capture?: boolean;
+  transcode_keep_original?: boolean;
+  transcode_preset?: string;
+  transcode_crf?: number;
+  transcode_deinterlace?: boolean;
+  transcode_denoise?: boolean;
+  split_concurrency?: number;
+  split_mode?: string;
+  duplicate_discs?: string;
+  rip_titles?: string;
+  min_title_length?: number;
+}
+
+export interface DriveInfo {
+  id: string;
+  device: string;
+  status: DriveStatusType;
 }
 
 export interface DriveState {
   status: DriveStatusType;
+  drives: DriveInfo[];
 }
 
 export interface WSEvent {
   event: string;
   data: Record<string, unknown>;
 }
+
+export interface PresetBenchmark {
+  preset: string;
+  speed: number | null;
+  fps: number | null;
+  wall_time: number;
+  cpu_time: number;
+  peak_rss: number;
+}
+
+export interface Calibration {
+  calibrated_at: string;
+  width: number;
+  height: number;
+  fps: string;
+  crf_quality: number;
+  margin: number;
+  recommended: string | null;
+  applied: boolean;
+  results: PresetBenchmark[];
+}